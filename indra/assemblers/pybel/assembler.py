@@ -253,7 +253,7 @@ class PybelAssembler(object):
     def _assemble_modification(self, stmt):
         """Example: p(HGNC:MAP2K1) => p(HGNC:MAPK1, pmod(Ph, Thr, 185))"""
         sub_agent = deepcopy(stmt.sub)
-        sub_agent.mods.append(stmt._get_mod_condition())
+        sub_agent.mods = list(sub_agent.mods) + [stmt._get_mod_condition()]
         activates = isinstance(stmt, AddModification)
         relation = get_causal_edge(stmt, activates)
         self._add_nodes_edges(stmt.enz, sub_agent, relation,
@@ -333,7 +333,7 @@ class PybelAssembler(object):
                                         p(HGNC:MAPK14, pmod(Ph, Tyr, 100))"""
         sub_agent = deepcopy(stmt.enz)
         mc = stmt._get_mod_condition()
-        sub_agent.mods.append(mc)
+        sub_agent.mods = list(sub_agent.mods) + [mc]
         # FIXME Ignore any bound conditions on the substrate!!!
         # This is because if they are included, a complex node will be returned,
         # which (at least currently) won't incorporate any protein
@@ -351,7 +351,7 @@ class PybelAssembler(object):
         assert stmt.enz.bound_conditions[0].is_bound
         # Create a modified protein node for the bound target
         sub_agent = deepcopy(stmt.enz.bound_conditions[0].agent)
-        sub_agent.mods.append(stmt._get_mod_condition())
+        sub_agent.mods = list(sub_agent.mods) + [stmt._get_mod_condition()]
         self._add_nodes_edges(stmt.enz, sub_agent, pc.DIRECTLY_INCREASES,
                               stmt.get_hash(refresh=True), stmt.evidence)
 
@@ -145,9 +145,9 @@ class SBGNAssembler(object):
         mc_unchanged.is_modified = not mc_unchanged.is_modified
         # Make glyphs for sub
         sub_changed = copy.deepcopy(stmt.sub)
-        sub_changed.mods.append(mc_changed)
+        sub_changed.mods = list(sub_changed.mods) + [mc_changed]
         sub_unchanged = copy.deepcopy(stmt.sub)
-        sub_unchanged.mods.append(mc_unchanged)
+        sub_unchanged.mods = list(sub_unchanged.mods) + [mc_unchanged]
         sub_in, sub_out = \
             (sub_unchanged, sub_changed) if isinstance(stmt, AddModification) else \
             (sub_changed, sub_unchanged)
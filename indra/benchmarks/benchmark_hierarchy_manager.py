@@ -0,0 +1,138 @@
+"""Benchmark the initialization of HierarchyManagers.
+
+The transitive closures, components and children of each hierarchy are
+built with the current single-pass builder and with the previous builder,
+which called rdflib's transitiveClosure separately for each term, and the
+results and run times are compared.
+
+Usage: python benchmark_hierarchy_manager.py [repeats]
+"""
+from __future__ import absolute_import, print_function, unicode_literals
+from builtins import dict, str
+import os
+import sys
+import time
+import rdflib
+from indra.preassembler.hierarchy_manager import HierarchyManager
+
+
+here = os.path.dirname(os.path.abspath(__file__))
+resources = os.path.join(here, os.pardir, 'resources')
+sources = os.path.join(here, os.pardir, 'sources')
+
+bio_closure = ['http://identifiers.org/hgnc',
+               'http://identifiers.org/uniprot',
+               'http://identifiers.org/fplx']
+
+# The RDF file, build_closure and uri_as_name arguments of each hierarchy
+hierarchy_args = [
+    (os.path.join(resources, 'entity_hierarchy.rdf'), bio_closure, True),
+    (os.path.join(resources, 'modification_hierarchy.rdf'), True, True),
+    (os.path.join(resources, 'activity_hierarchy.rdf'), True, True),
+    (os.path.join(resources, 'cellular_component_hierarchy.rdf'), True,
+     False),
+    (os.path.join(sources, 'eidos', 'eidos_ontology.rdf'), True, True),
+    (os.path.join(sources, 'cwms', 'trips_ontology.rdf'), True, True),
+    ]
+
+
+class LegacyHierarchyManager(HierarchyManager):
+    """A HierarchyManager using the previous closure and component builder.
+    """
+    def initialize(self):
+        self.build_transitive_closures()
+        all_parents = {parent for child, parent in self.isa_or_partof_closure}
+        rel_fun = lambda node, graph: self.isa_or_partof_objects(node,
+                                                                 inverse=True)
+        self._children = {}
+        for parent in all_parents:
+            children = self.graph.transitiveClosure(rel_fun,
+                                                    rdflib.term.URIRef(parent))
+            children_uris = list(set(c.toPython() for c in children))
+            if children_uris:
+                self._children[parent] = children_uris
+        self._build_parent_index()
+
+    def build_transitive_closures(self):
+        self.component_counter = 0
+        for rel, tc_set in ((self.isa_objects, self.isa_closure),
+                            (self.partof_objects, self.partof_closure),
+                            (self.isa_or_partof_objects,
+                             self.isa_or_partof_closure)):
+            self.build_transitive_closure(rel, tc_set)
+
+    def build_transitive_closure(self, rel, tc_set):
+        if not self.build_closure:
+            return
+        nodes = self._get_build_transitive_closure_objects()
+        rel_fun = lambda node, graph: rel(node)
+        for x in nodes:
+            rel_closure = self.graph.transitiveClosure(rel_fun, x)
+            xs = x.toPython()
+            for y in rel_closure:
+                ys = y.toPython()
+                if xs == ys:
+                    continue
+                tc_set.add((xs, ys))
+                if rel == self.isa_or_partof_objects:
+                    self._add_component(xs, ys)
+
+    def _add_component(self, xs, ys):
+        xcomp = self.components.get(xs)
+        ycomp = self.components.get(ys)
+        if xcomp is None:
+            if ycomp is None:
+                self.components[xs] = self.component_counter
+                self.components[ys] = self.component_counter
+                self.component_counter += 1
+            else:
+                self.components[xs] = ycomp
+        else:
+            if ycomp is None:
+                self.components[ys] = xcomp
+            elif xcomp != ycomp:
+                remove_component = max(xcomp, ycomp)
+                joint_component = min(xcomp, ycomp)
+                for k, v in self.components.items():
+                    if v == remove_component:
+                        self.components[k] = joint_component
+
+
+def get_partition(components):
+    """Return the sets of terms in each component."""
+    partition = {}
+    for term, component in components.items():
+        partition.setdefault(component, set()).add(term)
+    return {frozenset(terms) for terms in partition.values()}
+
+
+def time_initialization(hm_class, args, repeats):
+    """Return the fastest initialization time and the HierarchyManager."""
+    times = []
+    for _ in range(repeats):
+        start = time.time()
+        hm = hm_class(*args)
+        times.append(time.time() - start)
+    return min(times), hm
+
+
+def run_benchmark(repeats=1):
+    for args in hierarchy_args:
+        legacy_time, legacy_hm = \
+            time_initialization(LegacyHierarchyManager, args, repeats)
+        new_time, new_hm = time_initialization(HierarchyManager, args, repeats)
+        assert legacy_hm.isa_closure == new_hm.isa_closure
+        assert legacy_hm.partof_closure == new_hm.partof_closure
+        assert legacy_hm.isa_or_partof_closure == new_hm.isa_or_partof_closure
+        assert get_partition(legacy_hm.components) == \
+            get_partition(new_hm.components)
+        assert {k: set(v) for k, v in legacy_hm._children.items()} == \
+            {k: set(v) for k, v in new_hm._children.items()}
+        print('%s: %d closure pairs, legacy %.2fs, new %.2fs, speedup %.1fx' %
+              (os.path.basename(args[0]), len(new_hm.isa_or_partof_closure),
+               legacy_time, new_time, legacy_time / max(new_time, 1e-6)))
+
+
+if __name__ == '__main__':
+    repeats = int(sys.argv[1]) if len(sys.argv) > 1 else 1
+    run_benchmark(repeats)
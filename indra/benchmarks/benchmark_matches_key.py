@@ -0,0 +1,123 @@
+"""Benchmark the matches keys of Statements in preassembly.
+
+Preassembly is run on randomly generated Statements that densely refine
+each other, and the time taken to get the matches keys of the same
+Statements is measured separately.
+
+Usage: python benchmark_matches_key.py [n_stmts] [repeats]
+"""
+from __future__ import absolute_import, print_function, unicode_literals
+from builtins import dict, str
+import sys
+import time
+import random
+from copy import deepcopy
+from indra.statements import *
+from indra.tools import assemble_corpus as ac
+from indra.preassembler.hierarchy_manager import get_bio_hierarchies
+
+
+# Genes and the families they belong to, so that many Statements refine
+# each other
+genes = [('MAP2K1', '6840'), ('MAPK1', '6871'), ('MAPK3', '6877'),
+         ('BRAF', '1097'), ('RAF1', '9829'), ('KRAS', '6407'),
+         ('HRAS', '5173'), ('AKT1', '391')]
+families = [('ERK', 'ERK'), ('MEK', 'MEK'), ('RAF', 'RAF'), ('AKT', 'AKT'),
+            ('RAS', 'RAS')]
+residues = [('S', '218'), ('S', '222'), ('T', '185'), ('Y', '187'),
+            (None, None)]
+locations = [None, None, 'cytoplasm', 'nucleus', 'plasma membrane']
+
+
+def get_random_agent(rng, with_bound=True):
+    if rng.random() < 0.2:
+        name, fplx_id = rng.choice(families)
+        db_refs = {'FPLX': fplx_id, 'TEXT': name}
+    else:
+        name, hgnc_id = rng.choice(genes)
+        db_refs = {'HGNC': hgnc_id, 'TEXT': name}
+    mods = []
+    if rng.random() < 0.3:
+        residue, position = rng.choice(residues)
+        mods.append(ModCondition('phosphorylation', residue, position))
+    bound_conditions = []
+    if with_bound and rng.random() < 0.1:
+        bound_conditions.append(
+            BoundCondition(get_random_agent(rng, with_bound=False)))
+    return Agent(name, mods=mods, bound_conditions=bound_conditions,
+                 location=rng.choice(locations), db_refs=db_refs)
+
+
+def get_random_stmt(rng, evidence):
+    kind = rng.random()
+    if kind < 0.5:
+        residue, position = rng.choice(residues)
+        return Phosphorylation(get_random_agent(rng), get_random_agent(rng),
+                               residue, position, evidence=evidence)
+    elif kind < 0.8:
+        return Activation(get_random_agent(rng), get_random_agent(rng),
+                          evidence=evidence)
+    else:
+        return Complex([get_random_agent(rng), get_random_agent(rng)],
+                       evidence=evidence)
+
+
+def get_random_stmts(n_stmts, n_unique, seed=1):
+    """Return random Statements, each extracted from several sentences.
+
+    Each of the n_unique distinct Statements is represented by separate
+    objects, as it would be when extracted by reading from different
+    sentences.
+    """
+    rng = random.Random(seed)
+    stmts = []
+    for i in range(n_stmts):
+        ev = Evidence(source_api=rng.choice(['reach', 'sparser', 'trips']),
+                      pmid=str(rng.randint(1, n_stmts)),
+                      text='Sentence %d' % i)
+        template = rng.randint(0, n_unique - 1)
+        stmts.append(get_random_stmt(random.Random(template), [ev]))
+    return stmts
+
+
+def time_preassembly(stmts, hierarchies):
+    """Return the preassembly time and the assembled Statements."""
+    stmts_in = deepcopy(stmts)
+    start = time.time()
+    stmts_out = ac.run_preassembly(stmts_in, return_toplevel=False,
+                                   hierarchies=hierarchies,
+                                   flatten_evidence=True,
+                                   copy_stmts=False)
+    return time.time() - start, stmts_out
+
+
+def time_matches_keys(stmts, repeats):
+    """Return the fastest time taken to get the matches keys of Statements.
+    """
+    times = []
+    for _ in range(repeats):
+        start = time.time()
+        for stmt in stmts:
+            stmt.matches_key()
+        times.append(time.time() - start)
+    return min(times)
+
+
+def run_benchmark(n_stmts=20000, repeats=1):
+    stmts = get_random_stmts(n_stmts, n_stmts // 10)
+    # The hierarchies are built with the closure of cellular components
+    hierarchies = get_bio_hierarchies(from_pickle=False)
+    times = []
+    for _ in range(repeats):
+        run_time, stmts_out = time_preassembly(stmts, hierarchies)
+        times.append(run_time)
+    print('%d statements, %d assembled: preassembly %.2fs' %
+          (len(stmts), len(stmts_out), min(times)))
+    print('%d statement matches keys: %.2fs' %
+          (len(stmts), time_matches_keys(stmts, repeats)))
+
+
+if __name__ == '__main__':
+    n_stmts = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    repeats = int(sys.argv[2]) if len(sys.argv) > 2 else 1
+    run_benchmark(n_stmts, repeats)
@@ -0,0 +1,51 @@
+"""Benchmark hashing the Statements of a corpus.
+
+Random Statements are loaded from JSON, as they would be from a corpus
+file, and their shallow and full hashes are computed one Statement at a
+time with `Statement.get_hash` and in one pass with
+:py:func:`indra.statements.get_statement_hashes`, optionally with a pool of
+worker processes. The hashes are checked to be identical.
+
+Usage: python benchmark_statement_hashes.py [n_stmts] [poolsize]
+"""
+from __future__ import absolute_import, print_function, unicode_literals
+from builtins import dict, str
+import sys
+import json
+import time
+from indra.statements import stmts_to_json, stmts_from_json, \
+    get_statement_hashes
+from indra.benchmarks.benchmark_matches_key import get_random_stmts
+
+
+def hash_one_by_one(stmts):
+    return [(stmt.get_hash(shallow=True), stmt.get_hash(shallow=False))
+            for stmt in stmts]
+
+
+def run_benchmark(n_stmts=20000, poolsize=None):
+    stmts_json = json.dumps(stmts_to_json(get_random_stmts(n_stmts,
+                                                           n_stmts // 10)))
+    funs = [('get_hash', hash_one_by_one),
+            ('get_statement_hashes',
+             lambda stmts: get_statement_hashes(stmts, full=True))]
+    if poolsize:
+        funs.append(('get_statement_hashes, %d workers' % poolsize,
+                     lambda stmts: get_statement_hashes(stmts, full=True,
+                                                        poolsize=poolsize)))
+    results = []
+    for label, fun in funs:
+        stmts = stmts_from_json(json.loads(stmts_json))
+        for stmt in stmts:
+            stmt._shallow_hash = stmt._full_hash = None
+        start = time.time()
+        results.append(fun(stmts))
+        print('%d statements, %s: %.2fs' % (n_stmts, label,
+                                            time.time() - start))
+    assert all(hashes == results[0] for hashes in results)
+
+
+if __name__ == '__main__':
+    n_stmts = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    poolsize = int(sys.argv[2]) if len(sys.argv) > 2 else None
+    run_benchmark(n_stmts, poolsize)
@@ -0,0 +1,50 @@
+"""Benchmark the memory used by Statements held in memory.
+
+Random Statements are serialized to JSON and loaded back, as they would be
+from a corpus file, and the memory they use is measured before and after
+they are compacted with :py:func:`indra.statements.compact_statements`,
+as well as when their Agents are interned in an
+:py:class:`indra.statements.AgentPool` while loading.
+
+Usage: python benchmark_statement_memory.py [n_stmts]
+"""
+from __future__ import absolute_import, print_function, unicode_literals
+from builtins import dict, str
+import gc
+import sys
+import json
+import tracemalloc
+from indra.statements import stmts_to_json, stmts_from_json, \
+    compact_statements, AgentPool
+from indra.benchmarks.benchmark_matches_key import get_random_stmts
+
+
+def get_traced_memory():
+    gc.collect()
+    return tracemalloc.get_traced_memory()[0]
+
+
+def measure_loading(stmts_json, agent_pool=None):
+    tracemalloc.start()
+    start = get_traced_memory()
+    stmts = stmts_from_json(json.loads(stmts_json), agent_pool=agent_pool)
+    loaded = get_traced_memory() - start
+    compact_statements(stmts)
+    compacted = get_traced_memory() - start
+    tracemalloc.stop()
+    return loaded, compacted
+
+
+def run_benchmark(n_stmts=20000):
+    stmts_json = json.dumps(stmts_to_json(get_random_stmts(n_stmts,
+                                                           n_stmts // 10)))
+    for label, agent_pool in (('unpooled', None), ('pooled', AgentPool())):
+        loaded, compacted = measure_loading(stmts_json, agent_pool)
+        print('%d statements, %s: loaded %.0f bytes/statement, compacted '
+              '%.0f bytes/statement, saving %.0f%%' %
+              (n_stmts, label, loaded / n_stmts, compacted / n_stmts,
+               100 * (1 - compacted / loaded)))
+
+if __name__ == '__main__':
+    n_stmts = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    run_benchmark(n_stmts)
@@ -718,7 +718,7 @@ def _add_modification_to_agent(agent, mod_type, residue, position):
         if old_mod.equals(new_mod):
             return agent
     new_agent = deepcopy(agent)
-    new_agent.mods.append(new_mod)
+    new_agent.mods = list(new_agent.mods) + [new_mod]
     return new_agent
 
 
@@ -1,24 +1,41 @@
 from __future__ import absolute_import, print_function, unicode_literals
 from builtins import dict, str
 
+import os
 import sys
-import time
+import copy
+import atexit
+import pickle
+import shutil
 import logging
 import itertools
+import tempfile
 import functools
 import collections
 import networkx as nx
-import multiprocessing as mp
 try:
     import pygraphviz as pgv
 except ImportError:
     pass
-from indra.util import fast_deepcopy
+from indra.util import fast_deepcopy, get_mp_context
 from indra.statements import *
 from indra.statements import stmt_type as indra_stmt_type
+from indra.preassembler import refinement, contradiction
+from indra.preassembler.hierarchy_manager import LazyHierarchies
+from indra.preassembler.relation_cache import flush_relation_caches
+from indra.preassembler.stats import PreassemblyStats, get_times, \
+    get_task_stats
 
 logger = logging.getLogger(__name__)
 
+# The pool of worker processes used for finding refinements, the arguments
+# it was created with, and, in worker processes, the hierarchies to use and
+# the last group of Statements loaded
+_worker_pool = None
+_worker_pool_args = None
+_worker_hierarchies = None
+_worker_group = None
+
 
 class Preassembler(object):
     """De-duplicates statements and arranges them in a specificity hierarchy.
@@ -41,6 +58,15 @@ class Preassembler(object):
         A function which takes two Statement objects and a hierarchies dict
         as an argument and returns True or False. If supplied, it overrides
         the built-in refinement_of method of each Statement being assembled.
+    copy_stmts : Optional[bool]
+        If True, the statements passed to the Preassembler are deep-copied
+        so that they are never changed by preassembly. If False, the
+        statements are used as they are, and only the Evidence objects that
+        get annotated during duplicate combination are copied, on write. The
+        statements should then not be modified by the caller while the
+        Preassembler is in use. This avoids copying statements that the
+        caller doesn't need any more, e.g., the output of other processing
+        steps. Default: True
 
     Attributes
     ----------
@@ -53,13 +79,16 @@ class Preassembler(object):
     hierarchies : dict[:py:class:`indra.preassembler.hierarchy_manager`]
         A dictionary of hierarchies with keys such as 'entity' and
         'modification' pointing to HierarchyManagers
+    stats : :py:class:`indra.preassembler.stats.PreassemblyStats`
+        Timings of the phases of preassembly, the sizes of the groups of
+        statements compared and the number of comparisons performed.
     """
     def __init__(self, hierarchies, stmts=None, matches_fun=None,
-                 refinement_fun=None):
+                 refinement_fun=None, copy_stmts=True):
         self.hierarchies = hierarchies
+        self.copy_stmts = copy_stmts
         if stmts:
-            logger.debug("Deepcopying stmts in __init__")
-            self.stmts = fast_deepcopy(stmts)
+            self.stmts = self._take_stmts(stmts)
         else:
             self.stmts = []
         self.unique_stmts = None
@@ -68,6 +97,11 @@ class Preassembler(object):
             default_matches_fun
         self.refinement_fun = refinement_fun if refinement_fun else \
             default_refinement_fun
+        # Indexes used by merge_statements, built on first use
+        self._dup_index = None
+        self._group_index = None
+        self._ev_key_index = None
+        self.stats = PreassemblyStats()
 
     def add_statements(self, stmts):
         """Add to the current list of statements.
@@ -77,7 +111,14 @@ class Preassembler(object):
         stmts : list of :py:class:`indra.statements.Statement`
             Statements to add to the current list.
         """
-        self.stmts += fast_deepcopy(stmts)
+        self.stmts += self._take_stmts(stmts)
+
+    def _take_stmts(self, stmts):
+        """Return the given statements, copied unless copy_stmts is False."""
+        if not self.copy_stmts:
+            return list(stmts)
+        logger.debug("Deepcopying %d stmts" % len(stmts))
+        return fast_deepcopy(stmts)
 
     def combine_duplicates(self):
         """Combine duplicates among `stmts` and save result in `unique_stmts`.
@@ -85,23 +126,32 @@ class Preassembler(object):
         A wrapper around the method :py:meth:`combine_duplicate_stmts`.
         """
         if self.unique_stmts is None:
-            self.unique_stmts = self.combine_duplicate_stmts(self.stmts)
+            with self.stats.timer('combine_duplicates'):
+                self.unique_stmts = self.combine_duplicate_stmts(self.stmts)
         return self.unique_stmts
 
     def _get_stmt_matching_groups(self, stmts):
-        """Use the matches_fun method to get sets of matching statements."""
-        # Remove exact duplicates using a set() call, then make copies:
+        """Use the matches_fun method to get sets of matching statements.
+
+        The statements are bucketed in a single pass, computing the key of
+        each statement only once. Groups are returned as (key, statements)
+        tuples sorted by key.
+        """
         logger.debug('%d statements before removing object duplicates.' %
                      len(stmts))
-        st = list(set(stmts))
-        logger.debug('%d statements after removing object duplicates.' %
-                     len(stmts))
         # Group statements according to whether they are matches (differing
-        # only in their evidence).
-        # Sort the statements in place by matches_key()
-        st.sort(key=self.matches_fun)
-
-        return itertools.groupby(st, key=self.matches_fun)
+        # only in their evidence), dropping repeated instances of the same
+        # object along the way.
+        groups = {}
+        seen = set()
+        for stmt in stmts:
+            if id(stmt) in seen:
+                continue
+            seen.add(id(stmt))
+            groups.setdefault(self.matches_fun(stmt), []).append(stmt)
+        logger.debug('%d statements after removing object duplicates.' %
+                     len(seen))
+        return sorted(groups.items(), key=lambda x: x[0])
 
     def combine_duplicate_stmts(self, stmts):
         """Combine evidence from duplicate Statements.
@@ -144,34 +194,33 @@ class Preassembler(object):
         >>> sorted([e.text for e in uniq_stmts[0].evidence]) # doctest:+IGNORE_UNICODE
         ['evidence 1', 'evidence 2']
         """
-        # Helper function to get a list of evidence matches keys
-        def _ev_keys(sts):
-            ev_keys = []
-            for stmt in sts:
-                for ev in stmt.evidence:
-                    ev_keys.append(ev.matches_key())
-            return ev_keys
         # Iterate over groups of duplicate statements
         unique_stmts = []
         for _, duplicates in self._get_stmt_matching_groups(stmts):
             ev_keys = set()
             # Get the first statement and add the evidence of all subsequent
             # Statements to it
-            duplicates = list(duplicates)
-            start_ev_keys = _ev_keys(duplicates)
-            for stmt_ix, stmt in enumerate(duplicates):
-                if stmt_ix is 0:
-                    new_stmt = stmt.make_generic_copy()
-                if len(duplicates) == 1:
-                    new_stmt.uuid = stmt.uuid
+            new_stmt = duplicates[0].make_generic_copy()
+            if len(duplicates) == 1:
+                new_stmt.uuid = duplicates[0].uuid
+            num_start_evs = 0
+            for stmt in duplicates:
+                agents = stmt.agent_list(deep_sorted=True)
                 raw_text = [None if ag is None else ag.db_refs.get('TEXT')
-                            for ag in stmt.agent_list(deep_sorted=True)]
+                            for ag in agents]
                 raw_grounding = [None if ag is None else ag.db_refs
-                                 for ag in stmt.agent_list(deep_sorted=True)]
+                                 for ag in agents]
+                # The agent part of the evidence keys is the same for all the
+                # evidences of this statement so we only build it once
+                agents_key = str(raw_text) + str(raw_grounding)
+                num_start_evs += len(stmt.evidence)
                 for ev in stmt.evidence:
-                    ev_key = ev.matches_key() + str(raw_text) + \
-                        str(raw_grounding)
+                    ev_key = (ev.matches_key(), agents_key)
                     if ev_key not in ev_keys:
+                        # If we don't own the statements, we annotate a copy
+                        # of the evidence
+                        if not self.copy_stmts:
+                            ev = _copy_evidence(ev)
                         # In case there are already agents annotations, we
                         # just add a new key for raw_text, otherwise create
                         # a new key
@@ -188,10 +237,9 @@ class Preassembler(object):
                         ev.annotations['prior_uuids'].append(stmt.uuid)
                         new_stmt.evidence.append(ev)
                         ev_keys.add(ev_key)
-            end_ev_keys = _ev_keys([new_stmt])
-            if len(end_ev_keys) != len(start_ev_keys):
+            if len(new_stmt.evidence) != num_start_evs:
                 logger.debug('%d redundant evidences eliminated.' %
-                             (len(start_ev_keys) - len(end_ev_keys)))
+                             (num_start_evs - len(new_stmt.evidence)))
             # This should never be None or anything else
             assert isinstance(new_stmt, Statement)
             unique_stmts.append(new_stmt)
@@ -229,6 +277,35 @@ class Preassembler(object):
                     entities.append(str(component))
         return entities
 
+    def _get_group_key(self, stmt, stmt_type, eh):
+        """Return the key of the hierarchy group a Statement belongs to."""
+        entities = self._get_entities(stmt, stmt_type, eh)
+        # If we're dealing with Complexes, sort the entities and use
+        # as dict key
+        if stmt_type == Complex:
+            # There shouldn't be any statements of the type
+            # e.g., Complex([Foo, None, Bar])
+            assert None not in entities
+            assert len(entities) > 0
+            entities.sort()
+            return tuple(entities)
+        elif stmt_type == Conversion:
+            assert len(entities) > 0
+            return (entities[0],
+                    tuple(sorted(entities[1:len(stmt.obj_from)+1])),
+                    tuple(sorted(entities[-len(stmt.obj_to):])))
+        # All other statements will have one or two entities
+        elif len(entities) == 1:
+            # If only one entity, we only need the one key
+            # It should not be None!
+            assert None not in entities
+            return tuple(entities)
+        # Make sure we only have two entities, and they are not both None
+        key = tuple(entities)
+        assert len(key) == 2
+        assert key != (None, None)
+        return key
+
     def _get_stmt_by_group(self, stmt_type, stmts_this_type, eh):
         """Group Statements of `stmt_type` by their hierarchical relations."""
         # Dict of stmt group key tuples, indexed by their first Agent
@@ -246,41 +323,13 @@ class Preassembler(object):
         # components that their agents are part of
         for stmt_tuple in stmts_this_type:
             _, stmt = stmt_tuple
-            entities = self._get_entities(stmt, stmt_type, eh)
-            # At this point we have an entity list
-            # If we're dealing with Complexes, sort the entities and use
-            # as dict key
-            if stmt_type == Complex:
-                # There shouldn't be any statements of the type
-                # e.g., Complex([Foo, None, Bar])
-                assert None not in entities
-                assert len(entities) > 0
-                entities.sort()
-                key = tuple(entities)
-                if stmt_tuple not in stmt_by_group[key]:
-                    stmt_by_group[key].append(stmt_tuple)
-            elif stmt_type == Conversion:
-                assert len(entities) > 0
-                key = (entities[0],
-                       tuple(sorted(entities[1:len(stmt.obj_from)+1])),
-                       tuple(sorted(entities[-len(stmt.obj_to):])))
-                if stmt_tuple not in stmt_by_group[key]:
-                    stmt_by_group[key].append(stmt_tuple)
-            # Now look at all other statement types
-            # All other statements will have one or two entities
-            elif len(entities) == 1:
-                # If only one entity, we only need the one key
-                # It should not be None!
-                assert None not in entities
-                key = tuple(entities)
+            key = self._get_group_key(stmt, stmt_type, eh)
+            # Complexes and Conversions, as well as statements with a single
+            # entity are grouped directly by their key
+            if stmt_type in (Complex, Conversion) or len(key) == 1:
                 if stmt_tuple not in stmt_by_group[key]:
                     stmt_by_group[key].append(stmt_tuple)
             else:
-                # Make sure we only have two entities, and they are not both
-                # None
-                key = tuple(entities)
-                assert len(key) == 2
-                assert key != (None, None)
                 # First agent is None; add in the statements, indexed by
                 # 2nd
                 if key[0] is None and stmt_tuple not in none_first[key[1]]:
@@ -355,93 +404,103 @@ class Preassembler(object):
             logger.info('combine_related: Python < 3.4 detected, '
                         'not using multiprocessing.')
         eh = self.hierarchies['entity']
-        # Make a list of Statement types
-        stmts_by_type = collections.defaultdict(lambda: [])
-        for idx, stmt in enumerate(unique_stmts):
-            stmts_by_type[indra_stmt_type(stmt)].append((idx, stmt))
-
         child_proc_groups = []
         parent_proc_groups = []
         skipped_groups = 0
-        # Each Statement type can be preassembled independently
-        for stmt_type, stmts_this_type in stmts_by_type.items():
-            logger.info('Grouping %s (%s)' %
-                        (stmt_type.__name__, len(stmts_this_type)))
-            stmt_by_group = self._get_stmt_by_group(stmt_type, stmts_this_type,
-                                                    eh)
-
-            # Divide statements by group size
-            # If we're not using multiprocessing, then all groups are local
-            for g_name, g in stmt_by_group.items():
-                if len(g) < 2:
-                    skipped_groups += 1
-                    continue
-                if use_mp and len(g) >= size_cutoff:
-                    child_proc_groups.append(g)
-                else:
-                    parent_proc_groups.append(g)
+        with self.stats.timer('grouping'):
+            # Make a list of Statement types
+            stmts_by_type = collections.defaultdict(lambda: [])
+            for idx, stmt in enumerate(unique_stmts):
+                stmts_by_type[indra_stmt_type(stmt)].append((idx, stmt))
+
+            # Each Statement type can be preassembled independently
+            for stmt_type, stmts_this_type in stmts_by_type.items():
+                logger.info('Grouping %s (%s)' %
+                            (stmt_type.__name__, len(stmts_this_type)))
+                stmt_by_group = self._get_stmt_by_group(stmt_type,
+                                                        stmts_this_type, eh)
+
+                # Divide statements by group size
+                # If we're not using multiprocessing, then all groups are
+                # local
+                for g_name, g in stmt_by_group.items():
+                    self.stats.add_group(stmt_type.__name__, len(g))
+                    if len(g) < 2:
+                        skipped_groups += 1
+                        continue
+                    if use_mp and len(g) >= size_cutoff:
+                        child_proc_groups.append(g)
+                    else:
+                        parent_proc_groups.append(g)
 
         # Now run preassembly!
         logger.debug("Groups: %d parent, %d worker, %d skipped." %
                      (len(parent_proc_groups), len(child_proc_groups),
                       skipped_groups))
 
+        counts = collections.Counter()
         supports_func = functools.partial(_set_supports_stmt_pairs,
                                           hierarchies=self.hierarchies,
                                           split_idx=split_idx,
                                           check_entities_match=False,
-                                          refinement_fun=self.refinement_fun)
+                                          refinement_fun=self.refinement_fun,
+                                          counts=counts)
 
         # Check if we are running any groups in child processes; note that if
         # use_mp is False, child_proc_groups will be empty
+        stmt_ix_map_set = set()
+        group_dir = None
         if child_proc_groups:
-            # Get a multiprocessing context
-            ctx = mp.get_context('spawn')
-            pool = ctx.Pool(poolsize)
-            # Run the large groups remotely
-            logger.debug("Running %d groups in child processes" %
-                         len(child_proc_groups))
-            res = pool.map_async(supports_func, child_proc_groups)
-            workers_ready = False
-        else:
-            workers_ready = True
-
-        # Run the small groups locally
-        logger.debug("Running %d groups in parent process" %
-                     len(parent_proc_groups))
-        stmt_ix_map = [supports_func(stmt_tuples)
-                       for stmt_tuples in parent_proc_groups]
-        logger.debug("Done running parent process groups")
-
-        while not workers_ready:
-            logger.debug("Checking child processes")
-            if res.ready():
-                workers_ready = True
-                logger.debug('Child process group comparisons successful? %s' %
-                             res.successful())
-                if not res.successful():
-                    # The get method re-raises the underlying error that we can
-                    # now catch and print.
-                    try:
-                        res.get()
-                    except Exception as e:
-                        raise Exception("Sorry, there was a problem with "
-                                        "preassembly in the child processes: %s"
-                                        % e)
-                else:
-                    stmt_ix_map += res.get()
-                logger.debug("Closing pool...")
-                pool.close()
-                logger.debug("Joining pool...")
-                pool.join()
-                logger.debug("Pool closed and joined.")
-            time.sleep(1)
+            group_dir = tempfile.mkdtemp(prefix='indra_groups_')
+        try:
+            if child_proc_groups:
+                tasks = _get_group_tasks(child_proc_groups, group_dir,
+                                         poolsize, size_cutoff, split_idx,
+                                         self.refinement_fun)
+                # Get the pool of workers, which is kept alive across calls
+                # and has its own copy of the hierarchies
+                worker_start = get_times()
+                pool = get_worker_pool(poolsize, self.hierarchies)
+                # Run the large groups remotely
+                logger.debug("Running %d groups in %d blocks in child "
+                             "processes" % (len(child_proc_groups),
+                                            len(tasks)))
+                worker_func = functools.partial(
+                    _set_supports_stmt_pairs_worker, split_idx=split_idx,
+                    refinement_fun=self.refinement_fun)
+                res = pool.imap_unordered(worker_func, tasks)
+
+            # Run the small groups locally
+            logger.debug("Running %d groups in parent process" %
+                         len(parent_proc_groups))
+            with self.stats.timer('parent_comparisons'):
+                for stmt_tuples in parent_proc_groups:
+                    stmt_ix_map_set.update(supports_func(stmt_tuples))
+            self.stats.add_comparisons(counts)
+            flush_relation_caches(self.hierarchies)
+            logger.debug("Done running parent process groups")
+
+            if child_proc_groups:
+                # Collect the results of the workers as they become available
+                try:
+                    for ix_map, task_stats in res:
+                        stmt_ix_map_set.update(ix_map)
+                        self.stats.add_worker_task(task_stats)
+                except Exception as e:
+                    close_worker_pool(terminate=True)
+                    raise Exception("Sorry, there was a problem with "
+                                    "preassembly in the child processes: %s"
+                                    % e)
+                # This includes the time spent on the parent process groups
+                # while the workers were running
+                worker_end = get_times()
+                self.stats.add_phase('worker_comparisons',
+                                     worker_end[0] - worker_start[0],
+                                     worker_end[1] - worker_start[1])
+        finally:
+            if group_dir:
+                shutil.rmtree(group_dir, ignore_errors=True)
         logger.debug("Done.")
-        # Combine all redundant map edges
-        stmt_ix_map_set = set([])
-        for group_ix_map in stmt_ix_map:
-            for ix_pair in group_ix_map:
-                stmt_ix_map_set.add(ix_pair)
         return stmt_ix_map_set
 
     def combine_related(self, return_toplevel=True, poolsize=None,
@@ -499,7 +558,10 @@ class Preassembler(object):
 
         On multi-core machines, the algorithm can be parallelized by setting
         the poolsize argument to the desired number of worker processes.
-        This feature is only available in Python > 3.4.
+        This feature is only available in Python > 3.4. The worker processes
+        are kept alive and reused by subsequent calls with the same poolsize
+        and hierarchies (see :py:func:`get_worker_pool`), and can be shut
+        down with :py:func:`close_worker_pool`.
 
         .. note:: Subfamily relationships must be consistent across arguments
 
@@ -523,8 +585,11 @@ class Preassembler(object):
         size_cutoff : Optional[int]
             Groups with size_cutoff or more statements are sent to worker
             processes, while smaller groups are compared in the parent process.
-            Default value is 100. Not relevant when parallelization is not
-            used.
+            Groups sent to workers are further split into blocks of roughly
+            size_cutoff statements (at most four blocks per worker) with a
+            similar number of comparisons, so that the comparisons within a
+            large group are spread across workers. Default value is 100. Not
+            relevant when parallelization is not used.
 
         Returns
         -------
@@ -535,7 +600,9 @@ class Preassembler(object):
             this list. However, if return_toplevel is False then all
             statements are returned, irrespective of level of specificity.
             In this case the relationships between statements can
-            be accessed via the supports/supported_by attributes.
+            be accessed via the supports/supported_by attributes. The
+            timings and comparison counts of the run are recorded in
+            :py:attr:`stats`.
 
         Examples
         --------
@@ -569,26 +636,282 @@ class Preassembler(object):
         # Generate the index map, linking related statements.
         idx_map = self._generate_id_maps(unique_stmts, poolsize, size_cutoff)
 
-        # Now iterate over all indices and set supports/supported by
-        for ix1, ix2 in idx_map:
-            unique_stmts[ix1].supported_by.append(unique_stmts[ix2])
-            unique_stmts[ix2].supports.append(unique_stmts[ix1])
-        # Get the top level statements
-        self.related_stmts = [st for st in unique_stmts if not st.supports]
+        with self.stats.timer('linking'):
+            # Now iterate over all indices and set supports/supported by
+            for ix1, ix2 in idx_map:
+                unique_stmts[ix1].supported_by.append(unique_stmts[ix2])
+                unique_stmts[ix2].supports.append(unique_stmts[ix1])
+            # Get the top level statements
+            self.related_stmts = [st for st in unique_stmts
+                                  if not st.supports]
         logger.debug('%d top level' % len(self.related_stmts))
         if return_toplevel:
             return self.related_stmts
         else:
             return unique_stmts
 
-    def find_contradicts(self):
+    def merge_statements(self, stmts, return_toplevel=True):
+        """Merge new statements into the already assembled statements.
+
+        Instead of re-running :py:meth:`combine_duplicates` and
+        :py:meth:`combine_related` on the full set of statements, the new
+        statements are first de-duplicated among themselves and then either
+        merged into an existing matching unique statement (adding their
+        evidence to it) or added as new unique statements. Each new unique
+        statement is only compared with the statements in the hierarchy
+        groups it would belong to, and only the `supports` and
+        `supported_by` links involving new statements are added.
+
+        If :py:meth:`combine_related` has not been called yet, it is called
+        internally on the current statements first. The indexes needed for
+        merging are built on the first call and are kept up to date across
+        subsequent calls.
+
+        Parameters
+        ----------
+        stmts : list of :py:class:`indra.statements.Statement`
+            Statements to merge into the current set of statements.
+        return_toplevel : Optional[bool]
+            If True only the top level statements are returned.
+            If False, all statements are returned. Default: True
+
+        Returns
+        -------
+        list of :py:class:`indra.statement.Statement`
+            The updated list of top level statements (also available as
+            :py:attr:`related_stmts`), or all unique statements if
+            return_toplevel is False.
+        """
+        if self.related_stmts is None:
+            self.combine_related()
+        if self._dup_index is None:
+            self._build_merge_index()
+
+        new_stmts = self._take_stmts(stmts)
+        self.stmts += new_stmts
+
+        # De-duplicate the new statements among themselves, then against the
+        # existing unique statements
+        new_idxs = []
+        num_merged = 0
+        with self.stats.timer('merge_duplicates'):
+            for stmt in self.combine_duplicate_stmts(new_stmts):
+                key = self.matches_fun(stmt)
+                idx = self._dup_index.get(key)
+                if idx is None:
+                    idx = len(self.unique_stmts)
+                    self.unique_stmts.append(stmt)
+                    self._dup_index[key] = idx
+                    new_idxs.append(idx)
+                else:
+                    self._merge_evidence(idx, stmt)
+                    num_merged += 1
+        logger.info('Merging %d statements: %d new unique statements, %d '
+                    'merged into existing ones.' %
+                    (len(new_stmts), len(new_idxs), num_merged))
+
+        # Connect the new unique statements to the ones they are related to
+        eh = self.hierarchies['entity']
+        num_links = 0
+        with self.stats.timer('merge_linking'):
+            for idx in new_idxs:
+                num_links += self._link_new_stmt(idx, eh)
+        logger.debug('%d new refinement links' % num_links)
+
+        self.related_stmts = [st for st in self.unique_stmts
+                              if not st.supports]
+        logger.debug('%d top level' % len(self.related_stmts))
+        if return_toplevel:
+            return self.related_stmts
+        else:
+            return self.unique_stmts
+
+    def _build_merge_index(self):
+        """Index the unique statements by matches key and hierarchy group."""
+        eh = self.hierarchies['entity']
+        self._dup_index = {}
+        self._group_index = {}
+        self._ev_key_index = {}
+        for idx, stmt in enumerate(self.unique_stmts):
+            self._dup_index[self.matches_fun(stmt)] = idx
+            self._add_to_group_index(idx, indra_stmt_type(stmt), eh)
+
+    def _add_to_group_index(self, idx, stmt_type, eh):
+        stmt = self.unique_stmts[idx]
+        key = self._get_group_key(stmt, stmt_type, eh)
+        groups, by_first, by_second = \
+            self._group_index.setdefault(stmt_type, ({}, {}, {}))
+        groups.setdefault(key, []).append(idx)
+        if stmt_type not in (Complex, Conversion) and len(key) == 2 \
+                and None not in key:
+            by_first.setdefault(key[0], set()).add(key)
+            by_second.setdefault(key[1], set()).add(key)
+        return key
+
+    def _get_candidate_idxs(self, key, stmt_type):
+        """Return indices of statements sharing a hierarchy group with key.
+
+        The candidates are the same statements that the new statement would
+        be grouped with by :py:meth:`_get_stmt_by_group` if all statements
+        were grouped together.
+        """
+        if stmt_type not in self._group_index:
+            return []
+        groups, by_first, by_second = self._group_index[stmt_type]
+        if stmt_type in (Complex, Conversion) or len(key) == 1:
+            keys = [key]
+        # A statement with a None first argument is grouped with all
+        # statements having the same second argument
+        elif key[0] is None:
+            keys = [key] + list(by_second.get(key[1], []))
+        # Similarly for statements with a None second argument
+        elif key[1] is None:
+            keys = [key] + list(by_first.get(key[0], []))
+        # Otherwise, statements with None in one of the positions and a
+        # matching other argument are grouped with the statement
+        else:
+            keys = [key, (None, key[1]), (key[0], None)]
+        return [idx for k in keys for idx in groups.get(k, [])]
+
+    def _link_new_stmt(self, idx, eh):
+        """Set supports/supported_by between a new statement and others."""
+        stmt = self.unique_stmts[idx]
+        stmt_type = indra_stmt_type(stmt)
+        key = self._get_group_key(stmt, stmt_type, eh)
+        num_links = 0
+        for other_idx in self._get_candidate_idxs(key, stmt_type):
+            other = self.unique_stmts[other_idx]
+            if self.refinement_fun(stmt, other, self.hierarchies):
+                stmt.supported_by.append(other)
+                other.supports.append(stmt)
+                num_links += 1
+            elif self.refinement_fun(other, stmt, self.hierarchies):
+                other.supported_by.append(stmt)
+                stmt.supports.append(other)
+                num_links += 1
+        self._add_to_group_index(idx, stmt_type, eh)
+        return num_links
+
+    def _merge_evidence(self, idx, stmt):
+        """Add the evidence of a matching statement to a unique statement."""
+        unique_stmt = self.unique_stmts[idx]
+        ev_keys = self._ev_key_index.get(idx)
+        if ev_keys is None:
+            ev_keys = set(_get_ev_merge_key(ev)
+                          for ev in unique_stmt.evidence)
+            self._ev_key_index[idx] = ev_keys
+        for ev in stmt.evidence:
+            ev_key = _get_ev_merge_key(ev)
+            if ev_key not in ev_keys:
+                unique_stmt.evidence.append(ev)
+                ev_keys.add(ev_key)
+        # The evidence changed so any cached full hash is now out of date
+        unique_stmt._full_hash = None
+
+    def find_contradicts(self, poolsize=None, size_cutoff=100):
         """Return pairs of contradicting Statements.
 
+        Parameters
+        ----------
+        poolsize : Optional[int]
+            The number of worker processes to use to find contradictions.
+            If None, all contradictions are found in the current process.
+            Default: None
+        size_cutoff : Optional[int]
+            Sets of candidate Statements with at least this many Statements
+            are processed by the workers if poolsize is set. Default: 100
+
         Returns
         -------
         contradicts : list(tuple(Statement, Statement))
-            A list of Statement pairs that are contradicting.
+            A list of Statement pairs that are contradicting. In pairs of
+            Statements with a polarity, the positive one comes first, e.g.,
+            the Activation before the Inhibition. In pairs of ActiveForms or
+            Influences, the Statement that comes first in `stmts` comes
+            first. The pairs are listed by the groups of Statements they
+            are found in rather than in the order of `stmts`.
+        """
+        return list(self.iter_contradicts(poolsize, size_cutoff))
+
+    def iter_contradicts(self, poolsize=None, size_cutoff=100):
+        """Yield pairs of contradicting Statements as they are found.
+
+        Statements are grouped by type, polarity and the entity hierarchy
+        components of their Agents, and within each group, a
+        :py:class:`indra.preassembler.contradiction.ContradictionIndex` is
+        used to only compare Statements whose Agents are related.
+
+        Parameters
+        ----------
+        poolsize : Optional[int]
+            The number of worker processes to use to find contradictions.
+            If None, all contradictions are found in the current process.
+            Default: None
+        size_cutoff : Optional[int]
+            Sets of candidate Statements with at least this many Statements
+            are processed by the workers if poolsize is set. Default: 100
+
+        Returns
+        -------
+        generator of tuple(Statement, Statement)
+            Pairs of contradicting Statements, in the same orientation as
+            those returned by :py:meth:`find_contradicts`. With workers, the
+            pairs found by them are yielded as they become available.
         """
+        tasks = self._get_contradiction_tasks()
+        if poolsize is None:
+            child_proc_tasks = []
+            parent_proc_tasks = tasks
+        else:
+            child_proc_tasks = [task for task in tasks
+                                if _get_task_size(task) >= size_cutoff]
+            parent_proc_tasks = [task for task in tasks
+                                 if _get_task_size(task) < size_cutoff]
+        logger.debug('Contradiction tasks: %d parent, %d worker.' %
+                     (len(parent_proc_tasks), len(child_proc_tasks)))
+        if child_proc_tasks:
+            pool = get_worker_pool(poolsize, self.hierarchies)
+            res = pool.imap_unordered(_find_contradicts_worker,
+                                      child_proc_tasks)
+        for stmts_a, stmts_b in parent_proc_tasks:
+            for ix1, ix2 in \
+                    contradiction.get_contradiction_pairs(stmts_a, stmts_b,
+                                                          self.hierarchies):
+                yield self.stmts[ix1], self.stmts[ix2]
+        if child_proc_tasks:
+            try:
+                for pairs in res:
+                    for ix1, ix2 in pairs:
+                        yield self.stmts[ix1], self.stmts[ix2]
+            except Exception as e:
+                close_worker_pool(terminate=True)
+                raise Exception("Sorry, there was a problem with finding "
+                                "contradictions in the child processes: %s"
+                                % e)
+
+    def iter_contradicting_hashes(self, poolsize=None, size_cutoff=100):
+        """Yield the hashes of contradicting Statements as they are found.
+
+        Parameters
+        ----------
+        poolsize : Optional[int]
+            The number of worker processes to use to find contradictions.
+            If None, all contradictions are found in the current process.
+            Default: None
+        size_cutoff : Optional[int]
+            Sets of candidate Statements with at least this many Statements
+            are processed by the workers if poolsize is set. Default: 100
+
+        Returns
+        -------
+        generator of tuple(int, int)
+            Pairs of shallow hashes of contradicting Statements.
+        """
+        for st1, st2 in self.iter_contradicts(poolsize, size_cutoff):
+            yield st1.get_hash(shallow=True), st2.get_hash(shallow=True)
+
+    def _get_contradiction_tasks(self):
+        """Return the sets of Statements that may contradict each other."""
         eh = self.hierarchies['entity']
 
         # Make a dict of Statement by type
@@ -603,32 +926,268 @@ class Preassembler(object):
         pos_stmts += [Activation, IncreaseAmount]
         neg_stmts += [Inhibition, DecreaseAmount]
 
-        contradicts = []
+        tasks = []
         for pst, nst in zip(pos_stmts, neg_stmts):
             poss = stmts_by_type.get(pst, [])
             negs = stmts_by_type.get(nst, [])
-
-            pos_stmt_by_group = self._get_stmt_by_group(pst, poss, eh)
-            neg_stmt_by_group = self._get_stmt_by_group(nst, negs, eh)
+            if not poss or not negs:
+                continue
+            # Statements with a None Agent can't contradict others so
+            # they are only grouped by the components of their Agents
+            pos_stmt_by_group = self._get_full_stmt_by_group(pst, poss, eh)
+            neg_stmt_by_group = self._get_full_stmt_by_group(nst, negs, eh)
             for key, pg in pos_stmt_by_group.items():
-                ng = neg_stmt_by_group.get(key, [])
-                for (_, st1), (_, st2) in itertools.product(pg, ng):
-                    if st1.contradicts(st2, self.hierarchies):
-                        contradicts.append((st1, st2))
+                ng = neg_stmt_by_group.get(key)
+                if ng:
+                    tasks.append((pg, ng))
+
+        # Handle neutral Statements next: active and inactive forms with
+        # Agents in the same component. Agents grounded outside of the
+        # closure namespaces have no component but can still be related to
+        # other Agents, so their active forms are compared with all the
+        # active forms of the other kind.
+        index = contradiction.ContradictionIndex([], self.hierarchies)
+        afs = []
+        graph_afs = ([], [])
+        for stmt_tuple in stmts_by_type.get(ActiveForm, []):
+            agent = stmt_tuple[1].agent
+            if agent is not None and index.is_graph_agent(agent):
+                graph_afs[int(stmt_tuple[1].is_active)].append(stmt_tuple)
+            else:
+                afs.append(stmt_tuple)
+        af_by_group = collections.defaultdict(lambda: ([], []))
+        for key, group in \
+                self._get_full_stmt_by_group(ActiveForm, afs, eh).items():
+            for stmt_tuple in group:
+                af_by_group[key][int(stmt_tuple[1].is_active)].append(
+                    stmt_tuple)
+        for inactive, active in af_by_group.values():
+            if inactive and active:
+                tasks.append((active, inactive))
+        graph_inactive, graph_active = graph_afs
+        all_inactive = graph_inactive + [stmt_tuple for inactive, _
+                                         in af_by_group.values()
+                                         for stmt_tuple in inactive]
+        if graph_active and all_inactive:
+            tasks.append((graph_active, all_inactive))
+        other_active = [stmt_tuple for _, active in af_by_group.values()
+                        for stmt_tuple in active]
+        if graph_inactive and other_active:
+            tasks.append((other_active, graph_inactive))
+
+        # Influences can contradict each other if their overall polarities
+        # are set and their concepts are related, either by refinement or as
+        # opposites, at both positions
+        tasks += contradiction.get_influence_groups(
+            stmts_by_type.get(Influence, []), self.hierarchies)
+        return tasks
+
+    def _get_full_stmt_by_group(self, stmt_type, stmts_this_type, eh):
+        """Group Statements that have no None Agents by their group key."""
+        stmt_by_group = collections.defaultdict(lambda: [])
+        for stmt_tuple in stmts_this_type:
+            if any(agent is None for agent in stmt_tuple[1].agent_list()):
+                continue
+            key = self._get_group_key(stmt_tuple[1], stmt_type, eh)
+            stmt_by_group[key].append(stmt_tuple)
+        return stmt_by_group
+
+
+def _get_task_size(task):
+    stmts_a, stmts_b = task
+    return len(stmts_a) + (len(stmts_b) if stmts_b else 0)
+
+
+def _find_contradicts_worker(task):
+    stmts_a, stmts_b = task
+    return contradiction.get_contradiction_pairs(stmts_a, stmts_b,
+                                                 _worker_hierarchies)
+
+
+def _use_refinement_index(stmt_tuples, split_idx, check_entities_match,
+                          refinement_fun):
+    """Return True if the refinements in a group are found using an index."""
+    return split_idx is None and not check_entities_match and \
+        refinement_fun in (None, default_refinement_fun) and \
+        len(stmt_tuples) >= refinement.min_indexed_group_size and \
+        refinement.can_index(stmt_tuples)
 
-        # Handle neutral Statements next
-        neu_stmts = [Influence, ActiveForm]
-        for stt in neu_stmts:
-            stmts = stmts_by_type.get(stt, [])
-            for (_, st1), (_, st2) in itertools.combinations(stmts, 2):
-                if st1.contradicts(st2, self.hierarchies):
-                    contradicts.append((st1, st2))
 
-        return contradicts
+def _get_group_blocks(group_size, num_blocks, balance_pairs=True):
+    """Split the statements of a group into contiguous blocks.
+
+    If balance_pairs is True, the blocks are chosen such that the number of
+    pairs (i, j) with i in the block and i < j is similar across blocks,
+    otherwise blocks have a similar number of statements.
+    """
+    num_blocks = max(1, min(num_blocks, group_size))
+    if not balance_pairs:
+        bounds = [(group_size * k) // num_blocks
+                  for k in range(num_blocks + 1)]
+    else:
+        total_pairs = group_size * (group_size - 1) // 2
+        bounds = [0]
+        pairs_so_far = 0
+        for ix in range(group_size):
+            if len(bounds) == num_blocks:
+                break
+            pairs_so_far += group_size - 1 - ix
+            if pairs_so_far * num_blocks >= total_pairs * len(bounds):
+                bounds.append(ix + 1)
+        bounds.append(group_size)
+    return [(bounds[k], bounds[k+1]) for k in range(len(bounds) - 1)
+            if bounds[k] < bounds[k+1]]
+
+
+def _init_worker(hierarchies):
+    global _worker_hierarchies
+    _worker_hierarchies = hierarchies
+
+
+def get_worker_pool(poolsize, hierarchies):
+    """Return a pool of worker processes for finding refinements.
+
+    The pool is created on first use and is reused by subsequent calls with
+    the same poolsize and hierarchies, for instance, by repeated calls to
+    :py:meth:`Preassembler.combine_related` in a long-running process. The
+    hierarchies are passed to each worker only once when it starts (and are
+    shared copy-on-write when workers are forked) instead of being sent with
+    each task. If the hierarchies were changed since the pool was started,
+    e.g., extended with `add_triples` or replaced in the dict, the workers
+    are restarted with the updated hierarchies.
+
+    Parameters
+    ----------
+    poolsize : int
+        The number of worker processes.
+    hierarchies : dict[:py:class:`indra.preassembler.hierarchy_manager`]
+        The hierarchies used by the workers.
+
+    Returns
+    -------
+    multiprocessing.pool.Pool
+        The pool of worker processes.
+    """
+    global _worker_pool, _worker_pool_args
+    # Default hierarchies are loaded before forking so that workers share
+    # them rather than each loading them
+    if isinstance(hierarchies, LazyHierarchies):
+        hierarchies.load()
+    pool_args = (poolsize, hierarchies, _get_hierarchies_state(hierarchies))
+    if _worker_pool is not None:
+        pool_poolsize, pool_hierarchies, pool_state = _worker_pool_args
+        if pool_poolsize == poolsize and pool_hierarchies is hierarchies \
+                and pool_state == pool_args[2]:
+            return _worker_pool
+        close_worker_pool()
+    ctx = get_mp_context()
+    logger.info('Starting pool of %d preassembly workers using %s' %
+                (poolsize, ctx.get_start_method()))
+    _worker_pool = ctx.Pool(poolsize, initializer=_init_worker,
+                            initargs=(hierarchies,))
+    _worker_pool_args = pool_args
+    return _worker_pool
+
+
+def _get_hierarchies_state(hierarchies):
+    # The hierarchy managers are compared by identity and their modification
+    # counts tell whether they were changed in place
+    return [(name, hm, getattr(hm, 'modification_count', 0))
+            for name, hm in sorted(hierarchies.items())]
+
+
+def close_worker_pool(terminate=False):
+    """Shut down the pool of worker processes if one is running.
+
+    Parameters
+    ----------
+    terminate : Optional[bool]
+        If True, the workers are stopped immediately, otherwise they are
+        allowed to finish outstanding work. Default: False
+    """
+    global _worker_pool, _worker_pool_args
+    if _worker_pool is None:
+        return
+    logger.debug('Closing pool of preassembly workers')
+    if terminate:
+        _worker_pool.terminate()
+    else:
+        _worker_pool.close()
+    _worker_pool.join()
+    _worker_pool = None
+    _worker_pool_args = None
+
+
+atexit.register(close_worker_pool)
+
+
+def _set_supports_stmt_pairs_worker(task, split_idx=None,
+                                    refinement_fun=None):
+    group_file, block = task
+    start_times = get_times()
+    stmt_tuples, refinement_index = \
+        _load_worker_group(group_file, split_idx, refinement_fun)
+    counts = collections.Counter()
+    ix_map = _set_supports_stmt_pairs(stmt_tuples, split_idx=split_idx,
+                                      hierarchies=_worker_hierarchies,
+                                      check_entities_match=False,
+                                      refinement_fun=refinement_fun,
+                                      block=block, counts=counts,
+                                      refinement_index=refinement_index)
+    # Results cached by this worker are made available to other workers
+    flush_relation_caches(_worker_hierarchies)
+    return ix_map, get_task_stats(counts, start_times)
+
+
+def _get_group_tasks(groups, group_dir, poolsize, size_cutoff, split_idx,
+                     refinement_fun):
+    """Return the tasks of the workers for groups of Statements.
+
+    The large groups are split into blocks of comparisons of similar size
+    so that a single large group can be spread across workers. Each group
+    is written to a file in group_dir once and its tasks only refer to the
+    file, so that the group isn't pickled again for each of its blocks.
+    """
+    tasks = []
+    for group_ix, group in enumerate(groups):
+        group_file = os.path.join(group_dir, '%d.pkl' % group_ix)
+        with open(group_file, 'wb') as fh:
+            pickle.dump(group, fh, protocol=pickle.HIGHEST_PROTOCOL)
+        num_blocks = min(poolsize * 4,
+                         (len(group) + size_cutoff - 1) // size_cutoff)
+        indexed = _use_refinement_index(group, split_idx, False,
+                                        refinement_fun)
+        for block in _get_group_blocks(len(group), num_blocks,
+                                       balance_pairs=not indexed):
+            tasks.append((group_file, block))
+    return tasks
+
+
+def _load_worker_group(group_file, split_idx, refinement_fun):
+    """Return a group of Statements written for the workers and its index.
+
+    Each worker keeps the group it loaded last, since the blocks of a group
+    are queued one after the other, so that a group is loaded and indexed
+    only once by each worker that processes some of its blocks.
+    """
+    global _worker_group
+    if _worker_group is None or _worker_group[0] != group_file:
+        # The previous group is released before the next one is loaded
+        _worker_group = None
+        with open(group_file, 'rb') as fh:
+            stmt_tuples = pickle.load(fh)
+        refinement_index = None
+        if _use_refinement_index(stmt_tuples, split_idx, False,
+                                 refinement_fun):
+            refinement_index = refinement.RefinementIndex(
+                [stmt for _, stmt in stmt_tuples], _worker_hierarchies)
+        _worker_group = (group_file, stmt_tuples, refinement_index)
+    return _worker_group[1], _worker_group[2]
 
 
 def _set_supports_stmt_pairs(stmt_tuples, split_idx=None, hierarchies=None,
-                             check_entities_match=False, refinement_fun=None):
+                             check_entities_match=False, refinement_fun=None,
+                             block=None, counts=None, refinement_index=None):
     # This is useful when deep-debugging, but even for normal debug is too much.
     # logger.debug("Getting support pairs for %d tuples with idx %s and stmts "
     #              "%s split at %s."
@@ -638,14 +1197,35 @@ def _set_supports_stmt_pairs(stmt_tuples, split_idx=None, hierarchies=None,
     #  Make the iterator by one of two methods, depending on the case
     if not refinement_fun:
         refinement_fun = default_refinement_fun
+    # If a block is given, only pairs whose first statement is in the block
+    # are considered, which allows splitting a group into independent tasks
+    start, stop = block if block is not None else (0, len(stmt_tuples))
+    # For large groups of some statement types, we can avoid comparing all
+    # pairs by only looking at the plausible generalizations of each statement
+    use_index = _use_refinement_index(stmt_tuples, split_idx,
+                                      check_entities_match, refinement_fun)
+    # If counts are collected, we count the comparisons that comparing
+    # all pairs in both directions would need, and the ones performed
+    if counts is not None:
+        counts['possible'] += _count_possible_comparisons(stmt_tuples,
+                                                          split_idx,
+                                                          (start, stop))
+        refinement_fun = _counted(refinement_fun, counts)
+    if use_index:
+        return refinement.get_refinement_pairs(
+            stmt_tuples, hierarchies, refinement_fun, block=(start, stop),
+            refinement_index=refinement_index)
     if split_idx is None:
-        stmt_pair_iter = itertools.combinations(stmt_tuples, 2)
+        stmt_pair_iter = ((stmt_tuples[i], stmt_tuples[j])
+                          for i in range(start, stop)
+                          for j in range(i + 1, len(stmt_tuples)))
     else:
         stmt_group_a = []
         stmt_group_b = []
-        for idx, stmt in stmt_tuples:
+        for pos, (idx, stmt) in enumerate(stmt_tuples):
             if idx <= split_idx:
-                stmt_group_a.append((idx, stmt))
+                if start <= pos < stop:
+                    stmt_group_a.append((idx, stmt))
             else:
                 stmt_group_b.append((idx, stmt))
         stmt_pair_iter = itertools.product(stmt_group_a, stmt_group_b)
@@ -664,6 +1244,29 @@ def _set_supports_stmt_pairs(stmt_tuples, split_idx=None, hierarchies=None,
     return ix_map
 
 
+def _count_possible_comparisons(stmt_tuples, split_idx, block):
+    """Return the number of comparisons of all pairs in a block of a group."""
+    start, stop = block
+    if split_idx is None:
+        # Each row is compared with all the statements after it
+        num_pairs = sum(len(stmt_tuples) - 1 - pos
+                        for pos in range(start, stop))
+    else:
+        num_a = sum(1 for pos, (idx, _) in enumerate(stmt_tuples)
+                    if idx <= split_idx and start <= pos < stop)
+        num_b = sum(1 for idx, _ in stmt_tuples if idx > split_idx)
+        num_pairs = num_a * num_b
+    return 2 * num_pairs
+
+
+def _counted(refinement_fun, counts):
+    """Return a refinement function which counts how often it's called."""
+    def counted_refinement_fun(st1, st2, hierarchies):
+        counts['performed'] += 1
+        return refinement_fun(st1, st2, hierarchies)
+    return counted_refinement_fun
+
+
 def render_stmt_graph(statements, reduce=True, english=False, rankdir=None,
                       agent_style=None):
     """Render the statement hierarchy as a pygraphviz graph.
@@ -869,20 +1472,33 @@ def flatten_evidence(stmts, collect_from=None):
     # Copy all of the statements--these will be the ones where we update
     # the evidence lists
     stmts = fast_deepcopy(stmts)
-    for stmt in stmts:
+    # The evidence of each statement is collected in a single pass over the
+    # statement hierarchy before any of the evidence lists are updated
+    total_evidences = _get_flattened_evidence(stmts, collect_from)
+    # The matches keys of evidences, which are shared by many statements
+    ev_keys = {}
+
+    def get_ev_key(ev):
+        ev_key = ev_keys.get(id(ev))
+        if ev_key is None:
+            ev_key = ev.matches_key()
+            ev_keys[id(ev)] = ev_key
+        return ev_key
+
+    for stmt, total_evidence in zip(stmts, total_evidences):
         # We get the original evidence keys here so we can differentiate them
         # from ones added during flattening.
-        orig_ev_keys = [ev.matches_key() for ev in stmt.evidence]
-        # We now do the flattening
-        total_evidence = _flatten_evidence_for_stmt(stmt, collect_from)
+        orig_ev_keys = {get_ev_key(ev) for ev in stmt.evidence}
         # Here we add annotations for each evidence in the list,
         # depending on whether it's an original direct evidence or one that
         # was added during flattening
         new_evidence = []
         for ev in total_evidence:
-            ev_key = ev.matches_key()
+            ev_key = get_ev_key(ev)
             if ev_key in orig_ev_keys:
                 ev.annotations['support_type'] = 'direct'
+                # The annotation is part of the key
+                ev_keys.pop(id(ev))
                 new_evidence.append(ev)
             else:
                 ev_copy = fast_deepcopy(ev)
@@ -893,14 +1509,104 @@ def flatten_evidence(stmts, collect_from=None):
     return stmts
 
 
-def _flatten_evidence_for_stmt(stmt, collect_from):
-    supp_stmts = (stmt.supports if collect_from == 'supports'
-                                else stmt.supported_by)
-    total_evidence = set(stmt.evidence)
-    for supp_stmt in supp_stmts:
-        child_evidence = _flatten_evidence_for_stmt(supp_stmt, collect_from)
-        total_evidence = total_evidence.union(child_evidence)
-    return list(total_evidence)
+def _get_flattened_evidence(stmts, collect_from):
+    """Return the evidence of each statement and the ones supporting it.
+
+    The statements reachable from the given ones are visited in topological
+    order so that the evidence set of each statement is computed once and
+    reused by all the statements it supports. The set of a statement is
+    released (or taken over by the last statement using it) as soon as no
+    other statement still needs it.
+    """
+    def get_supp_stmts(stmt):
+        return stmt.supports if collect_from == 'supports' \
+            else stmt.supported_by
+
+    # Order all reachable statements such that each statement comes after
+    # the statements it collects evidence from, and count how many
+    # statements collect evidence from each statement
+    order = []
+    num_parents = collections.Counter()
+    visited = set()
+    for root in stmts:
+        if id(root) in visited:
+            continue
+        visited.add(id(root))
+        stack = [(root, iter(get_supp_stmts(root)))]
+        while stack:
+            stmt, supp_iter = stack[-1]
+            for supp_stmt in supp_iter:
+                num_parents[id(supp_stmt)] += 1
+                if id(supp_stmt) not in visited:
+                    visited.add(id(supp_stmt))
+                    stack.append((supp_stmt, iter(get_supp_stmts(supp_stmt))))
+                    break
+            else:
+                stack.pop()
+                order.append(stmt)
+
+    requested = {id(stmt) for stmt in stmts}
+    evidence_sets = {}
+    for stmt in order:
+        supp_sets = []
+        # The sets of supporting statements that no other statement needs
+        # anymore can be released after this one
+        done_sets = []
+        for supp_stmt in get_supp_stmts(stmt):
+            key = id(supp_stmt)
+            num_parents[key] -= 1
+            # This can only be missing if the hierarchy has a cycle
+            if key not in evidence_sets:
+                continue
+            supp_sets.append(evidence_sets[key])
+            if num_parents[key] == 0 and key not in requested:
+                done_sets.append(key)
+        # We extend the largest set that is no longer needed in place
+        # instead of copying it
+        if done_sets:
+            reused = max(done_sets, key=lambda k: len(evidence_sets[k]))
+            total_evidence = evidence_sets[reused]
+        else:
+            total_evidence = set()
+        total_evidence.update(stmt.evidence)
+        for supp_set in supp_sets:
+            if supp_set is not total_evidence:
+                total_evidence.update(supp_set)
+        for key in done_sets:
+            evidence_sets.pop(key, None)
+        evidence_sets[id(stmt)] = total_evidence
+    return [list(evidence_sets[id(stmt)]) for stmt in stmts]
+
+
+def _get_ev_merge_key(ev):
+    """Return a key identifying an Evidence after duplicate combination.
+
+    The prior_uuids annotation added by
+    :py:meth:`Preassembler.combine_duplicate_stmts` is excluded since it
+    differs between otherwise identical evidences.
+    """
+    if 'prior_uuids' not in ev.annotations:
+        return ev.matches_key()
+    ev = _copy_evidence(ev)
+    ev.annotations.pop('prior_uuids')
+    return ev.matches_key()
+
+
+def _copy_evidence(ev):
+    """Return a copy of an Evidence whose annotations can be updated.
+
+    Besides the Evidence object itself, only its annotations are copied,
+    including the agents annotation and the list of prior uuids which are
+    updated in place during duplicate combination.
+    """
+    ev_copy = copy.copy(ev)
+    ev_copy.annotations = ev.annotations.copy()
+    if isinstance(ev_copy.annotations.get('agents'), dict):
+        ev_copy.annotations['agents'] = ev_copy.annotations['agents'].copy()
+    if 'prior_uuids' in ev_copy.annotations:
+        ev_copy.annotations['prior_uuids'] = \
+            list(ev_copy.annotations['prior_uuids'])
+    return ev_copy
 
 
 def default_refinement_fun(st1, st2, hierarchies):
@@ -0,0 +1,332 @@
+"""Index-based search for contradicting Statements.
+
+Two Statements of opposite polarity can only contradict each other if the
+Agents at each position are the same entity or one is an ancestor of the
+other in the entity hierarchy, and if their other attributes (e.g., the
+modified site) are the same. The :py:func:`get_contradiction_pairs`
+function indexes a set of Statements along these dimensions so that each
+Statement of the other polarity is only compared against plausible
+candidates instead of every Statement.
+"""
+from __future__ import absolute_import, print_function, unicode_literals
+from builtins import dict, str
+import logging
+import itertools
+import collections
+from indra.statements import *
+
+logger = logging.getLogger(__name__)
+
+
+# Key of Agents grounded outside of the namespaces with a precomputed
+# transitive closure, which can be related to any other Agent
+_graph_key = ('graph',)
+
+
+def get_contradiction_pairs(stmt_tuples_a, stmt_tuples_b, hierarchies):
+    """Return the contradicting pairs between two lists of Statements.
+
+    Parameters
+    ----------
+    stmt_tuples_a : list[tuple]
+        A list of (index, Statement) tuples.
+    stmt_tuples_b : list[tuple] or None
+        A list of (index, Statement) tuples with the Statements that
+        the Statements in `stmt_tuples_a` are compared to. If None, all
+        pairs of Statements in `stmt_tuples_a` are compared.
+    hierarchies : dict[:py:class:`indra.preassembler.hierarchy_manager`]
+        A dictionary of hierarchies used to determine contradictions.
+
+    Returns
+    -------
+    list[tuple]
+        A list of (index, index) tuples of contradicting Statements. The
+        first index is that of the Statement in `stmt_tuples_a`, or, when
+        comparing within `stmt_tuples_a` or comparing ActiveForms or
+        Influences, which have no polarity, the smaller one.
+    """
+    if stmt_tuples_b is None:
+        return [(ix1, ix2) for (ix1, st1), (ix2, st2)
+                in itertools.combinations(stmt_tuples_a, 2)
+                if st1.contradicts(st2, hierarchies)]
+    # Influences are grouped by get_influence_groups, so all pairs between
+    # two groups are compared, in the order of their indices
+    if isinstance(stmt_tuples_b[0][1], Influence):
+        pairs = []
+        for pair in itertools.product(stmt_tuples_a, stmt_tuples_b):
+            (ix1, st1), (ix2, st2) = sorted(pair, key=lambda x: x[0])
+            if st1.contradicts(st2, hierarchies):
+                pairs.append((ix1, ix2))
+        return pairs
+    index = ContradictionIndex(stmt_tuples_b, hierarchies)
+    pairs = []
+    for stmt_ix, stmt in stmt_tuples_a:
+        for other_ix, other in index.get_candidates(stmt):
+            if stmt.contradicts(other, hierarchies):
+                pairs.append((stmt_ix, other_ix))
+    if isinstance(stmt_tuples_b[0][1], ActiveForm):
+        pairs = sorted(tuple(sorted(pair)) for pair in pairs)
+    return pairs
+
+
+def get_influence_groups(stmt_tuples, hierarchies):
+    """Return the pairs of groups of Influences that may contradict.
+
+    Influences are grouped by their overall polarity and by the component
+    of the concepts of their subject and object in the entity hierarchy.
+    Two Influences can only contradict each other if their concepts are
+    related or opposites at both positions, and their polarities have to
+    be different if the relations at both positions are the same, and the
+    same otherwise. Only the pairs of groups for which this is possible
+    are returned.
+
+    Parameters
+    ----------
+    stmt_tuples : list[tuple]
+        A list of (index, Influence) tuples. Influences without an overall
+        polarity are skipped since they can't contradict any other.
+    hierarchies : dict[:py:class:`indra.preassembler.hierarchy_manager`]
+        A dictionary of hierarchies with keys such as 'entity' pointing to
+        HierarchyManagers.
+
+    Returns
+    -------
+    list[tuple]
+        A list of (stmt_tuples_a, stmt_tuples_b) tuples of groups to
+        compare, as taken by :py:func:`get_contradiction_pairs`, with
+        stmt_tuples_b being None if the Influences in stmt_tuples_a are
+        compared with each other.
+    """
+    eh = hierarchies['entity']
+    use_closure = bool(eh.isa_or_partof_closure)
+    uri_keys = {}
+    opposite_keys = {}
+    concept_uris = set()
+
+    def get_uri_key(uri):
+        key = uri_keys.get(uri)
+        if key is None:
+            if not use_closure or not eh._term_in_closure_namespace(uri):
+                key = _graph_key
+            else:
+                component = eh.components.get(uri)
+                key = ('uri', uri) if component is None else \
+                    ('component', component)
+            uri_keys[uri] = key
+        return key
+
+    def get_concept_key(concept):
+        db_ns, db_id = concept.get_grounding()
+        # Ungrounded concepts can only match concepts with the same name
+        if db_ns is None or db_id is None:
+            return ('name', concept.entity_matches_key())
+        uri = eh.get_uri(db_ns, db_id)
+        key = get_uri_key(uri)
+        if uri not in concept_uris:
+            concept_uris.add(uri)
+            # Opposites are recorded both ways so that it is enough to look
+            # for them from one of the groups
+            for opposite in eh.get_opposites(uri):
+                opposite_key = get_uri_key(opposite)
+                opposite_keys.setdefault(key, set()).add(opposite_key)
+                opposite_keys.setdefault(opposite_key, set()).add(key)
+        return key
+
+    groups = collections.OrderedDict()
+    for stmt_tuple in stmt_tuples:
+        stmt = stmt_tuple[1]
+        polarity = stmt.overall_polarity()
+        if polarity is None:
+            continue
+        key = (get_concept_key(stmt.subj.concept),
+               get_concept_key(stmt.obj.concept), polarity)
+        groups.setdefault(key, []).append(stmt_tuple)
+
+    def get_related_keys(concept_key):
+        return [(concept_key, False)] + \
+            [(key, True) for key in sorted(opposite_keys.get(concept_key, []))]
+
+    group_pairs = []
+    seen = set()
+    for key in groups:
+        subj_key, obj_key, polarity = key
+        # Concepts grounded outside of the closure namespaces may be related
+        # to any other, so these groups are compared with all others
+        if _graph_key in (subj_key, obj_key):
+            other_keys = list(groups)
+        else:
+            other_keys = []
+            for subj_other, subj_opposite in get_related_keys(subj_key):
+                for obj_other, obj_opposite in get_related_keys(obj_key):
+                    other_polarity = -polarity \
+                        if subj_opposite == obj_opposite else polarity
+                    other_keys.append((subj_other, obj_other, other_polarity))
+        for other_key in other_keys:
+            if other_key not in groups:
+                continue
+            pair = frozenset((key, other_key))
+            if pair not in seen:
+                seen.add(pair)
+                group_pairs.append((key, other_key))
+    tasks = []
+    for key, other_key in group_pairs:
+        if key == other_key:
+            if len(groups[key]) > 1:
+                tasks.append((groups[key], None))
+        else:
+            tasks.append((groups[key], groups[other_key]))
+    return tasks
+
+
+class ContradictionIndex(object):
+    """Index Statements by the entities of their Agents and their attributes.
+
+    Parameters
+    ----------
+    stmt_tuples : list[tuple]
+        A list of (index, Statement) tuples to index. Statements with a
+        None Agent are not indexed since they can't contradict any other
+        Statement.
+    hierarchies : dict[:py:class:`indra.preassembler.hierarchy_manager`]
+        A dictionary of hierarchies with keys such as 'entity' pointing to
+        HierarchyManagers.
+    """
+    def __init__(self, stmt_tuples, hierarchies):
+        self._eh = hierarchies['entity']
+        self._use_closure = bool(self._eh.isa_or_partof_closure)
+        self._parents = {}
+        self.stmt_tuples = []
+        self.keys = []
+        # The index of Statements by attribute key, Agent position and
+        # Agent key
+        self._index = {}
+        for stmt_tuple in stmt_tuples:
+            keys = self._get_stmt_keys(stmt_tuple[1])
+            if keys is None:
+                continue
+            ix = len(self.stmt_tuples)
+            self.stmt_tuples.append(stmt_tuple)
+            self.keys.append(keys)
+            attr_key, agent_keys = keys
+            for dim, agent_key in enumerate(agent_keys):
+                self._index.setdefault((attr_key, dim, agent_key),
+                                       []).append(ix)
+        # The indexed descendants of each entity, used to find the
+        # Statements whose Agents are more specific than a given Agent
+        self._children = {}
+        for _, agent_keys in self.keys:
+            for agent_key in agent_keys:
+                if agent_key[0] != 'uri':
+                    continue
+                for parent in self._get_parents(agent_key[1]):
+                    self._children.setdefault(parent, set()).add(agent_key)
+
+    def get_candidates(self, stmt):
+        """Return the indexed Statements that a Statement may contradict.
+
+        Parameters
+        ----------
+        stmt : indra.statements.Statement
+            A Statement of the opposite polarity of the indexed Statements.
+
+        Returns
+        -------
+        list[tuple]
+            (index, Statement) tuples of the indexed Statements that the
+            given Statement could contradict. This is a superset of the
+            actual contradictions.
+        """
+        keys = self._get_stmt_keys(stmt)
+        if keys is None:
+            return []
+        attr_key, agent_keys = keys
+        related = [self._get_related_keys(agent_key)
+                   for agent_key in agent_keys]
+        # We enumerate candidates along the most selective Agent position
+        # and filter them by the other positions
+        best = None
+        for dim, dim_related in enumerate(related):
+            if dim_related is None:
+                continue
+            candidates = set()
+            for key in dim_related:
+                candidates.update(self._index.get((attr_key, dim, key), []))
+            if best is None or len(candidates) < len(best):
+                best = candidates
+        if best is None:
+            best = {ix for ix, keys in enumerate(self.keys)
+                    if keys[0] == attr_key}
+        candidates = []
+        for ix in sorted(best):
+            other_attr_key, other_agent_keys = self.keys[ix]
+            if other_attr_key != attr_key:
+                continue
+            if any(dim_related is not None and other_key != _graph_key and
+                   other_key not in dim_related
+                   for dim_related, other_key in zip(related,
+                                                     other_agent_keys)):
+                continue
+            candidates.append(self.stmt_tuples[ix])
+        return candidates
+
+    def is_graph_agent(self, agent):
+        """Return True if an Agent can only be related to others via the graph.
+
+        This is the case for Agents grounded in a namespace without a
+        precomputed transitive closure. Such Agents have no component in the
+        entity hierarchy but may be related to any other grounded Agent.
+
+        Parameters
+        ----------
+        agent : indra.statements.Agent
+            The Agent to check.
+
+        Returns
+        -------
+        bool
+            True if the Agent is grounded outside of the closure namespaces.
+        """
+        return self._get_agent_key(agent) == _graph_key
+
+    def _get_stmt_keys(self, stmt):
+        agents = stmt.agent_list()
+        if any(agent is None for agent in agents):
+            return None
+        # Attributes that have to be the same for Statements to contradict
+        if isinstance(stmt, Modification):
+            attr_key = (stmt.residue, stmt.position)
+        elif isinstance(stmt, ActiveForm):
+            attr_key = stmt.activity
+        else:
+            attr_key = None
+        return attr_key, tuple(self._get_agent_key(agent)
+                               for agent in agents)
+
+    def _get_agent_key(self, agent):
+        db_ns, db_id = agent.get_grounding()
+        # Ungrounded Agents can only match Agents with the same name
+        if db_ns is None or db_id is None:
+            return ('name', agent.entity_matches_key())
+        uri = self._eh.get_uri(db_ns, db_id)
+        if not self._use_closure or \
+                not self._eh._term_in_closure_namespace(uri):
+            return _graph_key
+        return ('uri', uri)
+
+    def _get_related_keys(self, agent_key):
+        """Return the keys of Agents that may be related to a given Agent."""
+        if agent_key == _graph_key:
+            return None
+        related = {agent_key, _graph_key}
+        if agent_key[0] == 'uri':
+            related |= {('uri', parent)
+                        for parent in self._get_parents(agent_key[1])}
+            related |= self._children.get(agent_key[1], set())
+        return related
+
+    def _get_parents(self, uri):
+        parents = self._parents.get(uri)
+        if parents is None:
+            parents = self._eh.get_parents(uri)
+            self._parents[uri] = parents
+        return parents
@@ -190,7 +190,8 @@ class GroundingMapper(object):
         # We always standardize DB refs as a functionality in the
         # GroundingMapper. If a new module is implemented which is
         # responsible for standardizing grounding, this can be removed.
-        agent.db_refs = self.standardize_db_refs(agent.db_refs)
+        # The db_refs are copied since they may be shared with other Agents.
+        agent.db_refs = self.standardize_db_refs(dict(agent.db_refs))
         # If there is no TEXT available, we can return immediately since we
         # can't do mapping
         agent_text = agent.db_refs.get('TEXT')
@@ -391,7 +392,8 @@ class GroundingMapper(object):
             return
 
         if standardize_refs:
-            agent.db_refs = GroundingMapper.standardize_db_refs(agent.db_refs)
+            agent.db_refs = \
+                GroundingMapper.standardize_db_refs(dict(agent.db_refs))
 
         # We next look for prioritized grounding, if missing, we return
         db_ns, db_id = agent.get_grounding()
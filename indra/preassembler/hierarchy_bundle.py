@@ -0,0 +1,440 @@
+"""A compact binary format for hierarchies that can be memory-mapped.
+
+Loading the default hierarchies from a pickle means unpickling full rdflib
+graphs and sets of URI pairs in every process that uses them. A hierarchy
+bundle instead stores each hierarchy as flat arrays of integers:
+
+- a sorted table of the URIs of the terms in isa, partof and is_opposite
+  relations, such that the ID of each term is its position in the table,
+- the immediate parents, the ancestors and the descendants of each term in
+  compressed sparse row (CSR) form, i.e., an array with the IDs of the
+  related terms of all terms and an array with the position at which the
+  related terms of each term start,
+- the component of each term and a sorted table of the names of terms.
+
+The bundle file is memory-mapped read-only, so all the processes loading
+it share a single physical copy of it. A
+:py:class:`BundleHierarchyManager` loaded from a bundle is pickled as a
+reference to the file, which makes passing it to worker processes cheap.
+The bundle of the default Bio hierarchies is built by
+`indra/resources/update_resources.py` and loaded with
+`get_bio_hierarchies(from_bundle=True)`.
+"""
+from __future__ import absolute_import, print_function, unicode_literals
+from builtins import dict, str
+import os
+import sys
+import json
+import mmap
+import array
+import struct
+import bisect
+import logging
+import rdflib
+from indra.preassembler.hierarchy_manager import CompactHierarchyManager, \
+    _ClosureView, _get_reachable_sets
+
+try:
+    from collections.abc import Mapping
+except ImportError:
+    from collections import Mapping
+
+logger = logging.getLogger(__name__)
+
+
+# A bundle file starts with a magic string and the length of a JSON header
+# describing the hierarchies and the location of their arrays in the data
+# section that follows the header
+_magic = b'INDRAHB1'
+_prefix_struct = struct.Struct('<8sQ')
+_alignment = 8
+
+# The relations whose related terms are stored for each term, as CSR arrays
+_relation_arrays = ['isa_parents', 'partof_parents', 'opposites',
+                    'isa_ancestors', 'partof_ancestors', 'ancestors',
+                    'descendants']
+
+
+def save_hierarchy_bundle(hierarchies, fname):
+    """Save hierarchies into a bundle file.
+
+    Parameters
+    ----------
+    hierarchies : dict[str, HierarchyManager]
+        A dict of hierarchy managers, whose RDF graphs are used to build the
+        bundle.
+    fname : str
+        The path of the bundle file.
+    """
+    writer = _BundleWriter()
+    header = {'byteorder': sys.byteorder, 'hierarchies': {}}
+    for name, hm in hierarchies.items():
+        logger.info('Adding the %s hierarchy to the bundle' % name)
+        header['hierarchies'][name] = _add_hierarchy(writer, hm)
+    header_bytes = json.dumps(header).encode('utf-8')
+    with open(fname, 'wb') as fh:
+        fh.write(_prefix_struct.pack(_magic, len(header_bytes)))
+        fh.write(header_bytes)
+        fh.write(b'\0' * _get_padding(_prefix_struct.size +
+                                      len(header_bytes)))
+        for chunk in writer.chunks:
+            fh.write(chunk)
+
+
+def load_hierarchy_bundle(fname):
+    """Load the hierarchies of a bundle file.
+
+    Parameters
+    ----------
+    fname : str
+        The path of the bundle file.
+
+    Returns
+    -------
+    dict[str, BundleHierarchyManager]
+        A dict of hierarchy managers by their name in the bundle.
+    """
+    bundle = _get_bundle(fname)
+    return {name: BundleHierarchyManager(fname, name)
+            for name in bundle.hierarchies}
+
+
+class BundleHierarchyManager(CompactHierarchyManager):
+    """A hierarchy manager backed by a memory-mapped hierarchy bundle.
+
+    This answers the same queries as :py:class:`CompactHierarchyManager`
+    from the arrays of a bundle file instead of arrays in memory. There is
+    no RDF graph, so queries other than those of
+    :py:class:`CompactHierarchyManager`, `find_entity`, `is_opposite` and
+    `get_opposites` are not available, and the hierarchy can't be extended.
+
+    Parameters
+    ----------
+    bundle_file : str
+        The path of the bundle file.
+    name : str
+        The name of the hierarchy in the bundle, e.g., 'entity'.
+    """
+    def __init__(self, bundle_file, name):
+        self.bundle_file = os.path.abspath(bundle_file)
+        self.name = name
+        self._load()
+
+    def _load(self):
+        bundle = _get_bundle(self.bundle_file)
+        meta = bundle.hierarchies.get(self.name)
+        if meta is None:
+            raise ValueError('There is no %s hierarchy in %s' %
+                             (self.name, self.bundle_file))
+        self.build_closure = meta['build_closure']
+        self.uri_as_name = meta['uri_as_name']
+        self.relations_prefix = meta['relations_prefix']
+        self.graph = None
+        arrays = {key: bundle.get_array(spec)
+                  for key, spec in meta['arrays'].items()}
+        self._uris = _StringTable(arrays['uris'], arrays['uri_offsets'])
+        self._uri_ids = _StringIndex(self._uris)
+        self._names = _StringTable(arrays['names'], arrays['name_offsets'])
+        self._name_terms = arrays['name_terms']
+        for rel in _relation_arrays:
+            setattr(self, '_' + rel, _CSRArray(arrays[rel + '_indptr'],
+                                               arrays[rel + '_indices']))
+        self._closure_ids = arrays['closure_ids']
+        self.isa_closure = _ClosureView(self, self._isa_ancestors)
+        self.partof_closure = _ClosureView(self, self._partof_ancestors)
+        self.isa_or_partof_closure = _ClosureView(self, self._ancestors)
+        self.components = _ComponentView(self, arrays['components'])
+        self.component_counter = meta['component_counter']
+
+    def __getstate__(self):
+        return {'bundle_file': self.bundle_file, 'name': self.name}
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._load()
+
+    def initialize(self):
+        # The relations are precomputed in the bundle
+        pass
+
+    def extend_with(self, rdf_file):
+        raise NotImplementedError('Hierarchies loaded from a bundle can\'t '
+                                  'be extended.')
+
+    def add_triples(self, triples):
+        raise NotImplementedError('Hierarchies loaded from a bundle can\'t '
+                                  'be extended.')
+
+    @staticmethod
+    def _is_ancestor(ancestors, ix, jx):
+        row = ancestors[ix]
+        pos = bisect.bisect_left(row, jx)
+        return pos < len(row) and row[pos] == jx
+
+    @staticmethod
+    def _get_ancestor_ids(ancestors, ix):
+        return ancestors[ix]
+
+    def find_entity(self, x):
+        """Return the URI of the entity that has the specified name.
+
+        Parameters
+        ----------
+        x : string
+            Name or synonym for the target entity.
+        """
+        ix = self._names.find(x)
+        if ix is None:
+            return None
+        return self._uris[self._name_terms[ix]]
+
+    def is_opposite(self, ns1, id1, ns2, id2):
+        ix1 = self._uri_ids.get(self.get_uri(ns1, id1))
+        ix2 = self._uri_ids.get(self.get_uri(ns2, id2))
+        if ix1 is None or ix2 is None:
+            return False
+        return self._is_ancestor(self._opposites, ix1, ix2)
+
+    is_opposite.__doc__ = CompactHierarchyManager.is_opposite.__doc__
+
+    def get_opposites(self, uri):
+        ix = self._uri_ids.get(uri)
+        if ix is None:
+            return []
+        return [self._uris[jx] for jx in self._opposites[ix]]
+
+    get_opposites.__doc__ = CompactHierarchyManager.get_opposites.__doc__
+
+
+class _Bundle(object):
+    """A memory-mapped bundle file."""
+    def __init__(self, fname):
+        with open(fname, 'rb') as fh:
+            self._mmap = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, header_len = _prefix_struct.unpack_from(self._mmap, 0)
+        if magic != _magic:
+            raise ValueError('%s is not a hierarchy bundle.' % fname)
+        header_start = _prefix_struct.size
+        header = json.loads(self._mmap[header_start:
+                                       header_start + header_len]
+                            .decode('utf-8'))
+        if header['byteorder'] != sys.byteorder:
+            raise ValueError('%s was saved with a different byte order.' %
+                             fname)
+        # The data section starts at the first aligned position after the
+        # header
+        self._data_start = header_start + header_len + \
+            _get_padding(header_start + header_len)
+        self._view = memoryview(self._mmap)
+        self.hierarchies = header['hierarchies']
+
+    def get_array(self, spec):
+        """Return a view on an array of the bundle given its location."""
+        offset, nbytes, typecode = spec
+        start = self._data_start + offset
+        return self._view[start:start + nbytes].cast(typecode)
+
+
+# Bundles opened in this process, by the absolute path of their file, so
+# that all the hierarchies of a bundle share a single memory map
+_bundles = {}
+
+
+def _get_bundle(fname):
+    fname = os.path.abspath(fname)
+    bundle = _bundles.get(fname)
+    if bundle is None:
+        bundle = _Bundle(fname)
+        _bundles[fname] = bundle
+    return bundle
+
+
+class _BundleWriter(object):
+    """Collect the aligned arrays of the data section of a bundle."""
+    def __init__(self):
+        self.chunks = []
+        self.offset = 0
+
+    def add(self, values, typecode):
+        """Add an array and return its location in the data section."""
+        data = array.array(typecode, values).tobytes()
+        self.chunks.append(data)
+        padding = _get_padding(len(data))
+        if padding:
+            self.chunks.append(b'\0' * padding)
+        spec = [self.offset, len(data), typecode]
+        self.offset += len(data) + padding
+        return spec
+
+
+def _get_padding(size):
+    """Return the number of bytes to add to a size to align it."""
+    return -size % _alignment
+
+
+def _add_hierarchy(writer, hm):
+    """Add the arrays of a hierarchy and return its metadata."""
+    def predicate(rel_name):
+        return rdflib.term.URIRef(hm.relations_prefix + rel_name)
+
+    edges = {rel_name: [(s.toPython(), o.toPython()) for s, o in
+                        hm.graph.subject_objects(predicate(rel_name))]
+             for rel_name in ('isa', 'partof', 'is_opposite')}
+    names = sorted((o.toPython(), s.toPython()) for s, o in
+                   hm.graph.subject_objects(predicate('hasName')))
+    # Sorting strings by code point is the same as sorting their UTF-8
+    # encoding, which is how they are searched in the bundle
+    uris = sorted({uri for rel_edges in edges.values()
+                   for edge in rel_edges for uri in edge} |
+                  {uri for _, uri in names})
+    uri_ids = {uri: ix for ix, uri in enumerate(uris)}
+    adjacency = {}
+    for rel_name, rel_edges in edges.items():
+        rel_adjacency = [set() for _ in uris]
+        for child, parent in rel_edges:
+            rel_adjacency[uri_ids[child]].add(uri_ids[parent])
+        adjacency[rel_name] = rel_adjacency
+    all_parents = [isa_parents | partof_parents for isa_parents, partof_parents
+                   in zip(adjacency['isa'], adjacency['partof'])]
+    all_children = [set() for _ in uris]
+    for ix, parents in enumerate(all_parents):
+        for jx in parents:
+            all_children[jx].add(ix)
+    relations = {'isa_parents': adjacency['isa'],
+                 'partof_parents': adjacency['partof'],
+                 'opposites': adjacency['is_opposite'],
+                 'isa_ancestors': _get_reachable_rows(adjacency['isa']),
+                 'partof_ancestors': _get_reachable_rows(adjacency['partof']),
+                 'ancestors': _get_reachable_rows(all_parents),
+                 'descendants': _get_reachable_rows(all_children)}
+
+    arrays = {}
+    arrays['uris'], arrays['uri_offsets'] = _add_strings(writer, uris)
+    arrays['names'], arrays['name_offsets'] = \
+        _add_strings(writer, [name for name, _ in names])
+    arrays['name_terms'] = writer.add([uri_ids[uri] for _, uri in names], 'i')
+    for rel in _relation_arrays:
+        indptr = [0]
+        indices = []
+        for row in relations[rel]:
+            indices += sorted(row)
+            indptr.append(len(indices))
+        arrays[rel + '_indptr'] = writer.add(indptr, 'i')
+        arrays[rel + '_indices'] = writer.add(indices, 'i')
+    arrays['components'] = writer.add([hm.components.get(uri, -1)
+                                       for uri in uris], 'i')
+    arrays['closure_ids'] = \
+        writer.add([ix for ix, uri in enumerate(uris) if hm.build_closure and
+                    hm._term_in_closure_namespace(uri)], 'i')
+    return {'build_closure': hm.build_closure,
+            'uri_as_name': hm.uri_as_name,
+            'relations_prefix': hm.relations_prefix,
+            'component_counter': hm.component_counter,
+            'arrays': arrays}
+
+
+def _get_reachable_rows(adjacency):
+    """Return the IDs reachable from each ID given the adjacent IDs."""
+    reachable = _get_reachable_sets(range(len(adjacency)),
+                                    lambda ix: adjacency[ix])
+    return [reachable[ix] for ix in range(len(adjacency))]
+
+
+def _add_strings(writer, strings):
+    """Add strings as one UTF-8 encoded buffer and their offsets."""
+    encoded = [string.encode('utf-8') for string in strings]
+    offsets = [0]
+    for string in encoded:
+        offsets.append(offsets[-1] + len(string))
+    return writer.add(b''.join(encoded), 'B'), writer.add(offsets, 'i')
+
+
+class _StringTable(object):
+    """A sorted sequence of strings stored in one UTF-8 encoded buffer."""
+    def __init__(self, data, offsets):
+        self._data = data
+        self._offsets = offsets
+
+    def __getitem__(self, ix):
+        return self._get_bytes(ix).decode('utf-8')
+
+    def __len__(self):
+        return len(self._offsets) - 1
+
+    def _get_bytes(self, ix):
+        return bytes(self._data[self._offsets[ix]:self._offsets[ix + 1]])
+
+    def find(self, string):
+        """Return the position of a string or None if it isn't in the table.
+        """
+        key = string.encode('utf-8')
+        low, high = 0, len(self)
+        while low < high:
+            mid = (low + high) // 2
+            if self._get_bytes(mid) < key:
+                low = mid + 1
+            else:
+                high = mid
+        if low < len(self) and self._get_bytes(low) == key:
+            return low
+        return None
+
+
+class _StringIndex(object):
+    """Look up the position of strings in a table, caching the results."""
+    def __init__(self, table):
+        self._table = table
+        self._ids = {}
+
+    def get(self, string, default=None):
+        if string is None:
+            return default
+        try:
+            ix = self._ids[string]
+        except KeyError:
+            ix = self._table.find(string)
+            self._ids[string] = ix
+        return default if ix is None else ix
+
+    def __getitem__(self, string):
+        ix = self.get(string)
+        if ix is None:
+            raise KeyError(string)
+        return ix
+
+    def __contains__(self, string):
+        return self.get(string) is not None
+
+
+class _CSRArray(object):
+    """Rows of sorted IDs stored in compressed sparse row form."""
+    def __init__(self, indptr, indices):
+        self._indptr = indptr
+        self._indices = indices
+
+    def __getitem__(self, ix):
+        return self._indices[self._indptr[ix]:self._indptr[ix + 1]]
+
+    def __len__(self):
+        return len(self._indptr) - 1
+
+
+class _ComponentView(Mapping):
+    """A read-only dict of the component of each term of a hierarchy."""
+    def __init__(self, hierarchy, components):
+        self._hierarchy = hierarchy
+        self._components = components
+
+    def __getitem__(self, uri):
+        ix = self._hierarchy._uri_ids.get(uri)
+        if ix is None or self._components[ix] < 0:
+            raise KeyError(uri)
+        return self._components[ix]
+
+    def __iter__(self):
+        for ix, component in enumerate(self._components):
+            if component >= 0:
+                yield self._hierarchy._uris[ix]
+
+    def __len__(self):
+        return sum(1 for component in self._components if component >= 0)
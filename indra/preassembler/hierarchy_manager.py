@@ -1,8 +1,15 @@
 from __future__ import absolute_import, print_function, unicode_literals
 from builtins import dict, str
 import os
+import collections
 import rdflib
+from hashlib import md5
 import logging
+import networkx as nx
+try:
+    from collections.abc import Mapping
+except ImportError:
+    from collections import Mapping
 try:
     from functools import lru_cache
 except ImportError:
@@ -39,6 +46,9 @@ class HierarchyManager(object):
     ----------
     graph : instance of `rdflib.Graph`
         The RDF graph containing the hierarchy.
+    modification_count : int
+        The number of times the hierarchy was initialized or extended, which
+        tells whether it changed in place, e.g., through `add_triples`.
     """
     prefixes = """
         PREFIX rn: <http://sorger.med.harvard.edu/indra/relations/>
@@ -55,7 +65,12 @@ class HierarchyManager(object):
         self.isa_or_partof_closure = set()
         self.components = {}
         self._children = {}
+        self._parents = None
+        self._immediate_parents = None
+        self._name_index = None
+        self.relation_cache = None
         self.component_counter = 0
+        self.modification_count = 0
         # If an RDF file was given, we build up the internal data structures.
         # Otherwise we defer initialization until later.
         if rdf_file:
@@ -102,35 +117,224 @@ class HierarchyManager(object):
         self.initialize()
 
     def initialize(self):
+        self._set_modified()
         self.build_transitive_closures()
 
         # Build reverse lookup dict from the hierarchy
         # First get all URIs that correspond to parents
         all_parents = {parent for child, parent in self.isa_or_partof_closure}
         # We use the inverse relation here
-        rel_fun = lambda node, graph: self.isa_or_partof_objects(node,
-                                                                 inverse=True)
-        # Now for each parent we get the inverse transitive closure to
-        # get all its children nodes
+        rel_fun = lambda node: self.isa_or_partof_objects(node, inverse=True)
+        # Now we get the inverse transitive closure of all parents at once to
+        # get all their children nodes
+        children = _get_reachable_sets([rdflib.term.URIRef(parent)
+                                        for parent in all_parents], rel_fun)
         self._children = {}
         for parent in all_parents:
-            children = self.graph.transitiveClosure(rel_fun,
-                                                    rdflib.term.URIRef(parent))
-            children_uris = list(set(c.toPython() for c in children))
+            children_uris = list(set(c.toPython() for c in
+                                     children[rdflib.term.URIRef(parent)]))
             if children_uris:
                 self._children[parent] = children_uris
+        self._build_parent_index()
+        self._build_name_index()
+
+    def _set_modified(self):
+        """Record that the hierarchy was changed."""
+        self.modification_count = getattr(self, 'modification_count', 0) + 1
+        # Cached relations may not hold anymore
+        cache = getattr(self, 'relation_cache', None)
+        if cache is not None:
+            cache.clear()
+
+    def get_fingerprint(self):
+        """Return a fingerprint of the RDF graph of the hierarchy.
+
+        The fingerprint is made from the number of triples of the graph and
+        a digest of the triples that doesn't depend on their order, so that
+        the same hierarchy has the same fingerprint in different processes
+        and runs. It is computed again only after the hierarchy was changed.
+
+        Returns
+        -------
+        str
+            The fingerprint of the hierarchy.
+        """
+        modification_count = getattr(self, 'modification_count', 0)
+        fingerprint = getattr(self, '_fingerprint', None)
+        if fingerprint is None or fingerprint[0] != modification_count:
+            digest = 0
+            for triple in self.graph:
+                digest += int.from_bytes(
+                    md5('\t'.join(triple).encode('utf-8')).digest(), 'big')
+            fingerprint = (modification_count, '%d:%032x' %
+                           (len(self.graph), digest % 2**128))
+            self._fingerprint = fingerprint
+        return fingerprint[1]
+
+    def _get_relation_cache(self):
+        """Return the relation cache, tied to the current hierarchy."""
+        cache = getattr(self, 'relation_cache', None)
+        if cache is not None:
+            state = (cache, getattr(self, 'modification_count', 0))
+            if getattr(self, '_relation_cache_state', None) != state:
+                cache.set_fingerprint(self.get_fingerprint())
+                self._relation_cache_state = state
+        return cache
+
+    def _build_parent_index(self):
+        """Index the parents and immediate parents of each term."""
+        # All parents of each term in the closure
+        self._parents = {}
+        for child, parent in self.isa_or_partof_closure:
+            self._parents.setdefault(child, set()).add(parent)
+        # Immediate parents of each term in the graph
+        self._immediate_parents = {}
+        for rel in ('isa', 'partof'):
+            predicate = rdflib.term.URIRef(self.relations_prefix + rel)
+            for child, parent in self.graph.subject_objects(predicate):
+                parents = \
+                    self._immediate_parents.setdefault(child.toPython(), [])
+                if parent.toPython() not in parents:
+                    parents.append(parent.toPython())
+
+    def _build_name_index(self):
+        """Index the terms by their names given by hasName relations."""
+        self._name_index = {}
+        predicate = rdflib.term.URIRef(self.relations_prefix + 'hasName')
+        for term, name in self.graph.subject_objects(predicate):
+            name = name.toPython()
+            term = term.toPython()
+            # If several terms have the same name, we pick one consistently
+            if name not in self._name_index or term < self._name_index[name]:
+                self._name_index[name] = term
 
     def extend_with(self, rdf_file):
         """Extend the RDF graph of this HierarchyManager with another RDF file.
 
+        The closures, components and indexes are updated incrementally for
+        the terms affected by the new relations, see `add_triples`.
+
         Parameters
         ----------
         rdf_file : str
             An RDF file which is parsed such that the current graph and the
             graph described by the file are merged.
         """
-        self.graph.parse(os.path.abspath(rdf_file), format='nt')
-        self.initialize()
+        new_graph = rdflib.Graph()
+        new_graph.parse(os.path.abspath(rdf_file), format='nt')
+        self.add_triples(new_graph)
+
+    def add_triples(self, triples):
+        """Add triples to the graph and update the hierarchy incrementally.
+
+        Only the terms whose ancestors change, i.e., the subjects of new
+        isa and partof relations and their descendants, and the terms whose
+        children change, i.e., the objects of new relations and their
+        ancestors, are revisited to extend the transitive closures, the
+        parent and child indexes and the components.
+
+        Parameters
+        ----------
+        triples : iterable[tuple]
+            rdflib (subject, predicate, object) triples, e.g., an
+            rdflib.Graph. Triples already in the graph are ignored.
+        """
+        new_triples = [triple for triple in triples
+                       if triple not in self.graph]
+        for triple in new_triples:
+            self.graph.add(triple)
+        # Hierarchies pickled before these indexes were introduced are
+        # fully reinitialized instead
+        if getattr(self, '_parents', None) is None or \
+                getattr(self, '_name_index', None) is None:
+            self.initialize()
+            return
+        if new_triples:
+            self._set_modified()
+        predicates = {rdflib.term.URIRef(self.relations_prefix + rel): rel
+                      for rel in ('isa', 'partof', 'hasName')}
+        edges = []
+        for subj, pred, obj in new_triples:
+            rel = predicates.get(pred)
+            if rel == 'hasName':
+                name, term = obj.toPython(), subj.toPython()
+                if name not in self._name_index or \
+                        term < self._name_index[name]:
+                    self._name_index[name] = term
+            elif rel is not None:
+                edges.append((subj, obj))
+                parents = \
+                    self._immediate_parents.setdefault(subj.toPython(), [])
+                if obj.toPython() not in parents:
+                    parents.append(obj.toPython())
+        if edges and self.build_closure:
+            self._update_closures(edges)
+
+    def _update_closures(self, edges):
+        """Update closures, components and children given new edges."""
+        # The same terms are looked up for each relation so we cache their
+        # related terms
+        isa_rel = _get_cached_rel(self.isa_objects)
+        partof_rel = _get_cached_rel(self.partof_objects)
+        isa_or_partof_rel = lambda node: isa_rel(node) + partof_rel(node)
+        inverse_rel = _get_cached_rel(
+            lambda node: self.isa_or_partof_objects(node, inverse=True))
+        # The terms whose ancestors may have changed
+        children = list({child for child, _ in edges})
+        descendants = _get_reachable_sets(children, inverse_rel)
+        affected = set(children)
+        for child in children:
+            affected |= descendants[child]
+        nodes = [node for node in affected
+                 if self._term_in_closure_namespace(node)]
+        for rel, tc_set in ((isa_rel, self.isa_closure),
+                            (partof_rel, self.partof_closure),
+                            (isa_or_partof_rel, self.isa_or_partof_closure)):
+            pairs = set()
+            self._add_transitive_closure(rel, pairs, nodes)
+            pairs -= tc_set
+            tc_set |= pairs
+        # The last pairs are the new isa_or_partof pairs
+        new_pairs = pairs
+        for child, parent in new_pairs:
+            self._parents.setdefault(child, set()).add(parent)
+            self._add_component(child, parent)
+        # The terms whose children may have changed are the parents in the
+        # closure that are ancestors of the new edges
+        parents = list({parent for _, parent in edges})
+        ancestors = _get_reachable_sets(parents, isa_or_partof_rel)
+        affected_parents = set(parents)
+        for parent in parents:
+            affected_parents |= ancestors[parent]
+        closure_parents = {parent for _, parent in new_pairs}
+        affected_parents = [parent for parent in affected_parents
+                            if parent.toPython() in closure_parents or
+                            parent.toPython() in self._children]
+        children = _get_reachable_sets(affected_parents, inverse_rel)
+        for parent in affected_parents:
+            children_uris = list(set(c.toPython() for c in children[parent]))
+            if children_uris:
+                self._children[parent.toPython()] = children_uris
+
+    def _add_component(self, xs, ys):
+        """Put two related terms into the same component."""
+        xcomp = self.components.get(xs)
+        ycomp = self.components.get(ys)
+        if xcomp is None and ycomp is None:
+            self.components[xs] = self.components[ys] = self.component_counter
+            self.component_counter += 1
+        elif xcomp is None:
+            self.components[xs] = ycomp
+        elif ycomp is None:
+            self.components[ys] = xcomp
+        elif xcomp != ycomp:
+            # Merging two existing components requires relabeling one of
+            # them, which is rare when extending a hierarchy
+            remove_component = max(xcomp, ycomp)
+            joint_component = min(xcomp, ycomp)
+            for term, component in self.components.items():
+                if component == remove_component:
+                    self.components[term] = joint_component
 
     def build_transitive_closures(self):
         """Build the transitive closures of the hierarchy.
@@ -140,31 +344,63 @@ class HierarchyManager(object):
         as values.
         """
         self.component_counter = 0
-        for rel, tc_set in ((self.isa_objects, self.isa_closure),
-                            (self.partof_objects, self.partof_closure),
-                            (self.isa_or_partof_objects,
-                             self.isa_or_partof_closure)):
-            self.build_transitive_closure(rel, tc_set)
+        if not self.build_closure:
+            return
+        nodes = self._get_build_transitive_closure_objects()
+        # We look up the isa and partof relations of all terms at once
+        # rather than querying the graph for each term separately
+        isa = self._get_relation_adjacency('isa')
+        partof = self._get_relation_adjacency('partof')
+        isa_or_partof = {node: isa.get(node, []) + partof.get(node, [])
+                         for node in set(isa) | set(partof)}
+        for adjacency, tc_set in ((isa, self.isa_closure),
+                                  (partof, self.partof_closure),
+                                  (isa_or_partof, self.isa_or_partof_closure)):
+            self._add_transitive_closure(
+                lambda node, adj=adjacency: adj.get(node, []), tc_set, nodes)
+        self.components = _get_components(self.isa_or_partof_closure)
+        self.component_counter = len(set(self.components.values()))
 
     def build_transitive_closure(self, rel, tc_set):
-        """Build a transitive closure for a given relation in a given dict."""
+        """Build a transitive closure for a given relation in a given dict.
+
+        If the relation is isa_or_partof, the components of related terms
+        are also updated.
+        """
         # If there are no namespaces to build closures for, we
         # return immediately
         if not self.build_closure:
             return
         nodes = self._get_build_transitive_closure_objects()
-        # Make a function with the righ argument structure
-        rel_fun = lambda node, graph: rel(node)
+        self._add_transitive_closure(rel, tc_set, nodes)
+        if rel == self.isa_or_partof_objects:
+            self.components = _get_components(tc_set)
+            self.component_counter = len(set(self.components.values()))
+
+    def _add_transitive_closure(self, rel, tc_set, nodes):
+        """Add the pairs of the transitive closure of a relation to a set.
+
+        The nodes reachable from all the given nodes are found in a single
+        traversal of the graph, in which the set of nodes reachable from each
+        node is computed once and reused for all the nodes that reach it.
+        """
+        reachable = _get_reachable_sets(nodes, rel)
+        term_strs = {node: node.toPython() for node in reachable}
         for x in nodes:
-            rel_closure = self.graph.transitiveClosure(rel_fun, x)
-            xs = x.toPython()
-            for y in rel_closure:
-                ys = y.toPython()
+            xs = term_strs[x]
+            for y in reachable[x]:
+                ys = term_strs[y]
                 if xs == ys:
                     continue
                 tc_set.add((xs, ys))
-                if rel == self.isa_or_partof_objects:
-                    self._add_component(xs, ys)
+
+    def _get_relation_adjacency(self, rel_name):
+        """Return the objects of a relation for each subject in the graph."""
+        predicate = rdflib.term.URIRef(self.relations_prefix + rel_name)
+        adjacency = collections.defaultdict(list)
+        for subj, obj in self.graph.subject_objects(predicate):
+            adjacency[subj].append(obj)
+        return dict(adjacency)
 
     def _term_in_closure_namespace(self, term):
         """Return True if term is in a namespace with a closure."""
@@ -186,40 +422,6 @@ class HierarchyManager(object):
                          self._term_in_closure_namespace(node)]
         return nodes
 
-    def _add_component(self, xs, ys):
-        xcomp = self.components.get(xs)
-        ycomp = self.components.get(ys)
-        if xcomp is None:
-            if ycomp is None:
-                # Neither x nor y are in a component so we start a
-                # new component and assign x and y to the same
-                # component
-                self.components[xs] = self.component_counter
-                self.components[ys] = self.component_counter
-                self.component_counter += 1
-            else:
-                # Because y is already part of an existing component
-                # we assign its component to x
-                self.components[xs] = ycomp
-        else:
-            if ycomp is None:
-                # Because x is already part of an existing component
-                # we assign its component to y
-                self.components[ys] = xcomp
-            else:
-                # This is a special case in which both x and y are
-                # parts of components
-                # If they are in the same component then there's
-                # nothing further to do
-                if xcomp != ycomp:
-                    remove_component = max(xcomp, ycomp)
-                    joint_component = min(xcomp, ycomp)
-                    for k, v in self.components.items():
-                        if v == remove_component:
-                            self.components[k] = joint_component
-
-
-    @lru_cache(maxsize=100000)
     def find_entity(self, x):
         """
         Get the entity that has the specified name (or synonym).
@@ -229,18 +431,11 @@ class HierarchyManager(object):
         x : string
             Name or synonym for the target entity.
         """
-
-        qstr = self.prefixes + """
-            SELECT ?x WHERE {{
-                ?x rn:hasName "{0}" .
-            }}
-            """.format(x)
-        res = self.graph.query(qstr)
-        if list(res):
-            en = list(res)[0][0].toPython()
-            return en
-        else:
-            return None
+        # Hierarchies pickled before the name index was introduced
+        # don't have it so we build it here
+        if getattr(self, '_name_index', None) is None:
+            self._build_name_index()
+        return self._name_index.get(x)
 
     def isa_objects(self, node, inverse=False):
         # Normally we look for objects of the relation, but if inverted,
@@ -267,7 +462,7 @@ class HierarchyManager(object):
             yield o
 
     def directly_or_indirectly_related(self, ns1, id1, ns2, id2, closure_set,
-                                       relation_func):
+                                       relation_func, relation_name=None):
         """Return True if two entities have the speicified relationship.
 
         This relation is constructed possibly through multiple links connecting
@@ -290,6 +485,11 @@ class HierarchyManager(object):
         relation_func : function
             Function with arguments (node, graph) that generates objects
             with some relationship with node on the given graph.
+        relation_name : Optional[str]
+            The name of the relationship. If given and the HierarchyManager
+            has a `relation_cache` (see
+            :py:mod:`indra.preassembler.relation_cache`), the results of
+            graph queries are cached under this name.
 
         Returns
         -------
@@ -304,28 +504,38 @@ class HierarchyManager(object):
         elif id1 is None:
             return False
 
+        # Entries are either accessed by their URI or by their name
+        if not self.uri_as_name:
+            term1 = self.find_entity(id1)
+            term2 = self.find_entity(id2)
+            if term1 is None or term2 is None:
+                return False
+        else:
+            term1 = self.get_uri(ns1, id1)
+            term2 = self.get_uri(ns2, id2)
+
         # If both terms are in the closure set then we can just look them
         # up and return
         if closure_set:
-            term1 = self.get_uri(ns1, id1)
-            term2 = self.get_uri(ns2, id2)
             if self._term_in_closure_namespace(term1) and \
                     self._term_in_closure_namespace(term2):
                 return (term1, term2) in closure_set
 
-        # Otherwise we do an actual graph query in the RDF graph
-        if not self.uri_as_name:
-            e1 = self.find_entity(id1)
-            e2 = self.find_entity(id2)
-            if e1 is None or e2 is None:
-                return False
-            t1 = rdflib.term.URIRef(e1)
-            t2 = rdflib.term.URIRef(e2)
-        else:
-            u1 = self.get_uri(ns1, id1)
-            u2 = self.get_uri(ns2, id2)
-            t1 = rdflib.term.URIRef(u1)
-            t2 = rdflib.term.URIRef(u2)
+        # Otherwise we do an actual graph query in the RDF graph, unless its
+        # result is cached
+        cache = self._get_relation_cache()
+        if cache is not None and relation_name is not None:
+            key = (relation_name, term1, term2)
+            related = cache.get(key)
+            if related is None:
+                related = self._graph_related(term1, term2, relation_func)
+                cache.put(key, related)
+            return related
+        return self._graph_related(term1, term2, relation_func)
+
+    def _graph_related(self, term1, term2, relation_func):
+        t1 = rdflib.term.URIRef(term1)
+        t2 = rdflib.term.URIRef(term2)
         return t2 in self.graph.transitiveClosure(relation_func, t1)
 
     def isa(self, ns1, id1, ns2, id2):
@@ -351,7 +561,7 @@ class HierarchyManager(object):
         rel_fun = lambda node, graph: self.isa_objects(node)
         return self.directly_or_indirectly_related(ns1, id1, ns2, id2,
                                                    self.isa_closure,
-                                                   rel_fun)
+                                                   rel_fun, 'isa')
 
     def partof(self, ns1, id1, ns2, id2):
         """Return True if one entity is "partof" another.
@@ -376,7 +586,7 @@ class HierarchyManager(object):
         rel_fun = lambda node, graph: self.partof_objects(node)
         return self.directly_or_indirectly_related(ns1, id1, ns2, id2,
                                                    self.partof_closure,
-                                                   rel_fun)
+                                                   rel_fun, 'partof')
 
     def isa_or_partof(self, ns1, id1, ns2, id2):
         """Return True if two entities are in an "isa" or "partof" relationship
@@ -401,7 +611,7 @@ class HierarchyManager(object):
         rel_fun = lambda node, graph: self.isa_or_partof_objects(node)
         return self.directly_or_indirectly_related(ns1, id1, ns2, id2,
                                                    self.isa_or_partof_closure,
-                                                   rel_fun)
+                                                   rel_fun, 'isa_or_partof')
 
     def is_opposite(self, ns1, id1, ns2, id2):
         """Return True if two entities are in an "is_opposite" relationship
@@ -433,6 +643,23 @@ class HierarchyManager(object):
             return True
         return False
 
+    def get_opposites(self, uri):
+        """Return the terms that a given term is the opposite of.
+
+        Parameters
+        ----------
+        uri : str
+            The URI of the term.
+
+        Returns
+        -------
+        list[str]
+            The URIs of the terms that the given term is the opposite of.
+        """
+        rel = rdflib.term.URIRef(self.relations_prefix + 'is_opposite')
+        return [obj.toPython() for obj
+                in self.graph.objects(rdflib.term.URIRef(uri), rel)]
+
     def get_parents(self, uri, type='all'):
         """Return parents of a given entry.
 
@@ -446,25 +673,26 @@ class HierarchyManager(object):
             'immediate': return only the immediate parents;
             'top': return only the highest level parents
         """
-        # First do a search in the set to see if there are any parents
-        all_parents = {p for c, p in self.isa_or_partof_closure
-                       if c == uri}
+        # Hierarchies pickled before the parent index was introduced
+        # don't have it so we build it here
+        if getattr(self, '_parents', None) is None:
+            self._build_parent_index()
+        # First look up whether there are any parents in the closure
+        all_parents = self._parents.get(uri)
         # If there are no parents or we are looking for all, we can return here
-        if not all_parents or type == 'all':
-            return all_parents
-
-        # If we need immediate parents, we search again, this time knowing that
-        # the uri is definitely in the graph since it has some parents
+        if not all_parents:
+            return set()
+        if type == 'all':
+            return set(all_parents)
+
+        # If we need immediate parents, we look them up in the graph's index,
+        # knowing that the uri is definitely in the graph since it has some
+        # parents
         if type == 'immediate':
-            node = rdflib.term.URIRef(uri)
-            immediate_parents = list(set(self.isa_or_partof_objects(node)))
-            return [p.toPython() for p in immediate_parents]
+            return list(self._immediate_parents.get(uri, []))
         elif type == 'top':
-            # Here we iterate over all parents and find ones that have no
-            # parents in the closure
-            top_parents = [p for p in all_parents if
-                           not {pp for pp, _ in self.isa_or_partof_closure
-                                if pp == p}]
+            # Here we find the parents that have no parents in the closure
+            top_parents = [p for p in all_parents if p not in self._parents]
             return top_parents
 
     def get_children(self, uri):
@@ -535,6 +763,395 @@ class HierarchyManager(object):
         return (ag_ns_name, ag_id)
 
 
+class CompactHierarchyManager(HierarchyManager):
+    """Store hierarchical relationships using integer-indexed arrays.
+
+    This is an alternative to :py:class:`HierarchyManager` with the same
+    interface. Instead of sets of URI pairs and queries to the RDF graph,
+    each term in an isa or partof relation is assigned an integer ID, the
+    parents and children of each term are stored in lists indexed by ID, and
+    the ancestors and descendants of each term are precomputed as bitsets.
+    This makes `isa`, `partof`, `isa_or_partof`, `get_parents` and
+    `get_children` queries fast for all terms, including the ones in
+    namespaces for which no transitive closure would be built. The RDF graph
+    is still kept for other queries.
+
+    The `isa_closure`, `partof_closure` and `isa_or_partof_closure`
+    attributes are read-only views on the precomputed relations, restricted
+    to terms in the namespaces given by build_closure as in
+    :py:class:`HierarchyManager`.
+
+    Parameters
+    ----------
+    rdf_file : string
+        Path to the RDF file containing the hierarchy.
+    build_closure : bool or list or None
+        The namespaces whose terms are included in the closure attributes
+        and in components, see :py:class:`HierarchyManager`.
+    uri_as_name: Optional[bool]
+        If True, entries are accessed directly by their URIs. If False
+        entries are accessed by finding their name through the
+        hasName relationship. Default: True
+    """
+    def initialize(self):
+        self._set_modified()
+        isa = rdflib.term.URIRef(self.relations_prefix + 'isa')
+        partof = rdflib.term.URIRef(self.relations_prefix + 'partof')
+        # Assign an integer ID to each term in a relation
+        self._uris = []
+        self._uri_ids = {}
+        edges = {isa: [], partof: []}
+        for pred, pred_edges in edges.items():
+            for child, parent in self.graph.subject_objects(pred):
+                pred_edges.append((self._get_term_id(child.toPython()),
+                                   self._get_term_id(parent.toPython())))
+        num_terms = len(self._uris)
+        # The immediate parents of each term by relation
+        self._isa_parents = _get_adjacency(num_terms, edges[isa])
+        self._partof_parents = _get_adjacency(num_terms, edges[partof])
+        # The ancestors and descendants of each term as bitsets
+        self._isa_ancestors = _get_reachable(num_terms, edges[isa])
+        self._partof_ancestors = _get_reachable(num_terms, edges[partof])
+        all_edges = edges[isa] + edges[partof]
+        self._ancestors = _get_reachable(num_terms, all_edges)
+        self._descendants = _get_reachable(num_terms,
+                                           [(p, c) for c, p in all_edges])
+        # The terms for which the closure attributes contain relations
+        self._closure_ids = [ix for ix, uri in enumerate(self._uris)
+                             if self.build_closure and
+                             self._term_in_closure_namespace(uri)]
+        self.isa_closure = _ClosureView(self, self._isa_ancestors)
+        self.partof_closure = _ClosureView(self, self._partof_ancestors)
+        self.isa_or_partof_closure = _ClosureView(self, self._ancestors)
+        self._build_components()
+        self._build_name_index()
+
+    def build_transitive_closures(self):
+        # The relations are precomputed in initialize
+        pass
+
+    def _get_term_id(self, uri):
+        term_id = self._uri_ids.get(uri)
+        if term_id is None:
+            term_id = len(self._uris)
+            self._uri_ids[uri] = term_id
+            self._uris.append(uri)
+        return term_id
+
+    def _build_components(self):
+        """Assign terms in closure namespaces and ancestors to components.
+
+        Like in :py:class:`HierarchyManager`, two terms are in the same
+        component if they are connected by relations starting from terms in
+        the closure namespaces.
+        """
+        self.components = _get_components(self.isa_or_partof_closure)
+        self.component_counter = len(set(self.components.values()))
+
+    def _get_ids(self, ns1, id1, ns2, id2):
+        if not self.uri_as_name:
+            term1 = self.find_entity(id1)
+            term2 = self.find_entity(id2)
+        else:
+            term1 = self.get_uri(ns1, id1)
+            term2 = self.get_uri(ns2, id2)
+        return self._uri_ids.get(term1), self._uri_ids.get(term2)
+
+    def _related(self, ns1, id1, ns2, id2, ancestors):
+        # if id2 is None, or both are None, then it's by definition isa:
+        if id2 is None:
+            return True
+        # If only id1 is None, then it cannot be isa
+        elif id1 is None:
+            return False
+        ix1, ix2 = self._get_ids(ns1, id1, ns2, id2)
+        if ix1 is None or ix2 is None:
+            return False
+        # Terms are only related to themselves through a cycle, and never
+        # in the transitive closure
+        if ix1 == ix2 and self._closure_ids and \
+                self._term_in_closure_namespace(self._uris[ix1]):
+            return False
+        return self._is_ancestor(ancestors, ix1, ix2)
+
+    @staticmethod
+    def _is_ancestor(ancestors, ix, jx):
+        """Return True if term jx is reachable from term ix."""
+        return bool((ancestors[ix] >> jx) & 1)
+
+    @staticmethod
+    def _get_ancestor_ids(ancestors, ix):
+        """Return the IDs of the terms reachable from term ix in order."""
+        return list(_iter_bits(ancestors[ix]))
+
+    def isa(self, ns1, id1, ns2, id2):
+        return self._related(ns1, id1, ns2, id2, self._isa_ancestors)
+
+    def partof(self, ns1, id1, ns2, id2):
+        return self._related(ns1, id1, ns2, id2, self._partof_ancestors)
+
+    def isa_or_partof(self, ns1, id1, ns2, id2):
+        return self._related(ns1, id1, ns2, id2, self._ancestors)
+
+    isa.__doc__ = HierarchyManager.isa.__doc__
+    partof.__doc__ = HierarchyManager.partof.__doc__
+    isa_or_partof.__doc__ = HierarchyManager.isa_or_partof.__doc__
+
+    def get_parents(self, uri, type='all'):
+        """Return parents of a given entry.
+
+        Parameters
+        ----------
+        uri : str
+            The URI of the entry whose parents are to be returned. See the
+            get_uri method to construct this URI from a name space and id.
+        type : str
+            'all': return all parents irrespective of level;
+            'immediate': return only the immediate parents;
+            'top': return only the highest level parents
+        """
+        ix = self._uri_ids.get(uri)
+        if ix is None:
+            return set()
+        all_parents = {self._uris[jx] for jx in
+                       self._get_ancestor_ids(self._ancestors, ix) if jx != ix}
+        if not all_parents or type == 'all':
+            return all_parents
+        if type == 'immediate':
+            return list({self._uris[jx] for jx in
+                         set(self._isa_parents[ix]) |
+                         set(self._partof_parents[ix])})
+        elif type == 'top':
+            return [parent for parent in all_parents
+                    if not self._get_ancestor_ids(self._ancestors,
+                                                  self._uri_ids[parent])]
+
+    def get_children(self, uri):
+        """Return all (not just immediate) children of a given entry.
+
+        Parameters
+        ----------
+        uri : str
+            The URI of the entry whose children are to be returned. See the
+            get_uri method to construct this URI from a name space and id.
+        """
+        ix = self._uri_ids.get(uri)
+        if ix is None:
+            return []
+        return [self._uris[jx] for jx in
+                self._get_ancestor_ids(self._descendants, ix)]
+
+
+class _ClosureView(object):
+    """A read-only set of (term, ancestor) URI pairs of a hierarchy."""
+    def __init__(self, hierarchy, ancestors):
+        self._hierarchy = hierarchy
+        self._ancestors = ancestors
+
+    def __contains__(self, pair):
+        hm = self._hierarchy
+        ix1 = hm._uri_ids.get(pair[0])
+        ix2 = hm._uri_ids.get(pair[1])
+        if ix1 is None or ix2 is None or ix1 == ix2 or not \
+                (hm.build_closure and hm._term_in_closure_namespace(pair[0])):
+            return False
+        return hm._is_ancestor(self._ancestors, ix1, ix2)
+
+    def __iter__(self):
+        hm = self._hierarchy
+        for ix in hm._closure_ids:
+            for jx in hm._get_ancestor_ids(self._ancestors, ix):
+                if jx != ix:
+                    yield hm._uris[ix], hm._uris[jx]
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def __bool__(self):
+        hm = self._hierarchy
+        return any(jx != ix for ix in hm._closure_ids
+                   for jx in hm._get_ancestor_ids(self._ancestors, ix))
+
+    __nonzero__ = __bool__
+
+
+def _get_reachable_sets(start_nodes, rel):
+    """Return the nodes reachable from each node through a relation.
+
+    The subgraph reachable from the start nodes is traversed once using
+    Tarjan's algorithm, which finds its strongly connected components in
+    reverse topological order. The set of nodes reachable from each
+    component is therefore built from the sets of its successors, which
+    are already known. As in `rdflib.Graph.transitiveClosure`, a node is
+    only reachable from itself if it is on a cycle.
+
+    Parameters
+    ----------
+    start_nodes : list
+        The nodes whose reachable nodes are needed.
+    rel : function
+        A function that takes a node as an argument and generates the nodes
+        it is related to.
+
+    Returns
+    -------
+    dict
+        A frozenset of reachable nodes for each node visited, including the
+        start nodes.
+    """
+    index = {}
+    lowlink = {}
+    successors = {}
+    component_stack = []
+    on_stack = set()
+    reachable = {}
+
+    def visit(node):
+        index[node] = lowlink[node] = len(index)
+        successors[node] = list(rel(node))
+        component_stack.append(node)
+        on_stack.add(node)
+        return node, iter(successors[node])
+
+    for start in start_nodes:
+        if start in index:
+            continue
+        call_stack = [visit(start)]
+        while call_stack:
+            node, succ_iter = call_stack[-1]
+            for succ in succ_iter:
+                if succ not in index:
+                    call_stack.append(visit(succ))
+                    break
+                elif succ in on_stack:
+                    lowlink[node] = min(lowlink[node], index[succ])
+            else:
+                call_stack.pop()
+                if call_stack:
+                    parent = call_stack[-1][0]
+                    lowlink[parent] = min(lowlink[parent], lowlink[node])
+                if lowlink[node] != index[node]:
+                    continue
+                # The node is the root of a component whose members are on
+                # top of the stack
+                members = set()
+                while True:
+                    member = component_stack.pop()
+                    on_stack.discard(member)
+                    members.add(member)
+                    if member == node:
+                        break
+                reach = set()
+                # Nodes on a cycle can reach each other and themselves
+                on_cycle = len(members) > 1
+                for member in members:
+                    for succ in successors[member]:
+                        if succ in members:
+                            on_cycle = True
+                        elif succ not in reach:
+                            reach.add(succ)
+                            reach |= reachable[succ]
+                if on_cycle:
+                    reach |= members
+                reach = frozenset(reach)
+                for member in members:
+                    reachable[member] = reach
+    return reachable
+
+
+def _get_cached_rel(rel):
+    """Return a relation function that caches the related nodes of nodes."""
+    cache = {}
+
+    def cached_rel(node):
+        related = cache.get(node)
+        if related is None:
+            related = list(rel(node))
+            cache[node] = related
+        return related
+    return cached_rel
+
+
+def _get_components(pairs):
+    """Return the connected component of each term in a set of term pairs.
+
+    Components are numbered in the order of their smallest term so that the
+    numbering doesn't depend on the order of the pairs.
+    """
+    roots = {}
+
+    def find(term):
+        root = term
+        while roots[root] != root:
+            root = roots[root]
+        # Compress the path to the root
+        while roots[term] != root:
+            roots[term], term = root, roots[term]
+        return root
+
+    for term1, term2 in pairs:
+        roots.setdefault(term1, term1)
+        roots.setdefault(term2, term2)
+        root1, root2 = find(term1), find(term2)
+        if root1 != root2:
+            roots[max(root1, root2)] = min(root1, root2)
+    component_ids = {}
+    components = {}
+    for term in sorted(roots):
+        root = find(term)
+        if root not in component_ids:
+            component_ids[root] = len(component_ids)
+        components[term] = component_ids[root]
+    return components
+
+
+def _get_adjacency(num_terms, edges):
+    """Return the list of targets of edges from each term."""
+    adjacency = [[] for _ in range(num_terms)]
+    for source, target in edges:
+        if target not in adjacency[source]:
+            adjacency[source].append(target)
+    return [tuple(targets) for targets in adjacency]
+
+
+def _get_reachable(num_terms, edges):
+    """Return the bitset of terms reachable from each term through edges.
+
+    A term can only reach itself if it is on a cycle.
+    """
+    graph = nx.DiGraph()
+    graph.add_nodes_from(range(num_terms))
+    graph.add_edges_from(edges)
+    condensed = nx.condensation(graph)
+    reachable = [0] * num_terms
+    # We visit strongly connected components such that the components
+    # reachable from a component are visited before it
+    for component in reversed(list(nx.topological_sort(condensed))):
+        members = condensed.nodes[component]['members']
+        bits = 0
+        for succ in condensed.successors(component):
+            succ_member = next(iter(condensed.nodes[succ]['members']))
+            bits |= reachable[succ_member]
+            for member in condensed.nodes[succ]['members']:
+                bits |= 1 << member
+        # Terms on a cycle can reach each other and themselves
+        if len(members) > 1 or any(graph.has_edge(member, member)
+                                   for member in members):
+            for member in members:
+                bits |= 1 << member
+        for member in members:
+            reachable[member] = bits
+    return reachable
+
+
+def _iter_bits(bits):
+    """Yield the positions of the set bits of an integer in order."""
+    while bits:
+        low_bit = bits & -bits
+        yield low_bit.bit_length() - 1
+        bits ^= low_bit
+
+
 class YamlHierarchyManager(HierarchyManager):
     """Class to manage YAML-based hierarchies.
 
@@ -594,10 +1211,16 @@ class YamlHierarchyManager(HierarchyManager):
             root = new_root
 
         G = self.yaml_to_rdf(self.yaml_root, self.add_leaves)
-        self.load_from_rdf_graph(G)
+        # If the new graph only adds to the current one, we extend the
+        # hierarchy incrementally, otherwise we reload it
+        if all(triple in G for triple in self.graph):
+            self.add_triples(G)
+        else:
+            self.load_from_rdf_graph(G)
 
 
-def get_bio_hierarchies(from_pickle=True):
+def get_bio_hierarchies(from_pickle=True, compact=False,
+                        from_bundle=False):
     """Return default hierarchies for the Bio context.
 
     Parameters
@@ -606,13 +1229,26 @@ def get_bio_hierarchies(from_pickle=True):
         If True, hierarchies are loded from a pre-generated pickle file.
         Otherwise, they are regenerated from RDF files (slower).
         Default: True
+    compact : Optional[bool]
+        If True, the hierarchies are CompactHierarchyManagers built from
+        the RDF files, irrespective of from_pickle. Default: False
+    from_bundle : Optional[bool]
+        If True, the hierarchies are loaded from the memory-mapped bundle
+        file `resources/bio_hierarchies.bundle`, irrespective of the other
+        arguments. See :py:mod:`indra.preassembler.hierarchy_bundle`.
+        Default: False
 
     Returns
     -------
     dict[str, HierarchyManager]
         A dict of hierarchy managers for each type of hierarchy.
     """
-    if from_pickle:
+    if from_bundle:
+        from indra.preassembler.hierarchy_bundle import load_hierarchy_bundle
+        bundle_file = os.path.dirname(os.path.abspath(__file__)) + \
+            '/../resources/bio_hierarchies.bundle'
+        return load_hierarchy_bundle(bundle_file)
+    if from_pickle and not compact:
         import pickle
         hierarchy_file = os.path.dirname(os.path.abspath(__file__)) + \
             '/../resources/bio_hierarchies.pkl'
@@ -624,30 +1260,32 @@ def get_bio_hierarchies(from_pickle=True):
         return os.path.join(os.path.dirname(__file__), os.pardir, 'resources',
                             fname)
 
+    hm_class = CompactHierarchyManager if compact else HierarchyManager
     # Default entity hierarchy loaded from the RDF file at
     # `resources/entity_hierarchy.rdf`.
-    entity_hierarchy = HierarchyManager(resource_path('entity_hierarchy.rdf'),
-                                        build_closure=[
-                                            'http://identifiers.org/hgnc',
-                                            'http://identifiers.org/uniprot',
-                                            'http://identifiers.org/fplx'
-                                            ],
-                                        uri_as_name=True)
+    entity_hierarchy = hm_class(resource_path('entity_hierarchy.rdf'),
+                                build_closure=[
+                                    'http://identifiers.org/hgnc',
+                                    'http://identifiers.org/uniprot',
+                                    'http://identifiers.org/fplx'
+                                    ],
+                                uri_as_name=True)
     # Default modification hierarchy loaded from the RDF file at
     # `resources/modification_hierarchy.rdf`.
     modification_hierarchy = \
-        HierarchyManager(resource_path('modification_hierarchy.rdf'),
-                         build_closure=True, uri_as_name=True)
+        hm_class(resource_path('modification_hierarchy.rdf'),
+                 build_closure=True, uri_as_name=True)
     # Default activity hierarchy loaded from the RDF file at
     # `resources/activity_hierarchy.rdf`.
     activity_hierarchy = \
-        HierarchyManager(resource_path('activity_hierarchy.rdf'),
-                         build_closure=True, uri_as_name=True)
+        hm_class(resource_path('activity_hierarchy.rdf'),
+                 build_closure=True, uri_as_name=True)
     # Default cellular_component hierarchy loaded from the RDF file at
-    # `resources/cellular_component_hierarchy.rdf`.
+    # `resources/cellular_component_hierarchy.rdf`. Locations are looked up
+    # by name in an index and their relations in the closure.
     ccomp_hierarchy = \
-        HierarchyManager(resource_path('cellular_component_hierarchy.rdf'),
-                         build_closure=False, uri_as_name=False)
+        hm_class(resource_path('cellular_component_hierarchy.rdf'),
+                 build_closure=True, uri_as_name=False)
 
     hierarchies = {'entity': entity_hierarchy,
                    'modification': modification_hierarchy,
@@ -656,12 +1294,71 @@ def get_bio_hierarchies(from_pickle=True):
     return hierarchies
 
 
-hierarchies = get_bio_hierarchies()
+class LazyHierarchies(Mapping):
+    """A read-only dict of hierarchies that are loaded on first use.
+
+    Importing a module that uses the default hierarchies therefore doesn't
+    load them unless they are actually used. Processes that fork workers
+    can call `load` before forking so that the workers share the loaded
+    hierarchies instead of each loading them. When pickled, e.g., to send
+    to a spawned worker process, the hierarchies are loaded and pickled as
+    a dict.
+
+    Parameters
+    ----------
+    loader : function
+        A function that takes no arguments and returns the dict of
+        hierarchies, e.g., get_bio_hierarchies.
+    """
+    def __init__(self, loader):
+        self._loader = loader
+        self._hierarchies = None
+
+    @property
+    def loaded(self):
+        """True if the hierarchies have already been loaded."""
+        return self._hierarchies is not None
+
+    def load(self):
+        """Load the hierarchies if they aren't loaded yet and return them.
+
+        Returns
+        -------
+        dict[str, HierarchyManager]
+            The dict of hierarchies.
+        """
+        if self._hierarchies is None:
+            logger.info('Loading hierarchies')
+            self._hierarchies = self._loader()
+        return self._hierarchies
+
+    def __getitem__(self, key):
+        return self.load()[key]
+
+    def __iter__(self):
+        return iter(self.load())
+
+    def __len__(self):
+        return len(self.load())
+
+    def __reduce__(self):
+        return dict, (dict(self.load()),)
 
 
-def get_wm_hierarchies():
+# The default Bio hierarchies, which are loaded when they are first used
+hierarchies = LazyHierarchies(get_bio_hierarchies)
+
+
+def get_wm_hierarchies(compact=False):
     """Return default hierarchy managers for the World Modeling context.
 
+    Parameters
+    ----------
+    compact : Optional[bool]
+        If True, the entity hierarchy is a CompactHierarchyManager, which
+        answers isa queries without traversing the RDF graph.
+        Default: False
+
     Returns
     -------
     dict[str, HierarchyManager]
@@ -676,7 +1373,8 @@ def get_wm_hierarchies():
                              '../sources/cwms/trips_ontology.rdf')
     sofia_ont = os.path.join(os.path.dirname(__file__),
                              '../sources/sofia/sofia_ontology.rdf')
-    hm = HierarchyManager(eidos_ont, build_closure=False, uri_as_name=True)
+    hm_class = CompactHierarchyManager if compact else HierarchyManager
+    hm = hm_class(eidos_ont, build_closure=True, uri_as_name=True)
     hm.extend_with(hume_ont)
     hm.extend_with(trips_ont)
     hm.extend_with(sofia_ont)
@@ -54,24 +54,31 @@ class OntologyMapper(object):
                         db_id = db_id[0][0]
                     mappings = self._map_id(db_name, db_id)
                     all_mappings += mappings
+                if not all_mappings:
+                    continue
+                # The db_refs are copied on write since they may be shared
+                # with other Agents
+                db_refs = dict(agent.db_refs)
                 for map_db_name, map_db_id, score, orig_db_name in all_mappings:
-                    if map_db_name in agent.db_refs:
+                    if map_db_name in db_refs:
                         continue
                     if self.scored:
                         # If the original one is a scored grounding,
                         # we take that score and multiply it with the mapping
                         # score. Otherwise we assume the original score is 1.
                         try:
-                            orig_score = agent.db_refs[orig_db_name][0][1]
+                            orig_score = db_refs[orig_db_name][0][1]
                         except Exception:
                             orig_score = 1.0
-                        agent.db_refs[map_db_name] = \
+                        db_refs[map_db_name] = \
                             [(map_db_id, score * orig_score)]
                     else:
                         if map_db_name in ('UN', 'HUME'):
-                            agent.db_refs[map_db_name] = [(map_db_id, 1.0)]
+                            db_refs[map_db_name] = [(map_db_id, 1.0)]
                         else:
-                            agent.db_refs[map_db_name] = map_db_id
+                            db_refs[map_db_name] = map_db_id
+                if db_refs != agent.db_refs:
+                    agent.db_refs = db_refs
 
     def _add_reverse_map(self):
         for m1, m2 in self.mappings:
@@ -0,0 +1,284 @@
+"""Index-based generation of candidate refinement pairs within a group.
+
+Statements in the same hierarchy group are by default compared pairwise,
+which is quadratic in the size of the group. For the Statement types
+handled here, a Statement can only be a refinement of another one if at
+each Agent position the other Statement's Agent is the same entity, one of
+its ancestors in the entity hierarchy or (for some types) None, if the
+other Statement's site and polarity attributes are the same or less
+specific, and if the other Statement's Agents don't carry more state. The
+:py:class:`RefinementIndex` indexes the Statements of a group along these
+dimensions so that each Statement is only compared against its plausible
+generalizations.
+"""
+from __future__ import absolute_import, print_function, unicode_literals
+from builtins import dict, str
+import logging
+from indra.statements import *
+
+logger = logging.getLogger(__name__)
+
+
+# Statement types for which refinements can be found using the index
+indexed_stmt_types = (Modification, SelfModification, RegulateActivity,
+                      RegulateAmount, ActiveForm, HasActivity, Gef, Gap,
+                      Translocation)
+
+# Statement types for which a None Agent is more general than any Agent at
+# the same position
+none_generalizes_types = (Modification, RegulateAmount)
+
+# Groups smaller than this are compared pairwise since building the index
+# isn't worth it for them
+min_indexed_group_size = 10
+
+# Key of None Agents
+_none_key = ('none',)
+# Key of Agents grounded outside of the namespaces with a precomputed
+# transitive closure, for which we can't enumerate ancestors
+_graph_key = ('graph',)
+
+
+class RefinementIndex(object):
+    """Index a group of Statements by the properties relevant to refinement.
+
+    Each Statement is described by a tuple of keys, one for each Agent
+    position and one for each other attribute that a more general Statement
+    has to match. For each Statement, the set of keys allowed in each
+    dimension for Statements it could be a refinement of is also stored,
+    with None meaning that the dimension can't be used to rule out
+    candidates.
+
+    Parameters
+    ----------
+    stmts : list of :py:class:`indra.statements.Statement`
+        A list of Statements of the same type, one of the
+        `indexed_stmt_types`.
+    hierarchies : dict[:py:class:`indra.preassembler.hierarchy_manager`]
+        A dictionary of hierarchies with keys such as 'entity' pointing to
+        HierarchyManagers.
+
+    Attributes
+    ----------
+    keys : list[tuple]
+        The keys of each Statement in each dimension.
+    allowed : list[list[set or None]]
+        The keys allowed in each dimension for the Statements that each
+        Statement could be a refinement of.
+    signatures : list[tuple]
+        Summaries of the state of each Agent of each Statement.
+    """
+    def __init__(self, stmts, hierarchies):
+        self.stmts = stmts
+        self.hierarchies = hierarchies
+        self._eh = hierarchies['entity']
+        self._use_closure = bool(self._eh.isa_or_partof_closure)
+        self._parents = {}
+        self.keys = []
+        self.allowed = []
+        self.signatures = []
+        for stmt in stmts:
+            keys, allowed, signature = self._get_stmt_keys(stmt)
+            self.keys.append(keys)
+            self.allowed.append(allowed)
+            self.signatures.append(signature)
+        num_dims = len(self.keys[0]) if self.keys else 0
+        self._index = [{} for _ in range(num_dims)]
+        for ix, keys in enumerate(self.keys):
+            for dim, key in enumerate(keys):
+                self._index[dim].setdefault(key, []).append(ix)
+
+    def get_candidates(self, ix):
+        """Yield the indices of Statements that a Statement may refine.
+
+        Parameters
+        ----------
+        ix : int
+            The index of the Statement in the list of indexed Statements.
+
+        Returns
+        -------
+        generator of int
+            Indices of the Statements that the Statement at `ix` could be a
+            refinement of. This is a superset of the actual refinements.
+        """
+        allowed = self.allowed[ix]
+        # We enumerate candidates along the most selective dimension and
+        # filter them by the other dimensions
+        best_dim = None
+        best_size = None
+        for dim, dim_allowed in enumerate(allowed):
+            if dim_allowed is None:
+                continue
+            size = sum(len(self._index[dim].get(key, []))
+                       for key in dim_allowed)
+            if best_size is None or size < best_size:
+                best_dim = dim
+                best_size = size
+        if best_dim is None:
+            candidates = range(len(self.stmts))
+        else:
+            candidates = (jx for key in allowed[best_dim]
+                          for jx in self._index[best_dim].get(key, []))
+        signature = self.signatures[ix]
+        for jx in candidates:
+            if jx == ix:
+                continue
+            keys = self.keys[jx]
+            if any(dim_allowed is not None and keys[dim] not in dim_allowed
+                   for dim, dim_allowed in enumerate(allowed)):
+                continue
+            if not _signature_generalizes(self.signatures[jx], signature):
+                continue
+            yield jx
+
+    def _get_stmt_keys(self, stmt):
+        none_generalizes = isinstance(stmt, none_generalizes_types)
+        keys = []
+        allowed = []
+        signature = []
+        for agent in stmt.agent_list():
+            key, agent_allowed = self._get_agent_keys(agent, none_generalizes)
+            keys.append(key)
+            allowed.append(agent_allowed)
+            signature.append(_get_agent_signature(agent))
+        # Site of the modification: the more general Statement either has
+        # the same residue/position or doesn't specify it
+        if isinstance(stmt, (Modification, SelfModification)):
+            keys.append((stmt.residue, stmt.position))
+            allowed.append({(res, pos)
+                            for res in {stmt.residue, None}
+                            for pos in {stmt.position, None}})
+        # Polarities have to match exactly
+        elif isinstance(stmt, RegulateActivity):
+            keys.append(stmt.is_activation)
+            allowed.append({stmt.is_activation})
+        elif isinstance(stmt, ActiveForm):
+            keys.append(stmt.is_active)
+            allowed.append({stmt.is_active})
+        elif isinstance(stmt, HasActivity):
+            keys.append(stmt.has_activity)
+            allowed.append({stmt.has_activity})
+        return tuple(keys), allowed, tuple(signature)
+
+    def _get_agent_keys(self, agent, none_generalizes):
+        if agent is None:
+            return _none_key, ({_none_key} if none_generalizes else None)
+        db_ns, db_id = agent.get_grounding()
+        # Ungrounded Agents can only refine Agents with the same name
+        if db_ns is None or db_id is None:
+            key = ('name', agent.entity_matches_key())
+            allowed = {key}
+        else:
+            uri = self._eh.get_uri(db_ns, db_id)
+            # If the relations of this Agent are not precomputed, we can't
+            # restrict the candidates along this dimension
+            if not self._use_closure or \
+                    not self._eh._term_in_closure_namespace(uri):
+                return _graph_key, None
+            key = ('uri', uri)
+            allowed = {key, _graph_key}
+            allowed |= {('uri', parent) for parent in self._get_parents(uri)}
+        if none_generalizes:
+            allowed.add(_none_key)
+        return key, allowed
+
+    def _get_parents(self, uri):
+        parents = self._parents.get(uri)
+        if parents is None:
+            parents = self._eh.get_parents(uri)
+            self._parents[uri] = parents
+        return parents
+
+
+def _get_agent_signature(agent):
+    """Return a summary of Agent state that can only grow with refinement."""
+    if agent is None:
+        return None
+    return (len(agent.mods), len(agent.mutations),
+            int(bool(agent.bound_conditions)), int(agent.location is not None),
+            int(agent.activity is not None))
+
+
+def _signature_generalizes(general_sig, refined_sig):
+    for general, refined in zip(general_sig, refined_sig):
+        if general is None or refined is None:
+            continue
+        if any(g > r for g, r in zip(general, refined)):
+            return False
+    return True
+
+
+def can_index(stmt_tuples):
+    """Return True if a group of Statements can be compared using an index.
+
+    Parameters
+    ----------
+    stmt_tuples : list[tuple]
+        A list of (index, Statement) tuples.
+
+    Returns
+    -------
+    bool
+        True if all Statements have the same type which is one of the
+        `indexed_stmt_types`.
+    """
+    if not stmt_tuples:
+        return False
+    stmt_type = type(stmt_tuples[0][1])
+    if not issubclass(stmt_type, indexed_stmt_types):
+        return False
+    return all(type(stmt) == stmt_type for _, stmt in stmt_tuples)
+
+
+def get_refinement_pairs(stmt_tuples, hierarchies, refinement_fun,
+                         block=None, refinement_index=None):
+    """Return the refinement relations within a group of Statements.
+
+    The result is the same as comparing each pair of Statements in the
+    group in both directions, but only the candidates returned by a
+    :py:class:`RefinementIndex` are compared.
+
+    Parameters
+    ----------
+    stmt_tuples : list[tuple]
+        A list of (index, Statement) tuples, see :py:func:`can_index`.
+    hierarchies : dict[:py:class:`indra.preassembler.hierarchy_manager`]
+        A dictionary of hierarchies used to determine refinements.
+    refinement_fun : function
+        A function which takes two Statement objects and a hierarchies dict
+        as an argument and returns True if the first Statement is a
+        refinement of the second one.
+    block : Optional[tuple]
+        A (start, stop) tuple of positions in `stmt_tuples`. If given, only
+        the refinements of the Statements in this range are returned, which
+        allows splitting a group into independent tasks. Default: None
+    refinement_index : Optional[RefinementIndex]
+        The index of the Statements in `stmt_tuples`, which can be given so
+        that it is built only once for the blocks of a group. If not given,
+        the index is built. Default: None
+
+    Returns
+    -------
+    list[tuple]
+        A list of (index, index) tuples in which the first Statement is a
+        refinement of the second one.
+    """
+    if refinement_index is None:
+        refinement_index = RefinementIndex([stmt for _, stmt in stmt_tuples],
+                                           hierarchies)
+    start, stop = block if block is not None else (0, len(stmt_tuples))
+    ix_map = []
+    for ix in range(start, stop):
+        stmt_ix, stmt = stmt_tuples[ix]
+        for jx in refinement_index.get_candidates(ix):
+            other_ix, other = stmt_tuples[jx]
+            if not refinement_fun(stmt, other, hierarchies):
+                continue
+            # If the two Statements are refinements of each other, only the
+            # direction tested first when comparing pairs in group order is
+            # kept
+            if jx < ix and refinement_fun(other, stmt, hierarchies):
+                continue
+            ix_map.append((stmt_ix, other_ix))
+    return ix_map
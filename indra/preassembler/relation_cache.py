@@ -0,0 +1,232 @@
+"""A cache of the results of hierarchy relation queries.
+
+When a :py:class:`RelationCache` is set as the `relation_cache` attribute
+of a :py:class:`indra.preassembler.hierarchy_manager.HierarchyManager`, the
+results of `isa`, `partof` and `isa_or_partof` queries that can't be
+answered from a precomputed transitive closure, and therefore require
+traversing the RDF graph, are cached. The cache keeps a bounded number of
+results in memory, evicting the least recently used ones, and can
+optionally be backed by an SQLite file. Results written to the file are
+shared by all the processes using it, for instance, preassembly workers,
+and by later runs. The file records a fingerprint of the hierarchy whose
+results it contains, and is cleared when it is used with a different
+hierarchy, for instance, after the hierarchy was updated. Results in memory
+are cleared whenever the hierarchy is changed.
+
+Example
+-------
+>>> from indra.preassembler.hierarchy_manager import get_bio_hierarchies
+>>> from indra.preassembler.relation_cache import RelationCache
+>>> hierarchies = get_bio_hierarchies()
+>>> hierarchies['cellular_component'].relation_cache = \\
+...     RelationCache(fname='relations.sqlite')
+"""
+from __future__ import absolute_import, print_function, unicode_literals
+from builtins import dict, str
+import os
+import logging
+import sqlite3
+import collections
+
+logger = logging.getLogger(__name__)
+
+
+class RelationCache(object):
+    """A bounded LRU cache of relation query results with optional backing.
+
+    Parameters
+    ----------
+    maxsize : Optional[int]
+        The maximum number of results kept in memory. Default: 100000
+    fname : Optional[str]
+        The path of an SQLite file in which results are stored and from
+        which results missing from memory are read. If None, results are
+        only cached in memory. Default: None
+    batch_size : Optional[int]
+        The number of new results after which they are written to the
+        file. Results not yet written are written when `flush` is called.
+        Default: 1000
+
+    Attributes
+    ----------
+    hits : int
+        The number of lookups answered from memory.
+    file_hits : int
+        The number of lookups answered from the file.
+    misses : int
+        The number of lookups whose result wasn't cached.
+    evictions : int
+        The number of results evicted from memory.
+    fingerprint : str or None
+        The fingerprint of the hierarchy whose results are cached, see
+        `set_fingerprint`.
+    """
+    def __init__(self, maxsize=100000, fname=None, batch_size=1000):
+        self.maxsize = maxsize
+        self.fname = os.path.abspath(fname) if fname else None
+        self.batch_size = batch_size
+        self._cache = collections.OrderedDict()
+        self._pending = []
+        self._conn = None
+        self._conn_pid = None
+        self.hits = 0
+        self.file_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.fingerprint = None
+
+    def set_fingerprint(self, fingerprint):
+        """Set the fingerprint of the hierarchy whose results are cached.
+
+        If the fingerprint differs from the current one, the results in
+        memory are cleared. If it differs from the one recorded in the
+        file, the results in the file, which were cached for another
+        hierarchy, are cleared as well.
+
+        Parameters
+        ----------
+        fingerprint : str
+            The fingerprint of a hierarchy, e.g., returned by the
+            `get_fingerprint` method of a HierarchyManager.
+        """
+        if fingerprint == self.fingerprint:
+            return
+        self.clear()
+        self.fingerprint = fingerprint
+        if self.fname is None:
+            return
+        conn = self._get_connection()
+        with conn:
+            row = conn.execute('SELECT value FROM meta WHERE key = ?',
+                               ('fingerprint',)).fetchone()
+            if row is not None and row[0] == fingerprint:
+                return
+            if row is not None:
+                logger.info('Clearing relations cached in %s for another '
+                            'hierarchy' % self.fname)
+            conn.execute('DELETE FROM relations')
+            conn.execute('INSERT OR REPLACE INTO meta (key, value) '
+                         'VALUES (?, ?)', ('fingerprint', fingerprint))
+
+    def get(self, key):
+        """Return the cached result of a query or None if it isn't cached.
+
+        Parameters
+        ----------
+        key : tuple[str]
+            The key of the query, e.g., ('isa', uri1, uri2).
+
+        Returns
+        -------
+        bool or None
+            The result of the query, or None if it isn't cached.
+        """
+        value = self._cache.pop(key, None)
+        if value is not None:
+            # Reinserting the result makes it the most recently used one
+            self._cache[key] = value
+            self.hits += 1
+            return value
+        if self.fname is not None:
+            row = self._get_connection().execute(
+                'SELECT value FROM relations WHERE key = ?',
+                (_get_file_key(key),)).fetchone()
+            if row is not None:
+                value = bool(row[0])
+                self._add(key, value)
+                self.file_hits += 1
+                return value
+        self.misses += 1
+        return None
+
+    def put(self, key, value):
+        """Cache the result of a query.
+
+        Parameters
+        ----------
+        key : tuple[str]
+            The key of the query, e.g., ('isa', uri1, uri2).
+        value : bool
+            The result of the query.
+        """
+        self._add(key, value)
+        if self.fname is not None:
+            self._pending.append((_get_file_key(key), int(value)))
+            if len(self._pending) >= self.batch_size:
+                self.flush()
+
+    def flush(self):
+        """Write the results not yet written to the file."""
+        if not self._pending:
+            return
+        conn = self._get_connection()
+        with conn:
+            conn.executemany('INSERT OR REPLACE INTO relations (key, value) '
+                             'VALUES (?, ?)', self._pending)
+        self._pending = []
+
+    def clear(self):
+        """Remove all results from memory, without changing the file."""
+        self._cache.clear()
+        self._pending = []
+
+    def get_stats(self):
+        """Return the hit, miss and eviction counts and the cache size.
+
+        Returns
+        -------
+        dict
+            The statistics of the cache, with the fraction of lookups that
+            were hits as `hit_rate`.
+        """
+        lookups = self.hits + self.file_hits + self.misses
+        return {'hits': self.hits, 'file_hits': self.file_hits,
+                'misses': self.misses, 'evictions': self.evictions,
+                'size': len(self._cache),
+                'hit_rate': ((self.hits + self.file_hits) / lookups
+                             if lookups else None)}
+
+    def _add(self, key, value):
+        self._cache[key] = value
+        if len(self._cache) > self.maxsize:
+            self._cache.popitem(last=False)
+            self.evictions += 1
+
+    def _get_connection(self):
+        # Connections can't be shared with forked processes so each process
+        # opens its own
+        if self._conn is None or self._conn_pid != os.getpid():
+            self._conn = sqlite3.connect(self.fname, timeout=60)
+            self._conn_pid = os.getpid()
+            with self._conn:
+                self._conn.execute('CREATE TABLE IF NOT EXISTS relations '
+                                   '(key TEXT PRIMARY KEY, value INTEGER)')
+                self._conn.execute('CREATE TABLE IF NOT EXISTS meta '
+                                   '(key TEXT PRIMARY KEY, value TEXT)')
+        return self._conn
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['_conn'] = None
+        state['_conn_pid'] = None
+        state['_pending'] = []
+        return state
+
+
+def flush_relation_caches(hierarchies):
+    """Write the pending results of the relation caches of hierarchies.
+
+    Parameters
+    ----------
+    hierarchies : dict[str, HierarchyManager]
+        A dict of hierarchy managers, some of which may have a relation
+        cache.
+    """
+    for hm in hierarchies.values():
+        cache = getattr(hm, 'relation_cache', None)
+        if cache is not None:
+            cache.flush()
+
+
+def _get_file_key(key):
+    return '\t'.join(key)
@@ -0,0 +1,376 @@
+"""Sharded preassembly of Statement corpora that don't fit in memory.
+
+Refinements can only exist between Statements of the same type whose Agents
+are in the same entity hierarchy components (see
+:py:meth:`indra.preassembler.Preassembler.combine_related`). Statements can
+therefore be partitioned on disk by their type and hierarchy group key, and
+each partition can be preassembled independently, in a separate process or
+on a separate host sharing the same file system. The only exception are
+Statements with a None Agent at one of two positions (e.g., a
+Phosphorylation without an enzyme) which can be refinements of Statements
+in any group with a matching Agent at the other position. These are
+collected in a separate boundary partition which is preassembled on its own
+and then compared to the Statements of each shard in a merge step.
+
+The typical workflow is:
+
+1. Call :py:func:`partition_statements` one or more times (e.g., once for
+   each chunk of the input corpus) to distribute Statements into partition
+   files.
+2. Call :py:func:`preassemble_partition` for each partition, or
+   :py:func:`preassemble_partitions` to do so using local worker processes.
+3. Call :py:func:`merge_partitions` to add the links between the boundary
+   partition and the shards.
+4. Use the preassembled partition files directly, or load all Statements with
+   :py:func:`load_preassembled_statements`.
+
+:py:func:`run_sharded_preassembly` runs all of these steps on a single
+machine.
+
+Partition files are in JSON Lines format, with one Statement JSON per line.
+Links between Statements in different files are represented by uuids in the
+`supports` and `supported_by` fields of each Statement's JSON and are
+resolved when Statements are loaded together.
+"""
+from __future__ import absolute_import, print_function, unicode_literals
+from builtins import dict, str
+import os
+import glob
+import hashlib
+import logging
+import functools
+import collections
+from indra.statements import *
+from indra.statements import stmt_type as indra_stmt_type
+from indra.util import get_mp_context
+from indra.preassembler import Preassembler, default_refinement_fun
+
+logger = logging.getLogger(__name__)
+
+
+boundary_partition = 'boundary'
+
+
+def partition_statements(stmts, out_dir, num_shards, hierarchies=None):
+    """Append Statements to partition files according to their group key.
+
+    This function can be called repeatedly on chunks of a corpus with the
+    same out_dir and num_shards.
+
+    Parameters
+    ----------
+    stmts : list[indra.statements.Statement]
+        A list of Statements to partition.
+    out_dir : str
+        The directory in which the partitions are stored.
+    num_shards : int
+        The number of shards to distribute Statements into, in addition to
+        the boundary partition.
+    hierarchies : Optional[dict]
+        Dict of hierarchy managers used for grouping Statements. If None,
+        the default bio hierarchies are used.
+
+    Returns
+    -------
+    dict[str, int]
+        The number of Statements added to each partition.
+    """
+    hierarchies = _get_hierarchies(hierarchies)
+    pa = Preassembler(hierarchies, copy_stmts=False)
+    eh = hierarchies['entity']
+    stmts_by_partition = collections.defaultdict(list)
+    for stmt in stmts:
+        partition = _get_partition(pa, stmt, eh, num_shards)
+        stmts_by_partition[partition].append(stmt)
+    part_dir = _get_dir(out_dir, 'partitions')
+    for partition, part_stmts in stmts_by_partition.items():
+        stmts_to_jsonl_file(part_stmts,
+                            os.path.join(part_dir, partition + '.jsonl'),
+                            append=True)
+    logger.info('Partitioned %d statements into %d partitions.' %
+                (len(stmts), len(stmts_by_partition)))
+    return {partition: len(part_stmts) for partition, part_stmts
+            in stmts_by_partition.items()}
+
+
+def get_partitions(out_dir):
+    """Return the names of the partitions in a given directory."""
+    fnames = glob.glob(os.path.join(out_dir, 'partitions', '*.jsonl'))
+    return sorted(os.path.basename(fname)[:-len('.jsonl')]
+                  for fname in fnames)
+
+
+def preassemble_partition(out_dir, partition, hierarchies=None,
+                          matches_fun=None, refinement_fun=None):
+    """Combine duplicates and related Statements within a single partition.
+
+    All unique Statements of the partition are written into the
+    `preassembled` subdirectory of out_dir, irrespective of their level of
+    specificity.
+
+    Parameters
+    ----------
+    out_dir : str
+        The directory in which the partitions are stored.
+    partition : str
+        The name of the partition to preassemble.
+    hierarchies : Optional[dict]
+        Dict of hierarchy managers to use for preassembly. If None, the
+        default bio hierarchies are used.
+    matches_fun : Optional[function]
+        A function to override the built-in matches_key function of
+        statements. Statements with the same key have to be in the same
+        partition.
+    refinement_fun : Optional[function]
+        A function to override the built-in refinement_of function of
+        statements.
+
+    Returns
+    -------
+    tuple[int, int]
+        The number of Statements in the partition and the number of unique
+        Statements after preassembly.
+    """
+    hierarchies = _get_hierarchies(hierarchies)
+    stmts = stmts_from_jsonl_file(os.path.join(out_dir, 'partitions',
+                                               partition + '.jsonl'))
+    pa = Preassembler(hierarchies, stmts, matches_fun=matches_fun,
+                      refinement_fun=refinement_fun, copy_stmts=False)
+    unique_stmts = pa.combine_related(return_toplevel=False)
+    stmts_to_jsonl_file(unique_stmts,
+                        os.path.join(_get_dir(out_dir, 'preassembled'),
+                                     partition + '.jsonl'))
+    logger.info('Preassembled partition %s: %d statements, %d unique.' %
+                (partition, len(stmts), len(unique_stmts)))
+    return len(stmts), len(unique_stmts)
+
+
+def preassemble_partitions(out_dir, poolsize=None, hierarchies=None,
+                           matches_fun=None, refinement_fun=None):
+    """Preassemble all partitions, optionally in local worker processes.
+
+    Parameters
+    ----------
+    out_dir : str
+        The directory in which the partitions are stored.
+    poolsize : Optional[int]
+        The number of worker processes used to preassemble partitions in
+        parallel. If None, partitions are preassembled one after the other
+        in the current process. Default: None
+    hierarchies : Optional[dict]
+        Dict of hierarchy managers to use for preassembly. If None, the
+        default bio hierarchies are used.
+    matches_fun : Optional[function]
+        A function to override the built-in matches_key function of
+        statements.
+    refinement_fun : Optional[function]
+        A function to override the built-in refinement_of function of
+        statements.
+
+    Returns
+    -------
+    dict[str, tuple[int, int]]
+        The number of Statements and unique Statements in each partition.
+    """
+    partitions = get_partitions(out_dir)
+    part_func = functools.partial(_preassemble_partition_args,
+                                  out_dir=out_dir, hierarchies=hierarchies,
+                                  matches_fun=matches_fun,
+                                  refinement_fun=refinement_fun)
+    if poolsize is None:
+        results = [part_func(partition) for partition in partitions]
+    else:
+        pool = get_mp_context().Pool(poolsize)
+        try:
+            results = pool.map(part_func, partitions)
+        finally:
+            pool.close()
+            pool.join()
+    return dict(zip(partitions, results))
+
+
+def merge_partitions(out_dir, hierarchies=None, refinement_fun=None):
+    """Add links between the boundary partition and the shards.
+
+    Statements with a None Agent from the preassembled boundary partition
+    are kept in memory and each preassembled shard is loaded in turn and
+    compared to them. The Statements in the preassembled partition files are
+    updated with the uuids of the Statements they are related to in other
+    partitions. Running the merge again doesn't add duplicate links.
+
+    Parameters
+    ----------
+    out_dir : str
+        The directory in which the partitions are stored.
+    hierarchies : Optional[dict]
+        Dict of hierarchy managers to use for preassembly. If None, the
+        default bio hierarchies are used.
+    refinement_fun : Optional[function]
+        A function to override the built-in refinement_of function of
+        statements.
+
+    Returns
+    -------
+    int
+        The number of links added between partitions.
+    """
+    hierarchies = _get_hierarchies(hierarchies)
+    if refinement_fun is None:
+        refinement_fun = default_refinement_fun
+    pre_dir = os.path.join(out_dir, 'preassembled')
+    boundary_fname = os.path.join(pre_dir, boundary_partition + '.jsonl')
+    if not os.path.exists(boundary_fname):
+        return 0
+    pa = Preassembler(hierarchies, copy_stmts=False)
+    eh = hierarchies['entity']
+    boundary_stmts = stmts_from_jsonl_file(boundary_fname)
+    boundary_by_key = collections.defaultdict(list)
+    for stmt in boundary_stmts:
+        stmt_type = indra_stmt_type(stmt)
+        key = pa._get_group_key(stmt, stmt_type, eh)
+        boundary_by_key[(stmt_type, key)].append(stmt)
+
+    num_links = 0
+    for partition in get_partitions(out_dir):
+        fname = os.path.join(pre_dir, partition + '.jsonl')
+        if partition == boundary_partition or not os.path.exists(fname):
+            continue
+        stmts = stmts_from_jsonl_file(fname)
+        num_part_links = 0
+        for stmt in stmts:
+            stmt_type = indra_stmt_type(stmt)
+            key = pa._get_group_key(stmt, stmt_type, eh)
+            if stmt_type in (Complex, Conversion) or len(key) != 2:
+                continue
+            # Statements with a None first or second Agent are grouped with
+            # this Statement if their other Agent matches
+            others = boundary_by_key.get((stmt_type, (None, key[1])), []) + \
+                boundary_by_key.get((stmt_type, (key[0], None)), [])
+            for other in others:
+                if refinement_fun(stmt, other, hierarchies):
+                    added = _add_link(stmt, other)
+                elif refinement_fun(other, stmt, hierarchies):
+                    added = _add_link(other, stmt)
+                else:
+                    continue
+                num_part_links += added
+        if num_part_links:
+            stmts_to_jsonl_file(stmts, fname)
+        num_links += num_part_links
+    stmts_to_jsonl_file(boundary_stmts, boundary_fname)
+    logger.info('Added %d links between partitions.' % num_links)
+    return num_links
+
+
+def load_preassembled_statements(out_dir, return_toplevel=True):
+    """Load the Statements of all preassembled partitions.
+
+    Parameters
+    ----------
+    out_dir : str
+        The directory in which the partitions are stored.
+    return_toplevel : Optional[bool]
+        If True, only the top-level statements are returned. If False,
+        all statements are returned irrespective of level of specificity.
+        Default: True
+
+    Returns
+    -------
+    list[indra.statements.Statement]
+        The preassembled Statements, with supports and supported_by links
+        resolved across partitions.
+    """
+    stmts = []
+    for partition in get_partitions(out_dir):
+        fname = os.path.join(out_dir, 'preassembled', partition + '.jsonl')
+        if os.path.exists(fname):
+            stmts += iter_stmts_from_jsonl_file(fname)
+    resolve_support(stmts)
+    if return_toplevel:
+        return [stmt for stmt in stmts if not stmt.supports]
+    return stmts
+
+
+def run_sharded_preassembly(stmts, out_dir, num_shards, poolsize=None,
+                            hierarchies=None, matches_fun=None,
+                            refinement_fun=None, return_toplevel=True):
+    """Run sharded preassembly of a list of Statements on a single machine.
+
+    Parameters
+    ----------
+    stmts : list[indra.statements.Statement]
+        A list of Statements to preassemble.
+    out_dir : str
+        The directory in which the partitions are stored. It should not
+        contain partitions from a previous run.
+    num_shards : int
+        The number of shards to distribute Statements into.
+    poolsize : Optional[int]
+        The number of worker processes used to preassemble partitions in
+        parallel. If None, partitions are preassembled in the current
+        process. Default: None
+    hierarchies : Optional[dict]
+        Dict of hierarchy managers to use for preassembly. If None, the
+        default bio hierarchies are used.
+    matches_fun : Optional[function]
+        A function to override the built-in matches_key function of
+        statements.
+    refinement_fun : Optional[function]
+        A function to override the built-in refinement_of function of
+        statements.
+    return_toplevel : Optional[bool]
+        If True, only the top-level statements are returned. If False,
+        all statements are returned irrespective of level of specificity.
+        Default: True
+
+    Returns
+    -------
+    list[indra.statements.Statement]
+        The preassembled Statements.
+    """
+    partition_statements(stmts, out_dir, num_shards, hierarchies)
+    preassemble_partitions(out_dir, poolsize, hierarchies, matches_fun,
+                           refinement_fun)
+    merge_partitions(out_dir, hierarchies, refinement_fun)
+    return load_preassembled_statements(out_dir, return_toplevel)
+
+
+def _preassemble_partition_args(partition, out_dir, hierarchies,
+                                matches_fun, refinement_fun):
+    return preassemble_partition(out_dir, partition, hierarchies,
+                                 matches_fun, refinement_fun)
+
+
+def _get_partition(pa, stmt, eh, num_shards):
+    stmt_type = indra_stmt_type(stmt)
+    key = pa._get_group_key(stmt, stmt_type, eh)
+    if stmt_type not in (Complex, Conversion) and len(key) == 2 and \
+            None in key:
+        return boundary_partition
+    # We need a hash that is stable across processes and hosts
+    key_hash = hashlib.md5(str((stmt_type.__name__, key)).encode('utf-8'))
+    return 'shard_%d' % (int(key_hash.hexdigest(), 16) % num_shards)
+
+
+def _add_link(refined, general):
+    """Record that one Statement refines another from another partition."""
+    if general.uuid in {st.uuid for st in refined.supported_by}:
+        return 0
+    refined.supported_by.append(Unresolved(general.uuid))
+    general.supports.append(Unresolved(refined.uuid))
+    return 1
+
+
+def _get_hierarchies(hierarchies):
+    if hierarchies is None:
+        from indra.preassembler.hierarchy_manager import \
+            hierarchies as bio_hierarchies
+        return bio_hierarchies
+    return hierarchies
+
+
+def _get_dir(out_dir, subdir):
+    path = os.path.join(out_dir, subdir)
+    if not os.path.exists(path):
+        os.makedirs(path)
+    return path
@@ -0,0 +1,205 @@
+"""Statistics collected while running preassembly.
+
+A :py:class:`PreassemblyStats` object is attached to each
+:py:class:`indra.preassembler.Preassembler` as its `stats` attribute. It
+records the time spent in each phase of preassembly, the sizes of the
+groups of Statements that are compared to find refinements, the number of
+refinement comparisons performed compared to the number of comparisons a
+naive pairwise comparison would need, and the work done by each worker
+process.
+"""
+from __future__ import absolute_import, print_function, unicode_literals
+from builtins import dict, str
+import os
+import json
+import time
+import logging
+import contextlib
+import collections
+
+logger = logging.getLogger(__name__)
+
+
+# The CPU time of the current process, time.process_time is not available
+# on Python 2
+try:
+    _cpu_time = time.process_time
+except AttributeError:
+    _cpu_time = time.clock
+
+
+class PreassemblyStats(object):
+    """Collect timings and counters of a preassembly run.
+
+    Attributes
+    ----------
+    phases : dict[str, dict]
+        For each phase, its number of runs, total wall time and CPU time of
+        the current process in seconds.
+    group_sizes : dict[str, collections.Counter]
+        For each Statement type, the number of groups of each size.
+    comparisons : collections.Counter
+        The number of refinement comparisons that were `possible` (i.e.,
+        both directions of every pair of Statements in a group), `performed`
+        and `pruned` (i.e., not performed because of the refinement index or
+        because the first direction of a pair was already a refinement).
+    workers : dict[int, dict]
+        For each worker process ID, the number of tasks done, the wall and
+        CPU time spent on them and the number of comparisons performed.
+    """
+    def __init__(self):
+        self.phases = {}
+        self.group_sizes = collections.defaultdict(collections.Counter)
+        self.comparisons = collections.Counter()
+        self.workers = {}
+
+    @contextlib.contextmanager
+    def timer(self, phase):
+        """Time a phase of preassembly in a with block.
+
+        Parameters
+        ----------
+        phase : str
+            The name of the phase. The times of repeated phases with the
+            same name are summed.
+        """
+        start_wall = time.time()
+        start_cpu = _cpu_time()
+        try:
+            yield
+        finally:
+            self.add_phase(phase, time.time() - start_wall,
+                           _cpu_time() - start_cpu)
+
+    def add_phase(self, phase, wall_time, cpu_time):
+        """Add the wall and CPU time of a run of a phase."""
+        phase_stats = self.phases.setdefault(phase, {'runs': 0,
+                                                     'wall_time': 0.0,
+                                                     'cpu_time': 0.0})
+        phase_stats['runs'] += 1
+        phase_stats['wall_time'] += wall_time
+        phase_stats['cpu_time'] += cpu_time
+        logger.debug('%s took %.3fs (%.3fs CPU)' % (phase, wall_time,
+                                                    cpu_time))
+
+    def add_group(self, stmt_type_name, group_size):
+        """Record the size of a group of Statements of a given type."""
+        self.group_sizes[stmt_type_name][group_size] += 1
+
+    def add_comparisons(self, counts):
+        """Add counts of possible and performed refinement comparisons."""
+        self.comparisons.update(counts)
+        self.comparisons['pruned'] = \
+            self.comparisons['possible'] - self.comparisons['performed']
+
+    def add_worker_task(self, task_stats):
+        """Add the statistics of a task done by a worker process.
+
+        Parameters
+        ----------
+        task_stats : dict
+            A dict with the `pid` of the worker, the `wall_time` and
+            `cpu_time` of the task and its comparison counts.
+        """
+        worker = self.workers.setdefault(task_stats['pid'],
+                                         {'tasks': 0, 'wall_time': 0.0,
+                                          'cpu_time': 0.0, 'performed': 0})
+        worker['tasks'] += 1
+        worker['wall_time'] += task_stats['wall_time']
+        worker['cpu_time'] += task_stats['cpu_time']
+        worker['performed'] += task_stats['performed']
+        self.add_comparisons({'possible': task_stats['possible'],
+                              'performed': task_stats['performed']})
+
+    def get_group_size_histogram(self, stmt_type_name):
+        """Return the number of groups by size bins of powers of two.
+
+        Parameters
+        ----------
+        stmt_type_name : str
+            The name of the Statement type.
+
+        Returns
+        -------
+        dict[str, int]
+            The number of groups with sizes in each bin, keyed by labels
+            such as '4-7'.
+        """
+        histogram = collections.Counter()
+        for size, count in self.group_sizes[stmt_type_name].items():
+            low = 1 << (max(size, 1).bit_length() - 1)
+            high = 2 * low - 1
+            label = str(low) if low == high else '%d-%d' % (low, high)
+            histogram[(low, label)] += count
+        return {label: count
+                for (_, label), count in sorted(histogram.items())}
+
+    def to_json(self):
+        """Return the statistics as a JSON-serializable dict.
+
+        The utilization of each worker is the fraction of the wall time of
+        the phase in which workers were used that the worker was busy.
+        """
+        groups = {}
+        for stmt_type_name, sizes in sorted(self.group_sizes.items()):
+            groups[stmt_type_name] = {
+                'groups': sum(sizes.values()),
+                'statements': sum(size * count
+                                  for size, count in sizes.items()),
+                'max_size': max(sizes),
+                'histogram': self.get_group_size_histogram(stmt_type_name)
+            }
+        worker_phase_time = self.phases.get('worker_comparisons',
+                                            {}).get('wall_time')
+        workers = {}
+        for pid, worker in sorted(self.workers.items()):
+            worker = dict(worker)
+            worker['utilization'] = worker['wall_time'] / worker_phase_time \
+                if worker_phase_time else None
+            workers[str(pid)] = worker
+        return {'phases': self.phases,
+                'groups': groups,
+                'comparisons': dict(self.comparisons),
+                'workers': workers}
+
+    def dump_json(self, fname):
+        """Save the statistics into a JSON file.
+
+        Parameters
+        ----------
+        fname : str
+            The path of the JSON file.
+        """
+        with open(fname, 'w') as fh:
+            json.dump(self.to_json(), fh, indent=1)
+
+
+def get_times():
+    """Return the current wall time and CPU time of the current process."""
+    return time.time(), _cpu_time()
+
+
+def get_task_stats(counts, start_times):
+    """Return the statistics of a task done in the current process.
+
+    Parameters
+    ----------
+    counts : collections.Counter
+        The numbers of possible and performed comparisons in the task.
+    start_times : tuple
+        The wall and CPU times at the start of the task, as returned by
+        :py:func:`get_times`.
+
+    Returns
+    -------
+    dict
+        The statistics of the task, see
+        :py:meth:`PreassemblyStats.add_worker_task`.
+    """
+    start_wall, start_cpu = start_times
+    task_stats = {'pid': os.getpid(),
+                  'wall_time': time.time() - start_wall,
+                  'cpu_time': _cpu_time() - start_cpu}
+    task_stats.update({'possible': counts['possible'],
+                       'performed': counts['performed']})
+    return task_stats
@@ -22,6 +22,7 @@ from indra.preassembler.make_activity_hierarchy import \
 from indra.preassembler.make_modification_hierarchy import \
     main as make_mod_hierarchy
 from indra.preassembler.hierarchy_manager import get_bio_hierarchies
+from indra.preassembler.hierarchy_bundle import save_hierarchy_bundle
 
 path = os.path.dirname(__file__)
 logging.basicConfig(format='%(levelname)s: indra/%(name)s - %(message)s',
@@ -569,6 +570,12 @@ def update_hierarchy_pickle():
         pickle.dump(hierarchies, fh, protocol=4)
 
 
+def update_hierarchy_bundle():
+    fname = os.path.join(path, 'bio_hierarchies.bundle')
+    hierarchies = get_bio_hierarchies(from_pickle=False)
+    save_hierarchy_bundle(hierarchies, fname)
+
+
 def update_lincs_small_molecules():
     """Load the csv of LINCS small molecule metadata into a dict.
 
@@ -740,6 +747,7 @@ def main():
     update_modification_hierarchy()
     update_activity_hierarchy()
     update_hierarchy_pickle()
+    update_hierarchy_bundle()
     update_ncit_map()
     update_lincs_small_molecules()
     update_lincs_proteins()
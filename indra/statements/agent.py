@@ -12,6 +12,7 @@ from collections import OrderedDict as _o
 from indra.util import unicode_strs
 from indra.statements.statements import modtype_conditions, modtype_to_modclass
 from .concept import Concept
+from .util import KeyedObject
 from .resources import get_valid_residue, get_valid_location, activity_types, \
     amino_acids
 
@@ -43,6 +44,9 @@ class Agent(Concept):
     db_refs : dict
         Dictionary of database identifiers associated with this agent.
     """
+    __slots__ = ('mods', 'mutations', 'bound_conditions', 'activity',
+                 'location')
+
     def __init__(self, name, mods=None, activity=None,
                  bound_conditions=None, mutations=None,
                  location=None, db_refs=None):
@@ -327,14 +331,16 @@ class Agent(Concept):
             return None
         if not db_refs:
             db_refs = {}
-        agent = Agent(name, db_refs=db_refs)
-        agent.mods = [ModCondition._from_json(mod) for mod in mods]
-        agent.mutations = [MutCondition._from_json(mut) for mut in mutations]
-        agent.bound_conditions = [BoundCondition._from_json(bc)
-                                  for bc in bound_conditions]
-        agent.location = location
-        if activity:
-            agent.activity = ActivityCondition._from_json(activity)
+        agent = Agent(name, db_refs=db_refs,
+                      mods=[ModCondition._from_json(mod) for mod in mods],
+                      mutations=[MutCondition._from_json(mut)
+                                 for mut in mutations],
+                      bound_conditions=[BoundCondition._from_json(bc)
+                                        for bc in bound_conditions],
+                      activity=(ActivityCondition._from_json(activity)
+                                if activity else None))
+        if location is not None:
+            agent.location = location
         return agent
 
     def __str__(self):
@@ -365,7 +371,7 @@ class Agent(Concept):
         return '%s(%s)' % (agent_name, attr_str)
 
 
-class BoundCondition(object):
+class BoundCondition(KeyedObject):
     """Identify Agents bound (or not bound) to a given Agent in a given context.
 
     Parameters
@@ -388,6 +394,8 @@ class BoundCondition(object):
     >>> ywhab = Agent('YWHAB')
     >>> braf = Agent('BRAF', bound_conditions=[BoundCondition(ywhab, False)])
     """
+    __slots__ = ('agent', 'is_bound')
+
     def __init__(self, agent, is_bound=True):
         self.agent = agent
         self.is_bound = is_bound
@@ -424,7 +432,7 @@ class BoundCondition(object):
 
 
 @python_2_unicode_compatible
-class MutCondition(object):
+class MutCondition(KeyedObject):
     """Mutation state of an amino acid position of an Agent.
 
     Parameters
@@ -442,6 +450,8 @@ class MutCondition(object):
 
     >>> egfr_mutant = Agent('EGFR', mutations=[MutCondition('858', 'L', 'R')])
     """
+    __slots__ = ('position', 'residue_from', 'residue_to')
+
     def __init__(self, position, residue_from, residue_to=None):
         self.position = position
         self.residue_from = get_valid_residue(residue_from)
@@ -506,7 +516,7 @@ class MutCondition(object):
 
 
 @python_2_unicode_compatible
-class ModCondition(object):
+class ModCondition(KeyedObject):
     """Post-translational modification state at an amino acid position.
 
     Parameters
@@ -542,6 +552,8 @@ class ModCondition(object):
     >>> unphos_erk = Agent('MAPK1', mods=(
     ... ModCondition('phosphorylation', 'Y', '187', is_modified=False)))
     """
+    __slots__ = ('mod_type', 'residue', 'position', 'is_modified')
+
     def __init__(self, mod_type, residue=None, position=None,
                  is_modified=True):
         if mod_type not in modtype_conditions:
@@ -627,7 +639,7 @@ class ModCondition(object):
         return hash(self.matches_key())
 
 
-class ActivityCondition(object):
+class ActivityCondition(KeyedObject):
     """An active or inactive state of a protein.
 
     Examples
@@ -653,6 +665,8 @@ class ActivityCondition(object):
     is_active : bool
         Specifies whether the given activity type is present or absent.
     """
+    __slots__ = ('activity_type', 'is_active')
+
     def __init__(self, activity_type, is_active):
         if activity_type not in activity_types:
             logger.warning('Invalid activity type: %s' % activity_type)
@@ -0,0 +1,181 @@
+from __future__ import absolute_import, print_function, unicode_literals
+from builtins import dict, str
+
+__all__ = ['compact_statements', 'AgentPool']
+
+import sys
+import logging
+from .concept import Concept
+from .util import freeze_value
+
+
+logger = logging.getLogger(__name__)
+
+
+def compact_statements(stmts):
+    """Reduce the memory used by a list of Statements held in memory.
+
+    The names, namespaces and IDs of Agents, the modification types,
+    residues and positions of their conditions and the sources, PMIDs and
+    text reference and annotation keys of Evidence are interned so that
+    equal strings are stored only once. Empty mods, mutations and
+    bound_conditions lists of Agents are replaced with the shared empty
+    tuple. The Statements are compacted in place and their matches keys
+    don't change.
+
+    Since empty conditions are tuples, conditions have to be added to the
+    Agents of compacted Statements by assignment, e.g.,
+    `agent.mods = list(agent.mods) + [mc]`, rather than in place. The
+    annotations, epistemics and text_refs dicts of Evidence are annotated in
+    place during preassembly and are therefore never shared.
+
+    Parameters
+    ----------
+    stmts : list[indra.statements.Statement]
+        A list of Statements to compact.
+
+    Returns
+    -------
+    stmts : list[indra.statements.Statement]
+        The list of compacted Statements.
+    """
+    for stmt in stmts:
+        for agent in stmt.agent_list():
+            if agent is not None:
+                _compact_agent(agent)
+        for ev in stmt.evidence:
+            _compact_evidence(ev)
+    return stmts
+
+
+def _intern(value):
+    return sys.intern(value) if isinstance(value, str) else value
+
+
+def _intern_dict(d, intern_values=True):
+    items = [(_intern(k), _intern(v) if intern_values else v)
+             for k, v in d.items()]
+    d.clear()
+    d.update(items)
+
+
+def _compact_agent(agent):
+    agent.name = _intern(agent.name)
+    _intern_dict(agent.db_refs)
+    # Concepts don't have conditions
+    if not hasattr(agent, 'mods'):
+        return
+    agent.location = _intern(agent.location)
+    for mc in agent.mods:
+        for attr in ('mod_type', 'residue', 'position'):
+            setattr(mc, attr, _intern(getattr(mc, attr)))
+    for mut in agent.mutations:
+        for attr in ('position', 'residue_from', 'residue_to'):
+            setattr(mut, attr, _intern(getattr(mut, attr)))
+    for bc in agent.bound_conditions:
+        _compact_agent(bc.agent)
+    for attr in ('mods', 'mutations', 'bound_conditions'):
+        if not getattr(agent, attr):
+            setattr(agent, attr, ())
+
+
+def _compact_evidence(ev):
+    for attr in ('source_api', 'source_id', 'pmid'):
+        setattr(ev, attr, _intern(getattr(ev, attr)))
+    _intern_dict(ev.text_refs)
+    _intern_dict(ev.annotations, intern_values=False)
+    _intern_dict(ev.epistemics, intern_values=False)
+
+
+class AgentPool(object):
+    """A pool of the names and groundings of Agents shared across a corpus.
+
+    The same grounded Agent typically appears in a large number of
+    Statements of a corpus. Interning the Agents of these Statements in a
+    pool makes all Agents of the same type with equal names and db_refs
+    share a single name string and db_refs dict. The Agents themselves,
+    with their conditions, remain separate objects.
+
+    Since the db_refs dicts of pooled Agents are shared, they should be
+    replaced rather than changed in place, e.g.,
+    `agent.db_refs = dict(agent.db_refs, HGNC='6871')`, so that changing
+    the grounding of one Agent copies its db_refs on write. The grounding
+    mapper, ontology mapper and site mapper follow this convention.
+
+    Examples
+    --------
+    >>> from indra.statements import Agent, Phosphorylation, Activation
+    >>> pool = AgentPool()
+    >>> st1 = Phosphorylation(Agent('MAP2K1', db_refs={'HGNC': '6840'}),
+    ...                       Agent('MAPK1', db_refs={'HGNC': '6871'}))
+    >>> st2 = Activation(Agent('MAPK1', db_refs={'HGNC': '6871'}),
+    ...                  Agent('ELK1', db_refs={'HGNC': '3321'}))
+    >>> stmts = pool.intern_statements([st1, st2])
+    >>> st1.sub.db_refs is st2.subj.db_refs
+    True
+    """
+    def __init__(self):
+        self._entries = {}
+
+    def __len__(self):
+        return len(self._entries)
+
+    def intern_agent(self, agent):
+        """Make an Agent share its name and grounding with pooled Agents.
+
+        The Agents of the bound conditions of the Agent are interned as
+        well. Agents whose db_refs contain values that can't be pooled,
+        e.g., dicts, are left as they are.
+
+        Parameters
+        ----------
+        agent : indra.statements.Concept
+            The Agent to intern.
+
+        Returns
+        -------
+        agent : indra.statements.Concept
+            The same Agent, sharing its name and db_refs with pooled Agents.
+        """
+        try:
+            key = (type(agent), agent.name,
+                   tuple(sorted(agent.db_refs.items())))
+            entry = self._entries.get(key)
+        except TypeError:
+            # Groundings with scores are lists which have to be frozen
+            try:
+                key = (type(agent), agent.name,
+                       tuple(sorted((k, freeze_value(v))
+                                    for k, v in agent.db_refs.items())))
+                entry = self._entries.get(key)
+            except TypeError:
+                return agent
+        # The pooled db_refs may have been changed in place since they
+        # were added to the pool in which case they are replaced
+        if entry is None or entry[1] != agent.db_refs:
+            self._entries[key] = (agent.name, agent.db_refs)
+        else:
+            agent.name, agent.db_refs = entry
+        for bc in getattr(agent, 'bound_conditions', ()):
+            self.intern_agent(bc.agent)
+        return agent
+
+    def intern_statements(self, stmts):
+        """Intern the Agents of a list of Statements in the pool.
+
+        Parameters
+        ----------
+        stmts : list[indra.statements.Statement]
+            A list of Statements, for instance, loaded from a file or
+            produced by a processor.
+
+        Returns
+        -------
+        stmts : list[indra.statements.Statement]
+            The same list of Statements whose Agents have been interned.
+        """
+        for stmt in stmts:
+            for agent in stmt.agent_list():
+                if isinstance(agent, Concept):
+                    self.intern_agent(agent)
+        return stmts
@@ -3,13 +3,14 @@ from builtins import dict, str
 from future.utils import python_2_unicode_compatible
 import logging
 from collections import OrderedDict as _o
+from .util import KeyedObject
 
 
 logger = logging.getLogger(__name__)
 
 
 @python_2_unicode_compatible
-class Concept(object):
+class Concept(KeyedObject):
     """A concept/entity of interest that is the argument of a Statement
 
     Parameters
@@ -19,6 +20,8 @@ class Concept(object):
     db_refs : dict
         Dictionary of database identifiers associated with this concept.
     """
+    __slots__ = ('name', 'db_refs')
+
     def __init__(self, name, db_refs=None):
         self.name = name
         self.db_refs = db_refs if db_refs else {}
@@ -11,6 +11,7 @@ import json
 import textwrap
 from collections import OrderedDict as _o
 from .util import *
+from .util import get_attr_state, set_attr_state
 from .context import Context
 
 
@@ -54,6 +55,10 @@ class Evidence(object):
         and is set by said Statement. It is useful for tracing ownership of
         an Evidence object.
     """
+    __slots__ = ('source_api', 'source_id', 'pmid', 'text', 'annotations',
+                 'epistemics', 'context', 'text_refs', 'source_hash',
+                 'stmt_tag')
+
     def __init__(self, source_api=None, source_id=None, pmid=None, text=None,
                  annotations=None, epistemics=None, context=None,
                  text_refs=None):
@@ -79,6 +84,9 @@ class Evidence(object):
         self.get_source_hash()
         self.stmt_tag = None
 
+    def __getstate__(self):
+        return get_attr_state(self)
+
     def __setstate__(self, state):
         if 'context' not in state:
             state['context'] = None
@@ -88,7 +96,7 @@ class Evidence(object):
             state['stmt_tag'] = None
         if 'source_hash' not in state:
             state['source_hash'] = None
-        self.__dict__ = state
+        set_attr_state(self, state)
 
     def get_source_hash(self, refresh=False):
         """Get a hash based off of the source of this statement.
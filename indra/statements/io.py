@@ -2,10 +2,13 @@ from __future__ import absolute_import, print_function, unicode_literals
 from builtins import dict, str
 
 __all__ = ['stmts_from_json', 'stmts_from_json_file', 'stmts_to_json',
-           'stmts_to_json_file', 'draw_stmt_graph',
-           'UnresolvedUuidError', 'InputError']
+           'stmts_to_json_file', 'iter_stmts_from_jsonl_file',
+           'stmts_from_jsonl_file', 'stmts_to_jsonl_file', 'resolve_support',
+           'draw_stmt_graph', 'UnresolvedUuidError', 'InputError']
 
+import io
 import json
+import gzip
 import logging
 from indra.statements.statements import Statement, Unresolved
 
@@ -13,7 +16,8 @@ from indra.statements.statements import Statement, Unresolved
 logger = logging.getLogger(__name__)
 
 
-def stmts_from_json(json_in, on_missing_support='handle'):
+def stmts_from_json(json_in, on_missing_support='handle', agent_pool=None,
+                    link_support=True):
     """Get a list of Statements from Statement jsons.
 
     In the case of pre-assembled Statements which have `supports` and
@@ -41,36 +45,50 @@ def stmts_from_json(json_in, on_missing_support='handle'):
         - *'ignore'* : Simply omit any uuids that cannot be linked to any
           Statements in the list.
         - *'error'* : Raise an error upon hitting an un-linkable uuid.
+    agent_pool : Optional[indra.statements.AgentPool]
+        If given, the Agents of the Statements are interned in this pool so
+        that equal Agents share their names and groundings, also with
+        Agents loaded earlier into the same pool. Default: None
+    link_support : Optional[bool]
+        If False, the uuids in `supports` and `supported_by` are left as
+        `Unresolved` handles instead of being linked to Statements, which
+        can be done later with :py:func:`resolve_support`, e.g., once the
+        Statements of several files have been loaded. Default: True
 
     Returns
     -------
     stmts : list[:py:class:`Statement`]
         A list of INDRA Statements.
     """
-
+    _check_on_missing_support(on_missing_support)
     stmts = []
     uuid_dict = {}
     for json_stmt in json_in:
-        try:
-            st = Statement._from_json(json_stmt)
-        except Exception as e:
-            logger.warning("Error creating statement: %s" % e)
+        st = _stmt_from_json(json_stmt)
+        if st is None:
             continue
         stmts.append(st)
         uuid_dict[st.uuid] = st
-    for st in stmts:
-        _promote_support(st.supports, uuid_dict, on_missing_support)
-        _promote_support(st.supported_by, uuid_dict, on_missing_support)
+    if link_support:
+        _link_support(stmts, uuid_dict, on_missing_support)
+    else:
+        for st in stmts:
+            _make_support_handles(st)
+    if agent_pool is not None:
+        agent_pool.intern_statements(stmts)
     return stmts
 
 
-def stmts_from_json_file(fname):
+def stmts_from_json_file(fname, agent_pool=None):
     """Return a list of statements loaded from a JSON file.
 
     Parameters
     ----------
     fname : str
         Path to the JSON file to load statements from.
+    agent_pool : Optional[indra.statements.AgentPool]
+        If given, the Agents of the Statements are interned in this pool.
+        Default: None
 
     Returns
     -------
@@ -78,7 +96,7 @@ def stmts_from_json_file(fname):
         The list of INDRA Statements loaded from the JSOn file.
     """
     with open(fname, 'r') as fh:
-        return stmts_from_json(json.load(fh))
+        return stmts_from_json(json.load(fh), agent_pool=agent_pool)
 
 
 def stmts_to_json_file(stmts, fname, **kwargs):
@@ -95,6 +113,159 @@ def stmts_to_json_file(stmts, fname, **kwargs):
         json.dump(stmts_to_json(stmts, **kwargs), fh, indent=1)
 
 
+def iter_stmts_from_jsonl_file(fname, agent_pool=None):
+    """Iterate over the Statements in a JSON Lines file one at a time.
+
+    Each line of the file contains the JSON of one Statement. Only one
+    Statement is held in memory at a time by this function, so files larger
+    than memory can be processed in a single pass. The uuids in the
+    `supports` and `supported_by` lists of each Statement are replaced by
+    `Unresolved` Statements which can be linked to the Statements they
+    refer to later with :py:func:`resolve_support`, once all the Statements
+    that are needed have been collected.
+
+    Parameters
+    ----------
+    fname : str
+        Path to the JSON Lines file to read Statements from. If the name
+        ends with .gz, the file is read as gzip-compressed.
+    agent_pool : Optional[indra.statements.AgentPool]
+        If given, the Agents of the Statements are interned in this pool.
+        Default: None
+
+    Yields
+    ------
+    indra.statements.Statement
+        The Statements in the file, in order.
+    """
+    with _open_jsonl(fname, 'r') as fh:
+        for line in fh:
+            if not line.strip():
+                continue
+            stmt = _stmt_from_json(json.loads(line))
+            if stmt is None:
+                continue
+            _make_support_handles(stmt)
+            if agent_pool is not None:
+                agent_pool.intern_statements([stmt])
+            yield stmt
+
+
+def stmts_from_jsonl_file(fname, on_missing_support='handle',
+                          agent_pool=None):
+    """Return a list of Statements loaded from a JSON Lines file.
+
+    Parameters
+    ----------
+    fname : str
+        Path to the JSON Lines file to load Statements from. If the name
+        ends with .gz, the file is read as gzip-compressed.
+    on_missing_support : Optional[str]
+        Handles the behavior when a uuid reference in `supports` or
+        `supported_by` can't be resolved to a Statement in the file, see
+        :py:func:`stmts_from_json`. Default: 'handle'
+    agent_pool : Optional[indra.statements.AgentPool]
+        If given, the Agents of the Statements are interned in this pool.
+        Default: None
+
+    Returns
+    -------
+    list[indra.statements.Statement]
+        The list of INDRA Statements loaded from the JSON Lines file.
+    """
+    stmts = list(iter_stmts_from_jsonl_file(fname, agent_pool=agent_pool))
+    return resolve_support(stmts, on_missing_support)
+
+
+def stmts_to_jsonl_file(stmts, fname, append=False, use_sbo=False,
+                        matches_fun=None):
+    """Serialize Statements into a JSON Lines file one at a time.
+
+    Since each Statement is written as soon as it is serialized, `stmts`
+    can be a generator, e.g., one returned by
+    :py:func:`iter_stmts_from_jsonl_file`, to process files larger than
+    memory in a single pass.
+
+    Parameters
+    ----------
+    stmts : iterable[indra.statements.Statement]
+        The Statements to serialize into the file.
+    fname : str
+        Path to the JSON Lines file to serialize Statements into. If the
+        name ends with .gz, the file is written gzip-compressed.
+    append : Optional[bool]
+        If True, the Statements are appended to the file if it exists,
+        otherwise the file is overwritten. Default: False
+    use_sbo : Optional[bool]
+        If True, SBO annotations are added to each applicable element of the
+        JSON. Default: False
+    matches_fun : Optional[function]
+        A custom function which, if provided, is used to construct the
+        matches key which is then hashed and put into the JSON.
+        Default: None
+
+    Returns
+    -------
+    int
+        The number of Statements written.
+    """
+    num_stmts = 0
+    with _open_jsonl(fname, 'a' if append else 'w') as fh:
+        for stmt in stmts:
+            fh.write(json.dumps(stmt.to_json(use_sbo=use_sbo,
+                                             matches_fun=matches_fun)))
+            fh.write('\n')
+            num_stmts += 1
+    return num_stmts
+
+
+def resolve_support(stmts, on_missing_support='handle'):
+    """Link the supports and supported_by uuids of Statements to Statements.
+
+    Uuids, either as strings or as `Unresolved` Statements, are replaced by
+    the Statements with these uuids in the given list, or in the
+    `supports` and `supported_by` lists of these Statements if they were
+    already linked to them.
+
+    Parameters
+    ----------
+    stmts : list[indra.statements.Statement]
+        The Statements whose support should be resolved, e.g., collected
+        from :py:func:`iter_stmts_from_jsonl_file`.
+    on_missing_support : Optional[str]
+        Handles the behavior when a uuid can't be resolved, see
+        :py:func:`stmts_from_json`. Default: 'handle'
+
+    Returns
+    -------
+    stmts : list[indra.statements.Statement]
+        The same list of Statements with their support resolved.
+    """
+    _check_on_missing_support(on_missing_support)
+    uuid_dict = {}
+    for st in stmts:
+        for sup in st.supports + st.supported_by:
+            if isinstance(sup, Statement) and not isinstance(sup, Unresolved):
+                uuid_dict[sup.uuid] = sup
+    uuid_dict.update((st.uuid, st) for st in stmts)
+    _link_support(stmts, uuid_dict, on_missing_support)
+    return stmts
+
+
+def _open_jsonl(fname, mode):
+    if fname.endswith('.gz'):
+        return gzip.open(fname, mode + 't', encoding='utf-8')
+    return io.open(fname, mode, encoding='utf-8')
+
+
+def _stmt_from_json(json_stmt):
+    try:
+        return Statement._from_json(json_stmt)
+    except Exception as e:
+        logger.warning("Error creating statement: %s" % e)
+        return None
+
+
 def stmts_to_json(stmts_in, use_sbo=False, matches_fun=None):
     """Return the JSON-serialized form of one or more INDRA Statements.
 
@@ -124,24 +295,71 @@ def stmts_to_json(stmts_in, use_sbo=False, matches_fun=None):
     return json_dict
 
 
-def _promote_support(sup_list, uuid_dict, on_missing='handle'):
-    """Promote the list of support-related uuids to Statements, if possible."""
-    valid_handling_choices = ['handle', 'error', 'ignore']
+valid_handling_choices = ('handle', 'error', 'ignore')
+
+
+def _check_on_missing_support(on_missing):
     if on_missing not in valid_handling_choices:
         raise InputError('Invalid option for `on_missing_support`: \'%s\'\n'
                          'Choices are: %s.'
-                         % (on_missing, str(valid_handling_choices)))
-    for idx, uuid in enumerate(sup_list):
-        if uuid in uuid_dict.keys():
-            sup_list[idx] = uuid_dict[uuid]
+                         % (on_missing, str(list(valid_handling_choices))))
+
+
+def _link_support(stmts, uuid_dict, on_missing='handle'):
+    """Link the support of Statements in a single pass over all of them."""
+    # The Unresolved Statements made for each missing uuid, which are shared
+    # by all Statements referring to it
+    unresolved = {}
+    for st in stmts:
+        if st.supports:
+            st.supports = _promote_support(st.supports, uuid_dict,
+                                           on_missing, unresolved)
+        if st.supported_by:
+            st.supported_by = _promote_support(st.supported_by, uuid_dict,
+                                               on_missing, unresolved)
+
+
+def _promote_support(sup_list, uuid_dict, on_missing='handle',
+                     unresolved=None):
+    """Return a list of support-related uuids promoted to Statements.
+
+    The elements of the list are uuid strings or Statements whose uuids are
+    looked up. Unresolved uuids are represented by `Unresolved` Statements,
+    reused from the `unresolved` dict if given, or left out, depending on
+    `on_missing`.
+    """
+    # In the common case, all uuids are strings found in the dict
+    try:
+        return [uuid_dict[sup] for sup in sup_list]
+    except KeyError:
+        pass
+    if unresolved is None:
+        unresolved = {}
+    promoted = []
+    for sup in sup_list:
+        uuid = sup if isinstance(sup, str) else sup.uuid
+        stmt = uuid_dict.get(uuid)
+        if stmt is not None:
+            promoted.append(stmt)
         elif on_missing == 'handle':
-            sup_list[idx] = Unresolved(uuid)
-        elif on_missing == 'ignore':
-            sup_list.remove(uuid)
+            stmt = unresolved.get(uuid)
+            if stmt is None:
+                stmt = sup if isinstance(sup, Unresolved) \
+                    else Unresolved(uuid)
+                unresolved[uuid] = stmt
+            promoted.append(stmt)
         elif on_missing == 'error':
             raise UnresolvedUuidError("Uuid %s not found in stmt jsons."
                                       % uuid)
-    return
+    return promoted
+
+
+def _make_support_handles(stmt):
+    """Represent the support uuids of a Statement by Unresolved handles."""
+    if stmt.supports:
+        stmt.supports = [Unresolved(uuid) for uuid in stmt.supports]
+    if stmt.supported_by:
+        stmt.supported_by = [Unresolved(uuid) for uuid in stmt.supported_by]
 
 
 def draw_stmt_graph(stmts):
@@ -201,13 +201,17 @@ __all__ = [
 
     # Functions and values
     'stmts_from_json', 'get_unresolved_support_uuids', 'stmts_to_json',
+    'get_statement_hashes',
     'stmts_from_json_file', 'stmts_to_json_file',
+    'iter_stmts_from_jsonl_file', 'stmts_from_jsonl_file',
+    'stmts_to_jsonl_file', 'resolve_support',
     'get_valid_residue', 'get_valid_location', 'get_valid_location',
     'draw_stmt_graph', 'get_all_descendants','make_statement_camel',
     'amino_acids', 'amino_acids_reverse', 'activity_types',
     'cellular_components', 'cellular_components_reverse', 'modtype_to_modclass',
     'modclass_to_modtype', 'modtype_conditions', 'modtype_to_inverse',
-    'modclass_to_inverse', 'get_statement_by_name', 'make_hash', 'stmt_type'
+    'modclass_to_inverse', 'get_statement_by_name', 'make_hash', 'stmt_type',
+    'compact_statements', 'AgentPool'
     ]
 
 import abc
@@ -218,6 +222,7 @@ import networkx
 import itertools
 from copy import deepcopy
 from collections import OrderedDict as _o
+from indra.util import get_mp_context
 from .util import *
 from .concept import *
 from .context import *
@@ -2411,7 +2416,12 @@ class Unresolved(Statement):
     """
 
     def __init__(self, uuid_str=None, shallow_hash=None, full_hash=None):
-        super(Unresolved, self).__init__()
+        # Statement.__init__ isn't called since making a new uuid, which
+        # would be replaced right away, is most of its cost
+        self.evidence = []
+        self.supports = []
+        self.supported_by = []
+        self.belief = 1
         self.uuid = uuid_str
         self._shallow_hash = shallow_hash
         self._full_hash = full_hash
@@ -2469,6 +2479,7 @@ modtype_to_inverse, modclass_to_inverse = _get_mod_inverse_maps()
 
 from .io import *
 from .agent import *
+from .compact import *
 
 
 stmt_sbo_map = {
@@ -2573,6 +2584,124 @@ def get_unresolved_support_uuids(stmts):
             if isinstance(s, Unresolved)}
 
 
+def get_statement_hashes(stmts, shallow=True, full=False, refresh=False,
+                         matches_fun=None, poolsize=None):
+    """Return the hashes of a list of Statements computed in one pass.
+
+    The hashes are the same as those returned by `Statement.get_hash` and
+    are cached on the Statements in the same way, so that subsequent calls
+    to `get_hash` return them immediately. Computing both shallow and full
+    hashes gets the matches key of each Statement only once.
+
+    Parameters
+    ----------
+    stmts : list[indra.statements.Statement]
+        The Statements to hash.
+    shallow : Optional[bool]
+        If True, the shallow hashes are computed. Default: True
+    full : Optional[bool]
+        If True, the full hashes, which include the evidence, are computed.
+        Default: False
+    refresh : Optional[bool]
+        If True, hashes already cached on the Statements are recomputed.
+        Default: False
+    matches_fun : Optional[function]
+        A function which takes a Statement as argument and returns a string
+        matches key from which the shallow hash is made. It has to be
+        picklable if a poolsize is given. Default: None
+    poolsize : Optional[int]
+        If given, the hashes are computed by this number of worker
+        processes, which are started for this call. Worker processes are
+        forked, where possible, so that Statements don't need to be pickled
+        to be sent to them. Default: None
+
+    Returns
+    -------
+    list
+        The hashes of the Statements, in order. If both shallow and full
+        are True, each element is a (shallow_hash, full_hash) tuple.
+    """
+    if not shallow and not full:
+        raise ValueError('At least one of shallow and full must be True.')
+    if poolsize and poolsize > 1 and len(stmts) > poolsize:
+        hashes = _get_pooled_hashes(stmts, shallow, full, refresh,
+                                    matches_fun, poolsize)
+        for stmt, stmt_hashes in zip(stmts, hashes):
+            if shallow:
+                stmt._shallow_hash = stmt_hashes[0]
+            if full:
+                stmt._full_hash = stmt_hashes[-1]
+    else:
+        hashes = [_get_stmt_hashes(stmt, shallow, full, refresh,
+                                   matches_fun) for stmt in stmts]
+    if shallow and full:
+        return hashes
+    return [stmt_hashes[0] for stmt_hashes in hashes]
+
+
+def _get_stmt_hashes(stmt, shallow, full, refresh, matches_fun):
+    """Return the hashes of a Statement, getting its matches key only once.
+    """
+    shallow_hash = None if refresh else getattr(stmt, '_shallow_hash', None)
+    full_hash = None if refresh else getattr(stmt, '_full_hash', None)
+    get_shallow = shallow and shallow_hash is None
+    get_full = full and full_hash is None
+    # The full hash is always made from the built-in matches key
+    if get_full or (get_shallow and not matches_fun):
+        matches_key = stmt.matches_key()
+    if get_shallow:
+        stmt._shallow_hash = shallow_hash = \
+            make_hash(matches_fun(stmt) if matches_fun else matches_key, 14)
+    if get_full:
+        ev_mk_list = sorted([ev.matches_key() for ev in stmt.evidence])
+        stmt._full_hash = full_hash = \
+            make_hash(matches_key + str(ev_mk_list), 16)
+    if shallow and full:
+        return shallow_hash, full_hash
+    return (shallow_hash if shallow else full_hash,)
+
+
+# The Statements hashed by forked workers, which inherit them from the parent
+_hash_stmts = None
+
+
+def _get_pooled_hashes(stmts, shallow, full, refresh, matches_fun, poolsize):
+    """Return the hashes of Statements computed by a new pool of workers.
+
+    The pool of preassembly workers isn't reused since forked workers only
+    see the Statements in `_hash_stmts` if they are started after it is set.
+    """
+    global _hash_stmts
+    ctx = get_mp_context()
+    chunk_size = -(-len(stmts) // (4 * poolsize))
+    bounds = [(start, min(start + chunk_size, len(stmts)))
+              for start in range(0, len(stmts), chunk_size)]
+    forked = ctx.get_start_method() == 'fork'
+    if forked:
+        _hash_stmts = stmts
+        chunks = bounds
+    else:
+        chunks = [stmts[start:end] for start, end in bounds]
+    try:
+        with ctx.Pool(poolsize) as pool:
+            chunk_hashes = pool.map(
+                _get_chunk_hashes,
+                [(chunk, shallow, full, refresh, matches_fun)
+                 for chunk in chunks])
+    finally:
+        _hash_stmts = None
+    return [stmt_hashes for hashes in chunk_hashes
+            for stmt_hashes in hashes]
+
+
+def _get_chunk_hashes(args):
+    chunk, shallow, full, refresh, matches_fun = args
+    if isinstance(chunk, tuple):
+        chunk = _hash_stmts[chunk[0]:chunk[1]]
+    return [_get_stmt_hashes(stmt, shallow, full, refresh, matches_fun)
+            for stmt in chunk]
+
+
 def stmt_type(obj, mk=True):
     """Return standardized, backwards compatible object type String.
 
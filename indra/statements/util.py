@@ -13,4 +13,69 @@ def make_hash(s, n_bytes):
     """Make the hash from a matches key."""
     raw_h = int(md5(s.encode('utf-8')).hexdigest()[:n_bytes], 16)
     # Make it a signed int.
-    return 16**n_bytes//2 - raw_h
\ No newline at end of file
+    return 16**n_bytes//2 - raw_h
+
+
+def freeze_value(value):
+    """Return an immutable copy of a value made of lists, dicts and sets."""
+    if isinstance(value, (list, tuple)):
+        return tuple(freeze_value(v) for v in value)
+    elif isinstance(value, dict):
+        return tuple((k, freeze_value(v)) for k, v in value.items())
+    elif isinstance(value, set):
+        return frozenset(value)
+    return value
+
+
+class KeyedObject(object):
+    """Parent class of objects whose attributes determine matches keys.
+
+    The attributes of these objects, whether they are stored in slots or
+    in a dict, are pickled and copied as a dict.
+    """
+    __slots__ = ()
+
+    def __getstate__(self):
+        return get_attr_state(self)
+
+    def __setstate__(self, state):
+        set_attr_state(self, state)
+
+
+# The names of the slots of each class, including those of its parents
+_class_slots = {}
+
+
+def _get_slots(cls):
+    slots = _class_slots.get(cls)
+    if slots is None:
+        slots = tuple(slot for c in cls.__mro__
+                      for slot in c.__dict__.get('__slots__', ())
+                      if slot not in ('__dict__', '__weakref__'))
+        _class_slots[cls] = slots
+    return slots
+
+
+def get_attr_state(obj):
+    """Return the attributes of an object with or without slots as a dict."""
+    state = {}
+    for name in _get_slots(type(obj)):
+        try:
+            state[name] = getattr(obj, name)
+        except AttributeError:
+            pass
+    state.update(getattr(obj, '__dict__', ()))
+    return state
+
+
+def set_attr_state(obj, state):
+    """Set the attributes of an object with or without slots from a dict.
+
+    Attributes that the object can't have, for instance ones that were
+    pickled by an older version of its class, are ignored.
+    """
+    for name, value in state.items():
+        try:
+            setattr(obj, name, value)
+        except AttributeError:
+            pass
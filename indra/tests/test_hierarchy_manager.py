@@ -4,7 +4,8 @@ import os
 from copy import deepcopy
 from indra.util import unicode_strs
 from indra.preassembler.hierarchy_manager import hierarchies, \
-    HierarchyManager, get_bio_hierarchies, YamlHierarchyManager
+    HierarchyManager, get_bio_hierarchies, YamlHierarchyManager, \
+    CompactHierarchyManager, LazyHierarchies, get_wm_hierarchies
 from indra.preassembler.make_eidos_hume_ontologies import eidos_ont_url, \
     rdf_graph_from_yaml, load_yaml_from_url
 
@@ -91,6 +92,25 @@ def test_partof_comp_none_none():
                                  'INDRA_LOCATIONS', None)
 
 
+def test_comp_name_index():
+    ccomp_file = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                              '../resources/cellular_component_hierarchy.rdf')
+    ccomp = HierarchyManager(ccomp_file, True, False)
+    cytoplasm = ccomp.find_entity('cytoplasm')
+    assert cytoplasm == comp_hierarchy.find_entity('cytoplasm')
+    assert ccomp.find_entity('not a location') is None
+    assert (cytoplasm, ccomp.find_entity('cell')) in ccomp.partof_closure
+    # Locations are related using the name index and the closure without
+    # querying the graph
+    ccomp.graph = None
+    assert ccomp.partof('INDRA_LOCATIONS', 'cytoplasm', 'INDRA_LOCATIONS',
+                        'cell')
+    assert not ccomp.partof('INDRA_LOCATIONS', 'cell', 'INDRA_LOCATIONS',
+                            'cytoplasm')
+    assert not ccomp.partof('INDRA_LOCATIONS', 'cytoplasm', 'INDRA_LOCATIONS',
+                            'not a location')
+
+
 def test_partof_comp_none_not():
     assert not comp_hierarchy.partof('INDRA_LOCATIONS', None,
                                      'INDRA_LOCATIONS', 'cytoplasm')
@@ -180,6 +200,83 @@ def test_get_parents():
     assert ampk in p3
 
 
+def test_get_parents_without_index():
+    # Hierarchies pickled before the parent index existed build it on
+    # first use
+    prkaa1 = 'http://identifiers.org/hgnc/9376'  # PRKAA1
+    ampk = 'http://identifiers.org/fplx/AMPK'
+    hm = deepcopy(ent_hierarchy)
+    hm.__dict__.pop('_parents', None)
+    hm.__dict__.pop('_immediate_parents', None)
+    assert hm.get_parents(prkaa1, 'top') == [ampk]
+    assert hm.get_parents(prkaa1) == ent_hierarchy.get_parents(prkaa1)
+    assert hm.get_parents(ampk) == set()
+    assert hm.get_parents('http://identifiers.org/hgnc/xxx') == set()
+
+
+def test_relation_cache():
+    import tempfile
+    from indra.preassembler.relation_cache import RelationCache
+    ent_hierarchy_no_tc = deepcopy(ent_hierarchy)
+    ent_hierarchy_no_tc.isa_closure = {}
+    ent_hierarchy_no_tc.partof_closure = {}
+    fname = os.path.join(tempfile.mkdtemp(), 'relations.sqlite')
+    cache = RelationCache(maxsize=2, fname=fname)
+    ent_hierarchy_no_tc.relation_cache = cache
+    assert ent_hierarchy_no_tc.isa('HGNC', '6871', 'FPLX', 'MAPK')
+    assert ent_hierarchy_no_tc.isa('HGNC', '6871', 'FPLX', 'MAPK')
+    assert not ent_hierarchy_no_tc.isa('HGNC', '6871', 'FPLX', 'JNK')
+    assert ent_hierarchy_no_tc.partof('HGNC', '30287', 'FPLX', 'mTORC1')
+    stats = cache.get_stats()
+    assert stats['hits'] == 1 and stats['misses'] == 3
+    # Only the two most recent results are kept in memory
+    assert stats['size'] == 2 and stats['evictions'] == 1
+    cache.flush()
+    # A new cache reads the results from the file
+    cache = RelationCache(fname=fname)
+    mapk1_uri = ent_hierarchy.get_uri('HGNC', '6871')
+    mapk_uri = ent_hierarchy.get_uri('FPLX', 'MAPK')
+    assert cache.get(('isa', mapk1_uri, mapk_uri)) is True
+    assert cache.get(('partof', mapk1_uri, mapk_uri)) is None
+    assert cache.get_stats()['file_hits'] == 1
+    # The file is reused by the same hierarchy
+    ent_hierarchy_no_tc.relation_cache = cache
+    assert not ent_hierarchy_no_tc.isa('HGNC', '6871', 'FPLX', 'JNK')
+    assert cache.get_stats()['file_hits'] == 2
+
+
+def test_relation_cache_hierarchy_change():
+    import rdflib
+    import tempfile
+    from indra.preassembler.relation_cache import RelationCache
+    hm = HierarchyManager(None, False, True)
+    hm.load_from_rdf_string('')
+    isa = rdflib.term.URIRef(hm.relations_prefix + 'isa')
+    a, b, c = [rdflib.term.URIRef(hm.get_uri('CHEBI', 'CHEBI:%s' % term))
+               for term in 'ABC']
+    hm.add_triples([(a, isa, b)])
+    fname = os.path.join(tempfile.mkdtemp(), 'relations.sqlite')
+    hm.relation_cache = RelationCache(fname=fname)
+    assert hm.isa('CHEBI', 'CHEBI:A', 'CHEBI', 'CHEBI:B')
+    assert not hm.isa('CHEBI', 'CHEBI:A', 'CHEBI', 'CHEBI:C')
+    # Cached results are cleared when the hierarchy changes
+    hm.add_triples([(b, isa, c)])
+    assert hm.isa('CHEBI', 'CHEBI:A', 'CHEBI', 'CHEBI:C')
+    hm.relation_cache.flush()
+    # Results in the file are only used for the same hierarchy
+    hm2 = HierarchyManager(None, False, True)
+    hm2.load_from_rdf_graph(deepcopy(hm.graph))
+    hm2.relation_cache = RelationCache(fname=fname)
+    assert hm2.isa('CHEBI', 'CHEBI:A', 'CHEBI', 'CHEBI:C')
+    assert hm2.relation_cache.get_stats()['file_hits'] == 1
+    hm3 = HierarchyManager(None, False, True)
+    hm3.load_from_rdf_graph(rdflib.Graph())
+    hm3.add_triples([(a, isa, b)])
+    hm3.relation_cache = RelationCache(fname=fname)
+    assert not hm3.isa('CHEBI', 'CHEBI:A', 'CHEBI', 'CHEBI:C')
+    assert hm3.relation_cache.get_stats()['file_hits'] == 0
+
+
 def test_chebi_isa():
     assert ent_hierarchy.isa('CHEBI', 'CHEBI:87307', 'CHEBI', 'CHEBI:36962')
 
@@ -244,6 +341,42 @@ def test_load_sofia_hierarchy():
     assert sofia_isa('Movement/Human_Migration', 'Movement')
 
 
+def test_add_triples():
+    import rdflib
+    trips_ont = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                             '../sources/cwms/trips_ontology.rdf')
+    full = HierarchyManager(trips_ont, True, True)
+    triples = sorted(full.graph)
+    # Build the hierarchy from part of the triples and add the rest
+    g = rdflib.Graph()
+    for triple in triples[::2]:
+        g.add(triple)
+    hm = HierarchyManager(None, True, True)
+    hm.load_from_rdf_graph(g)
+    hm.add_triples(triples[1::2])
+    assert hm.isa_closure == full.isa_closure
+    assert hm.isa_or_partof_closure == full.isa_or_partof_closure
+    assert {k: set(v) for k, v in hm._children.items()} == \
+        {k: set(v) for k, v in full._children.items()}
+    assert hm.get_parents(hm.get_uri('CWMS', 'ont::rain')) == \
+        full.get_parents(full.get_uri('CWMS', 'ont::rain'))
+    # Terms in the same component are the same in both
+    for term, component in full.components.items():
+        same = {t for t, c in full.components.items() if c == component}
+        assert {t for t, c in hm.components.items()
+                if c == hm.components[term]} == same
+
+
+def test_wm_hierarchy_closure():
+    hm = get_wm_hierarchies()['entity']
+    assert hm.isa_closure
+    assert hm.isa('UN', 'UN/events/human/conflict', 'UN', 'UN/events/human')
+    assert hm.isa('HUME', 'event/healthcare/human_disease', 'HUME',
+                  'event/healthcare')
+    assert (hm.get_uri('UN', 'UN/events/human/conflict'),
+            hm.get_uri('UN', 'UN/events')) in hm.isa_closure
+
+
 def test_load_hume_hierarchy():
     hume_ont = os.path.join(os.path.dirname(os.path.abspath(__file__)),
                             '../sources/hume/hume_ontology.rdf')
@@ -265,6 +398,31 @@ def test_same_components():
     assert c1 == c2
 
 
+def test_closure_with_cycle():
+    import rdflib
+    g = rdflib.Graph()
+    rel = lambda name: rdflib.term.URIRef(
+        'http://sorger.med.harvard.edu/indra/relations/' + name)
+    term = lambda name: rdflib.term.URIRef('http://test/' + name)
+    # a isa b isa c isa b, d partof c, and e isa f in a separate component
+    for child, rel_name, parent in (('a', 'isa', 'b'), ('b', 'isa', 'c'),
+                                    ('c', 'isa', 'b'), ('d', 'partof', 'c'),
+                                    ('e', 'isa', 'f')):
+        g.add((term(child), rel(rel_name), term(parent)))
+    hm = HierarchyManager(None, True, True)
+    hm.load_from_rdf_graph(g)
+    uri = lambda name: 'http://test/' + name
+    assert hm.isa_closure == {(uri('a'), uri('b')), (uri('a'), uri('c')),
+                              (uri('b'), uri('c')), (uri('c'), uri('b')),
+                              (uri('e'), uri('f'))}
+    assert hm.partof_closure == {(uri('d'), uri('c'))}
+    assert (uri('d'), uri('b')) in hm.isa_or_partof_closure
+    assert len(set(hm.components.values())) == 2
+    assert len({hm.components[uri(t)] for t in 'abcd'}) == 1
+    assert hm.components[uri('e')] == hm.components[uri('f')]
+    assert set(hm.get_children(uri('c'))) == {uri(t) for t in 'abcd'}
+
+
 def test_bio_hierarchy_pickles():
     h1 = get_bio_hierarchies()
     h2 = get_bio_hierarchies(from_pickle=False)
@@ -272,6 +430,121 @@ def test_bio_hierarchy_pickles():
         assert len(h1[key].graph) == len(h2[key].graph)
 
 
+def test_compact_hierarchies():
+    h1 = get_bio_hierarchies(from_pickle=False)
+    h2 = get_bio_hierarchies(compact=True)
+    for key in h1.keys():
+        assert isinstance(h2[key], CompactHierarchyManager)
+        assert set(h1[key].isa_closure) == set(h2[key].isa_closure)
+        assert set(h1[key].isa_or_partof_closure) == \
+            set(h2[key].isa_or_partof_closure)
+        assert set(h1[key].components) == set(h2[key].components)
+    ceh = h2['entity']
+    assert ceh.isa('HGNC', '1097', 'FPLX', 'RAF')
+    assert not ceh.isa('FPLX', 'RAF', 'HGNC', '1097')
+    assert ceh.partof('FPLX', 'HIF_alpha', 'FPLX', 'HIF')
+    assert ceh.isa_or_partof('HGNC', '9385', 'FPLX', 'AMPK')
+    uri = ceh.get_uri('FPLX', 'AMPK')
+    assert set(ceh.get_parents(uri)) == set(ent_hierarchy.get_parents(uri))
+    assert set(ceh.get_children(uri)) == \
+        set(ent_hierarchy.get_children(uri))
+    assert ceh.components[ceh.get_uri('HGNC', '9385')] == ceh.components[uri]
+    ccomp = h2['cellular_component']
+    assert ccomp.partof('INDRA_LOCATIONS', 'cytoplasm', 'INDRA_LOCATIONS',
+                        'cell')
+    assert not ccomp.partof('INDRA_LOCATIONS', 'cell', 'INDRA_LOCATIONS',
+                            'cytoplasm')
+
+
+def test_compact_wm_hierarchy():
+    eidos_ont = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                             '../sources/eidos/eidos_ontology.rdf')
+    hm = CompactHierarchyManager(eidos_ont, False, True)
+    # No closure is exposed but isa is answered from the precomputed
+    # relations
+    assert not hm.isa_closure
+    eidos_isa = lambda a, b: hm.isa('UN', a, 'UN', b)
+    assert eidos_isa('UN/events/human/conflict', 'UN/events/human')
+    assert not eidos_isa('UN/events/human/conflict',
+                         'UN/events/human/human_migration')
+    assert eidos_isa('UN/events/natural_disaster/storm', 'UN/events')
+    assert not eidos_isa('UN/events', 'UN/events/natural_disaster/storm')
+    uri = hm.get_uri('UN', 'UN/events/human/conflict')
+    assert hm.get_uri('UN', 'UN/events') in hm.get_parents(uri)
+
+
+def test_hierarchy_bundle():
+    import pickle
+    from indra.preassembler.hierarchy_bundle import save_hierarchy_bundle, \
+        load_hierarchy_bundle, BundleHierarchyManager
+    fname = '_test_hierarchies.bundle'
+    save_hierarchy_bundle(hierarchies, fname)
+    try:
+        h2 = load_hierarchy_bundle(fname)
+        for key in hierarchies.keys():
+            assert isinstance(h2[key], BundleHierarchyManager)
+            assert set(hierarchies[key].isa_or_partof_closure) == \
+                set(h2[key].isa_or_partof_closure)
+            assert dict(hierarchies[key].components) == \
+                dict(h2[key].components)
+        # Hierarchies are pickled as references to the bundle file
+        beh = pickle.loads(pickle.dumps(h2['entity']))
+        assert beh.isa('HGNC', '1097', 'FPLX', 'RAF')
+        assert not beh.isa('FPLX', 'RAF', 'HGNC', '1097')
+        assert beh.isa_or_partof('HGNC', '9385', 'FPLX', 'AMPK')
+        uri = beh.get_uri('FPLX', 'AMPK')
+        assert set(beh.get_parents(uri)) == set(ent_hierarchy.get_parents(uri))
+        assert set(beh.get_children(uri)) == \
+            set(ent_hierarchy.get_children(uri))
+        ccomp = h2['cellular_component']
+        assert ccomp.partof('INDRA_LOCATIONS', 'cytoplasm', 'INDRA_LOCATIONS',
+                            'cell')
+        assert not ccomp.partof('INDRA_LOCATIONS', 'cell', 'INDRA_LOCATIONS',
+                                'cytoplasm')
+    finally:
+        os.remove(fname)
+
+
+def test_get_opposites():
+    from indra.preassembler.hierarchy_bundle import save_hierarchy_bundle, \
+        load_hierarchy_bundle
+    eidos_ont = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                             '../sources/eidos/eidos_ontology.rdf')
+    hm = HierarchyManager(eidos_ont, True, True)
+    chm = CompactHierarchyManager(eidos_ont, True, True)
+    fname = '_test_opposites.bundle'
+    save_hierarchy_bundle({'entity': chm}, fname)
+    try:
+        bhm = load_hierarchy_bundle(fname)['entity']
+        insecurity = hm.get_uri('UN', 'UN/entities/human/food/food_insecurity')
+        security = hm.get_uri('UN', 'UN/entities/human/food/food_security')
+        for h in (hm, chm, bhm):
+            assert security in h.get_opposites(insecurity)
+            assert not h.get_opposites(hm.get_uri('UN', 'UN/events'))
+        assert bhm.get_opposites(hm.get_uri('UN', 'UN/unknown')) == []
+    finally:
+        os.remove(fname)
+
+
+def test_lazy_hierarchies():
+    import pickle
+    loads = []
+
+    def loader():
+        loads.append(1)
+        return {'entity': 'entity_hierarchy'}
+    lazy = LazyHierarchies(loader)
+    assert not lazy.loaded and not loads
+    assert lazy['entity'] == 'entity_hierarchy'
+    assert lazy.loaded and 'entity' in lazy and len(lazy) == 1
+    assert dict(lazy) == lazy.load() == {'entity': 'entity_hierarchy'}
+    assert len(loads) == 1
+    # The loaded hierarchies are pickled as a dict
+    unpickled = pickle.loads(pickle.dumps(LazyHierarchies(loader)))
+    assert unpickled == {'entity': 'entity_hierarchy'}
+    assert type(unpickled) == dict
+
+
 def test_yaml_hm():
     yml = load_yaml_from_url(eidos_ont_url)
     hm = YamlHierarchyManager(yml, rdf_graph_from_yaml, True)
@@ -225,11 +225,11 @@ def test_reduce_mods2():
     mc_red6 = ml.statements[5].obj.mods[0]
     mc_red7 = ml.statements[6].obj.mods[0]
     # These ones stay the same because they shouldn't be reduced
-    assert mc_red1.__dict__ == mc1.__dict__
-    assert mc_red3.__dict__ == mc3.__dict__
-    assert mc_red4.__dict__ == mc4.__dict__
-    assert mc_red5.__dict__ == mc5.__dict__
-    assert mc_red6.__dict__ == mc6.__dict__
+    assert mc_red1.equals(mc1)
+    assert mc_red3.equals(mc3)
+    assert mc_red4.equals(mc4)
+    assert mc_red5.equals(mc5)
+    assert mc_red6.equals(mc6)
     # mc2 has to be reduced to have position '123'
     assert mc_red2.mod_type == 'phosphorylation'
     assert mc_red2.residue == 'S'
@@ -2,6 +2,7 @@ from __future__ import absolute_import, print_function, unicode_literals
 
 from builtins import dict, str
 import os
+import rdflib
 from collections import OrderedDict
 
 from indra.preassembler import Preassembler, render_stmt_graph, \
@@ -546,6 +547,29 @@ def test_flatten_evidence_multilevel():
     assert anns.count('supported_by') == 2
 
 
+def test_flatten_evidence_shared_support():
+    braf = Agent('BRAF', db_refs={'HGNC': '1097'})
+    raf = Agent('RAF', db_refs={'FPLX': 'RAF'})
+    mek = Agent('MAP2K1', db_refs={'HGNC': '6840'})
+    st1 = Phosphorylation(raf, mek, evidence=[Evidence(text='foo')])
+    st2 = Phosphorylation(braf, mek, evidence=[Evidence(text='bar')])
+    st3 = Phosphorylation(raf, mek, 'S', evidence=[Evidence(text='baz')])
+    st4 = Phosphorylation(braf, mek, 'S', '218',
+                          evidence=[Evidence(text='bak')])
+    pa = Preassembler(hierarchies, stmts=[st1, st2, st3, st4])
+    pa.combine_related()
+    assert len(pa.related_stmts) == 1
+    flattened = flatten_evidence(pa.related_stmts)
+    top_stmt = flattened[0]
+    assert sorted(e.text for e in top_stmt.evidence) == \
+        ['bak', 'bar', 'baz', 'foo']
+    # The most generic statement supports the top-level statement both
+    # directly and through the two intermediate statements
+    assert len(top_stmt.supported_by) == 3
+    anns = [ev.annotations['support_type'] for ev in top_stmt.evidence]
+    assert anns.count('direct') == 1
+
+
 def test_flatten_evidence_hierarchy_supports():
     braf = Agent('BRAF')
     mek = Agent('MAP2K1')
@@ -636,6 +660,116 @@ def test_return_toplevel():
     assert len(stmts[ix].supports[0].supported_by) == 1
 
 
+def test_duplicates_no_copy():
+    src = Agent('SRC', db_refs={'HGNC': '11283'})
+    ras = Agent('RAS', db_refs={'FA': '03663'})
+    st1 = Phosphorylation(src, ras, evidence=[Evidence(text='Text 1')])
+    st2 = Phosphorylation(src, ras, evidence=[Evidence(text='Text 2')])
+    stmts = [st1, st2]
+    pa = Preassembler(hierarchies, stmts=stmts, copy_stmts=False)
+    assert pa.stmts[0] is st1
+    pa.combine_duplicates()
+    assert len(pa.unique_stmts) == 1
+    assert len(pa.unique_stmts[0].evidence) == 2
+    for ev in pa.unique_stmts[0].evidence:
+        assert ev.annotations['prior_uuids']
+    # The original evidences are not annotated
+    assert not st1.evidence[0].annotations
+    assert not st2.evidence[0].annotations
+
+
+def test_combine_duplicates_single_key_pass():
+    calls = []
+
+    def counting_matches_fun(st):
+        calls.append(st)
+        return st.matches_key()
+
+    src = Agent('SRC', db_refs={'HGNC': '11283'})
+    nras = Agent('NRAS', db_refs={'HGNC': '7989'})
+    st1 = Phosphorylation(src, nras, evidence=[Evidence(text='1')])
+    st2 = Phosphorylation(src, nras, evidence=[Evidence(text='2'),
+                                               Evidence(text='1')])
+    st3 = Dephosphorylation(src, nras)
+    pa = Preassembler(hierarchies, matches_fun=counting_matches_fun)
+    unique_stmts = pa.combine_duplicate_stmts([st1, st2, st3, st1])
+    assert len(unique_stmts) == 2
+    assert len(calls) == 3, calls
+    phos = [st for st in unique_stmts if isinstance(st, Phosphorylation)][0]
+    assert sorted(ev.text for ev in phos.evidence) == ['1', '2']
+
+
+def test_merge_statements():
+    braf = Agent('BRAF', db_refs={'HGNC': '1097'})
+    raf = Agent('RAF', db_refs={'FPLX': 'RAF'})
+    mek1 = Agent('MAP2K1', db_refs={'HGNC': '6840'})
+    mek = Agent('MEK', db_refs={'FPLX': 'MEK'})
+    st1 = Phosphorylation(raf, mek, evidence=[Evidence(text='1')])
+    st2 = Phosphorylation(braf, mek1, 'serine', '218',
+                          evidence=[Evidence(text='2')])
+    st3 = Phosphorylation(None, mek1, evidence=[Evidence(text='3')])
+    st4 = Phosphorylation(braf, mek1, evidence=[Evidence(text='4')])
+    st5 = Phosphorylation(raf, mek, evidence=[Evidence(text='5')])
+    st6 = Phosphorylation(raf, mek, evidence=[Evidence(text='1')])
+    st7 = Complex([braf, mek1])
+    pa = Preassembler(hierarchies, stmts=[st1, st2])
+    toplevel = pa.combine_related()
+    assert len(toplevel) == 1
+    toplevel = pa.merge_statements([st3, st4, st5, st6])
+    assert len(pa.stmts) == 6
+    assert len(pa.unique_stmts) == 4
+    assert len(toplevel) == 1
+    assert len(toplevel[0].supported_by) == 3
+    # The evidence of st5 is merged, the one of st6 is a duplicate
+    top_gen = [st for st in pa.unique_stmts
+               if st.enz and st.enz.name == 'RAF'][0]
+    assert sorted(ev.text for ev in top_gen.evidence) == ['1', '5']
+    assert len(top_gen.supports) == 2
+    toplevel = pa.merge_statements([st7])
+    assert len(toplevel) == 2
+
+    # Compare to preassembling all the statements at once
+    pa_all = Preassembler(hierarchies,
+                          stmts=[st1, st2, st3, st4, st5, st6, st7])
+    unique_all = pa_all.combine_related(return_toplevel=False)
+    unique_inc = pa.combine_related(return_toplevel=False)
+
+    def _links(stmts):
+        return sorted((st.matches_key(),
+                       sorted(s.matches_key() for s in st.supports),
+                       sorted(s.matches_key() for s in st.supported_by))
+                      for st in stmts)
+    assert _links(unique_all) == _links(unique_inc)
+
+
+def test_indexed_refinement_pairs():
+    import itertools
+    from indra.preassembler import refinement, default_refinement_fun
+    enzs = [None, Agent('BRAF', db_refs={'HGNC': '1097'}),
+            Agent('RAF', db_refs={'FPLX': 'RAF'}),
+            Agent('BRAF', db_refs={'HGNC': '1097'},
+                  mods=[ModCondition('phosphorylation')]),
+            Agent('X'), Agent('Y', db_refs={'CHEBI': 'CHEBI:1'})]
+    subs = [Agent('MAPK1', db_refs={'HGNC': '6871'}),
+            Agent('ERK', db_refs={'FPLX': 'ERK'}),
+            Agent('MAPK1', db_refs={'HGNC': '6871'}, location='nucleus')]
+    stmt_tuples = [(ix, Phosphorylation(enz, sub, res, pos)) for ix,
+                   (enz, sub, res, pos) in
+                   enumerate(itertools.product(enzs, subs, [None, 'S'],
+                                               [None, '218']))]
+    assert refinement.can_index(stmt_tuples)
+    expected = set()
+    for (ix1, st1), (ix2, st2) in itertools.combinations(stmt_tuples, 2):
+        if st1.refinement_of(st2, hierarchies):
+            expected.add((ix1, ix2))
+        elif st2.refinement_of(st1, hierarchies):
+            expected.add((ix2, ix1))
+    pairs = refinement.get_refinement_pairs(stmt_tuples, hierarchies,
+                                            default_refinement_fun)
+    assert len(pairs) == len(set(pairs))
+    assert set(pairs) == expected
+
+
 def test_multiprocessing():
     braf = Agent('BRAF', db_refs={'HGNC': '1097'})
     mek1 = Agent('MAP2K1', db_refs={'HGNC': '6840'})
@@ -658,6 +792,192 @@ def test_multiprocessing():
     assert len(toplevel) == 3, 'Got %d toplevel statements.' % len(toplevel)
 
 
+def test_multiprocessing_group_blocks():
+    from indra.preassembler import _get_group_blocks
+    blocks = _get_group_blocks(100, 4)
+    assert blocks[0][0] == 0 and blocks[-1][1] == 100
+    assert all(b1[1] == b2[0] for b1, b2 in zip(blocks, blocks[1:]))
+    # Blocks at the start of the group have more pairs per statement
+    assert blocks[0][1] - blocks[0][0] < blocks[-1][1] - blocks[-1][0]
+    assert _get_group_blocks(100, 4, balance_pairs=False) == \
+        [(0, 25), (25, 50), (50, 75), (75, 100)]
+
+    mek1 = Agent('MAP2K1', db_refs={'HGNC': '6840'})
+    mek = Agent('MEK', db_refs={'FPLX': 'MEK'})
+    stmts = []
+    for kinase in [mek, mek1, None]:
+        for res, pos in [(None, None), ('S', None), ('S', '218'),
+                         ('S', '222'), ('T', None)]:
+            stmts.append(Phosphorylation(kinase, Agent('MAPK1',
+                                                       db_refs={'HGNC':
+                                                                '6871'}),
+                                         res, pos))
+            stmts.append(Complex([Agent('X%s%s' % (res, pos)), mek1]))
+            stmts.append(Complex([mek, mek1]))
+
+    def _links(pa_stmts):
+        return sorted((st.matches_key(),
+                       sorted(s.matches_key() for s in st.supported_by))
+                      for st in pa_stmts)
+    pa = Preassembler(hierarchies, stmts=stmts)
+    serial = pa.combine_related(return_toplevel=False)
+    pa = Preassembler(hierarchies, stmts=stmts)
+    parallel = pa.combine_related(return_toplevel=False, poolsize=2,
+                                  size_cutoff=3)
+    assert _links(serial) == _links(parallel)
+
+
+def test_multiprocessing_group_tasks():
+    import shutil
+    import tempfile
+    import indra.preassembler
+    from indra.preassembler import _get_group_tasks, _load_worker_group, \
+        _set_supports_stmt_pairs_worker, _set_supports_stmt_pairs, \
+        default_refinement_fun
+    subs = [Agent('MAPK1', db_refs={'HGNC': '6871'}),
+            Agent('ERK', db_refs={'FPLX': 'ERK'})]
+    group = [(ix, Phosphorylation(Agent('BRAF', db_refs={'HGNC': '1097'}),
+                                  sub, res, pos))
+             for ix, (sub, res, pos) in
+             enumerate((sub, res, pos) for sub in subs
+                       for res in [None, 'S', 'T']
+                       for pos in [None, '218', '222'])]
+    group_dir = tempfile.mkdtemp()
+    try:
+        tasks = _get_group_tasks([group, group[:4]], group_dir, 2, 4, None,
+                                 default_refinement_fun)
+        # Each group is written once and referred to by all of its blocks
+        assert len(os.listdir(group_dir)) == 2
+        assert len({group_file for group_file, _ in tasks}) == 2
+        assert len(tasks) > 2
+        indra.preassembler._worker_hierarchies = hierarchies
+        stmt_tuples, index = _load_worker_group(tasks[0][0], None,
+                                                default_refinement_fun)
+        assert index is not None
+        assert _load_worker_group(tasks[1][0], None,
+                                  default_refinement_fun)[1] is index
+        ix_map = set()
+        for task in tasks:
+            ix_map |= set(_set_supports_stmt_pairs_worker(task)[0])
+        assert ix_map == \
+            set(_set_supports_stmt_pairs(group, hierarchies=hierarchies)) | \
+            set(_set_supports_stmt_pairs(group[:4], hierarchies=hierarchies))
+    finally:
+        indra.preassembler._worker_hierarchies = None
+        indra.preassembler._worker_group = None
+        shutil.rmtree(group_dir)
+
+
+def test_worker_pool_reuse():
+    from indra.preassembler import get_worker_pool, close_worker_pool
+    braf = Agent('BRAF', db_refs={'HGNC': '1097'})
+    mek1 = Agent('MAP2K1', db_refs={'HGNC': '6840'})
+    stmts = [Phosphorylation(braf, mek1),
+             Phosphorylation(braf, mek1, 'S'),
+             Phosphorylation(braf, mek1, 'S', '218')]
+    try:
+        pa = Preassembler(hierarchies, stmts=stmts)
+        toplevel = pa.combine_related(poolsize=1, size_cutoff=2)
+        assert len(toplevel) == 1
+        pool = get_worker_pool(1, hierarchies)
+        pa = Preassembler(hierarchies, stmts=stmts)
+        toplevel = pa.combine_related(poolsize=1, size_cutoff=2)
+        assert len(toplevel) == 1
+        assert get_worker_pool(1, hierarchies) is pool
+        assert get_worker_pool(2, hierarchies) is not pool
+        # Workers are restarted when a hierarchy is extended in place
+        hm = HierarchyManager(build_closure=True)
+        hm.load_from_rdf_string('')
+        hiers = dict(hierarchies, entity=hm)
+        pool = get_worker_pool(1, hiers)
+        assert get_worker_pool(1, hiers) is pool
+        isa = rdflib.term.URIRef(hm.relations_prefix + 'isa')
+        hm.add_triples([(rdflib.term.URIRef(hm.get_uri('CHEBI', 'CHEBI:1')),
+                         isa,
+                         rdflib.term.URIRef(hm.get_uri('CHEBI', 'CHEBI:2')))])
+        assert get_worker_pool(1, hiers) is not pool
+    finally:
+        close_worker_pool()
+
+
+def test_sharded_preassembly():
+    import shutil
+    import tempfile
+    from indra.preassembler.sharding import run_sharded_preassembly
+    braf = Agent('BRAF', db_refs={'HGNC': '1097'})
+    raf = Agent('RAF', db_refs={'FPLX': 'RAF'})
+    mek1 = Agent('MAP2K1', db_refs={'HGNC': '6840'})
+    mek = Agent('MEK', db_refs={'FPLX': 'MEK'})
+    erk2 = Agent('MAPK1', db_refs={'HGNC': '6871'})
+    stmts = [Phosphorylation(braf, mek1),
+             Phosphorylation(raf, mek),
+             Phosphorylation(braf, mek1, 'S', '218'),
+             Phosphorylation(None, mek1),
+             Phosphorylation(None, mek1, 'S'),
+             Phosphorylation(mek1, erk2),
+             Phosphorylation(mek, erk2),
+             Activation(braf, mek1),
+             Activation(raf, mek1),
+             Complex([braf, mek1])]
+
+    def get_links(stmts):
+        return {(st.matches_key(), tuple(sorted(s.matches_key()
+                                                for s in st.supported_by)))
+                for st in stmts}
+
+    pa = Preassembler(hierarchies, stmts=stmts)
+    unique = pa.combine_related(return_toplevel=False)
+    out_dir = tempfile.mkdtemp()
+    try:
+        sharded = run_sharded_preassembly(stmts, out_dir, 3, poolsize=2,
+                                          return_toplevel=False)
+    finally:
+        shutil.rmtree(out_dir)
+    assert len(sharded) == len(unique)
+    assert get_links(sharded) == get_links(unique)
+
+
+def test_preassembly_stats():
+    import json
+    from indra.preassembler import close_worker_pool
+    braf = Agent('BRAF', db_refs={'HGNC': '1097'})
+    raf = Agent('RAF', db_refs={'FPLX': 'RAF'})
+    mek1 = Agent('MAP2K1', db_refs={'HGNC': '6840'})
+    stmts = [Phosphorylation(braf, mek1),
+             Phosphorylation(braf, mek1),
+             Phosphorylation(raf, mek1),
+             Phosphorylation(braf, mek1, 'S'),
+             Phosphorylation(braf, mek1, 'S', '218'),
+             Activation(braf, mek1)]
+    pa = Preassembler(hierarchies, stmts=stmts)
+    pa.combine_related()
+    stats = pa.stats.to_json()
+    assert set(stats['phases']) == {'combine_duplicates', 'grouping',
+                                    'parent_comparisons', 'linking'}
+    assert stats['groups']['Phosphorylation']['groups'] == 1
+    assert stats['groups']['Phosphorylation']['histogram'] == {'4-7': 1}
+    assert stats['groups']['Activation']['histogram'] == {'1': 1}
+    assert stats['comparisons']['possible'] == 12
+    assert 0 < stats['comparisons']['performed'] <= 12
+    assert stats['comparisons']['pruned'] == \
+        12 - stats['comparisons']['performed']
+    assert not stats['workers']
+    json.dumps(stats)
+
+    pa = Preassembler(hierarchies, stmts=stmts)
+    try:
+        pa.combine_related(poolsize=1, size_cutoff=2)
+    finally:
+        close_worker_pool()
+    stats = pa.stats.to_json()
+    assert 'worker_comparisons' in stats['phases']
+    assert stats['comparisons']['possible'] == 12
+    assert len(stats['workers']) == 1
+    worker = list(stats['workers'].values())[0]
+    assert worker['tasks'] >= 1
+    assert worker['performed'] == stats['comparisons']['performed']
+
+
 def test_conversion_refinement():
     ras = Agent('RAS', db_refs={'FPLX': 'RAS'})
     hras = Agent('HRAS', db_refs={'HGNC': '5173'})
@@ -737,6 +1057,21 @@ def test_find_contradicts():
                                       {st5.uuid, st6.uuid})
 
 
+def test_find_contradicts_order():
+    # Pairs of Statements without polarity are in the order of stmts, and
+    # others have the positive Statement first
+    erk = Agent('ERK', db_refs={'FPLX': 'ERK'})
+    mapk1 = Agent('MAPK1', db_refs={'HGNC': '6871'})
+    stmts = [ActiveForm(mapk1, 'kinase', False),
+             Inhibition(Agent('x'), erk),
+             ActiveForm(erk, 'kinase', True),
+             Activation(Agent('x'), mapk1)]
+    pa = Preassembler(hierarchies, stmts)
+    contradicts = {(s1.uuid, s2.uuid) for s1, s2 in pa.find_contradicts()}
+    assert contradicts == {(stmts[0].uuid, stmts[2].uuid),
+                           (stmts[3].uuid, stmts[1].uuid)}
+
+
 def test_find_contradicts_refinement():
     ras = Agent('RAS', db_refs={'FPLX': 'RAS'})
     kras = Agent('KRAS', db_refs={'HGNC': '6407'})
@@ -752,6 +1087,96 @@ def test_find_contradicts_refinement():
                                       {st1.uuid, st3.uuid})
 
 
+def test_find_contradicts_indexed():
+    from indra.preassembler import close_worker_pool
+    ras = Agent('RAS', db_refs={'FPLX': 'RAS'})
+    kras = Agent('KRAS', db_refs={'HGNC': '6407'})
+    hras = Agent('HRAS', db_refs={'HGNC': '5173'})
+    raf = Agent('RAF', db_refs={'FPLX': 'RAF'})
+    braf = Agent('BRAF', db_refs={'HGNC': '1097'})
+    stmts = [Activation(ras, raf),
+             Inhibition(kras, braf),
+             Inhibition(hras, raf),
+             Inhibition(braf, kras),
+             Phosphorylation(None, kras),
+             Dephosphorylation(braf, kras),
+             Phosphorylation(raf, ras, 'S'),
+             Dephosphorylation(braf, hras, 'S'),
+             Dephosphorylation(braf, hras, 'T')]
+    pa = Preassembler(hierarchies, stmts)
+    contradicts = pa.find_contradicts()
+    assert len(contradicts) == 3
+    uuid_pairs = {(s1.uuid, s2.uuid) for s1, s2 in contradicts}
+    assert uuid_pairs == {(pa.stmts[0].uuid, pa.stmts[1].uuid),
+                          (pa.stmts[0].uuid, pa.stmts[2].uuid),
+                          (pa.stmts[6].uuid, pa.stmts[7].uuid)}
+    try:
+        assert set(pa.find_contradicts(poolsize=1, size_cutoff=2)) == \
+            set(contradicts)
+    finally:
+        close_worker_pool()
+    hashes = set(pa.iter_contradicting_hashes())
+    assert hashes == {(s1.get_hash(shallow=True), s2.get_hash(shallow=True))
+                      for s1, s2 in contradicts}
+
+
+def test_find_contradicts_graph_agents():
+    # Agents grounded outside of the closure namespaces have no component
+    # but are still related through the graph
+    hm = HierarchyManager(build_closure=['http://identifiers.org/hgnc',
+                                         'http://identifiers.org/fplx'])
+    isa = '<%sisa>' % hm.relations_prefix
+    triples = [(hm.get_uri('HGNC', '6407'), hm.get_uri('FPLX', 'RAS')),
+               (hm.get_uri('CHEBI', 'CHEBI:2'),
+                hm.get_uri('CHEBI', 'CHEBI:1'))]
+    hm.load_from_rdf_string('\n'.join('<%s> %s <%s> .' % (child, isa, parent)
+                                       for child, parent in triples))
+    hiers = dict(hierarchies, entity=hm)
+    x = Agent('X', db_refs={'CHEBI': 'CHEBI:2'})
+    y = Agent('Y', db_refs={'CHEBI': 'CHEBI:1'})
+    st1 = ActiveForm(x, 'activity', True)
+    st2 = ActiveForm(y, 'activity', False)
+    st3 = ActiveForm(Agent('Z', db_refs={'CHEBI': 'CHEBI:3'}), 'activity',
+                     False)
+    pa = Preassembler(hiers, [st1, st2, st3])
+    contradicts = pa.find_contradicts()
+    assert [(s1.uuid, s2.uuid) for s1, s2 in contradicts] == \
+        [(st1.uuid, st2.uuid)]
+
+
+def test_find_contradicts_influences():
+    import itertools
+    from indra.statements import QualitativeDelta
+    hm = HierarchyManager(build_closure=True)
+    rel = '<%s%s>' % (hm.relations_prefix, '%s')
+    triples = [('a', 'isa', 'b'), ('c', 'is_opposite', 'd')]
+    hm.load_from_rdf_string('\n'.join(
+        '<%s> %s <%s> .' % (hm.get_uri('UN', s), rel % p, hm.get_uri('UN', o))
+        for s, p, o in triples))
+    hiers = dict(hierarchies, entity=hm)
+
+    def event(name, polarity, grounded=True):
+        db_refs = {'UN': [(name, 1.0)]} if grounded else {}
+        return Event(Concept(name, db_refs=db_refs),
+                     delta=QualitativeDelta(polarity=polarity))
+    stmts = [Influence(event('a', 1), event('e', 1)),
+             Influence(event('b', 1), event('e', -1)),
+             Influence(event('c', 1), event('e', 1)),
+             Influence(event('d', 1), event('e', 1)),
+             Influence(event('c', 1), event('e', -1)),
+             Influence(event('x', 1, False), event('y', 1, False)),
+             Influence(event('x', -1, False), event('y', 1, False)),
+             Influence(event('x', None, False), event('y', None, False))]
+    pa = Preassembler(hiers, stmts)
+    contradicts = {(s1.uuid, s2.uuid) for s1, s2 in pa.find_contradicts()}
+    expected = {(stmts[i].uuid, stmts[j].uuid)
+                for i, j in [(0, 1), (2, 3), (2, 4), (5, 6)]}
+    assert contradicts == expected
+    assert contradicts == {(st1.uuid, st2.uuid) for st1, st2
+                           in itertools.combinations(pa.stmts, 2)
+                           if st1.contradicts(st2, hiers)}
+
+
 def test_preassemble_related_complex():
     ras = Agent('RAS', db_refs={'FPLX': 'RAS'})
     kras = Agent('KRAS', db_refs={'HGNC': '6407'})
@@ -0,0 +1,66 @@
+from __future__ import absolute_import, print_function, unicode_literals
+from builtins import dict, str
+import shutil
+import tempfile
+from indra.statements import *
+from indra.tools.statement_store import write_statement_store, \
+    StatementStore
+
+braf = Agent('BRAF', db_refs={'HGNC': '1097'})
+mek1 = Agent('MAP2K1', db_refs={'HGNC': '6840'})
+erk2 = Agent('MAPK1', db_refs={'HGNC': '6871'})
+ev = Evidence(source_api='reach', pmid='12345', text='BRAF activates MEK.')
+
+
+def _get_stmts():
+    stmts = [Phosphorylation(braf, mek1, 'S', '218', evidence=[ev]),
+             Phosphorylation(None, erk2),
+             Activation(braf, mek1, evidence=[ev]),
+             Complex([braf, Agent('X')]),
+             Dephosphorylation(mek1, erk2)]
+    for stmt, belief in zip(stmts, [0.9, 0.5, 0.8, 0.7, 0.95]):
+        stmt.belief = belief
+    stmts[0].supported_by = [stmts[2]]
+    return stmts
+
+
+def test_select():
+    stmts = _get_stmts()
+    path = tempfile.mkdtemp()
+    try:
+        write_statement_store((stmt for stmt in stmts), path)
+        store = StatementStore(path)
+        assert len(store) == 5
+        assert list(store.select()) == [0, 1, 2, 3, 4]
+        assert list(store.select(stmt_types=[Modification])) == [0, 1, 4]
+        assert list(store.select(stmt_types=[Phosphorylation],
+                                 min_belief=0.6)) == [0]
+        assert list(store.select(groundings=[('HGNC', '6871')])) == [1, 4]
+        assert list(store.select(groundings=[('NAME', 'X'),
+                                             ('HGNC', '6871')],
+                                 min_belief=0.75)) == [4]
+        assert list(store.select(groundings=[('HGNC', '0')])) == []
+        assert list(store.get_column('hash')) == \
+            [stmt.get_hash() for stmt in stmts]
+    finally:
+        shutil.rmtree(path)
+
+
+def test_get_statements():
+    stmts = _get_stmts()
+    path = tempfile.mkdtemp()
+    try:
+        store = write_statement_store(stmts, path)
+        loaded = list(store)
+        assert all(st1.equals(st2) for st1, st2 in zip(stmts, loaded))
+        assert loaded[0].evidence[0].text == ev.text
+        assert loaded[0].belief == 0.9
+        assert loaded[0].supported_by[0].uuid == stmts[2].uuid
+        stmt = store.get_statement(-3, evidence=False)
+        assert stmt.uuid == stmts[2].uuid
+        assert not stmt.evidence
+        empty = write_statement_store([], path)
+        assert len(empty) == 0
+        assert list(empty.select(groundings=[('HGNC', '6871')])) == []
+    finally:
+        shutil.rmtree(path)
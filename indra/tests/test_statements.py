@@ -1,7 +1,9 @@
 from __future__ import absolute_import, print_function, unicode_literals
 from builtins import dict, str
 import os
+import sys
 import json
+import pickle
 import unittest
 from copy import deepcopy
 from nose.tools import raises
@@ -2062,3 +2064,144 @@ def test_migration():
     assert isinstance(m.context, MovementContext)
     assert m.context.locations[0]['location'].name == 'South Sudan'
     assert m.context.locations[0]['role'] == 'origin'
+
+
+def test_matches_key_changes():
+    mek = Agent('MAP2K1', mods=[ModCondition('phosphorylation', 'S', '218')],
+                db_refs={'HGNC': '6840'})
+    erk = Agent('MAPK1', db_refs={'HGNC': '6871'})
+    st = Phosphorylation(mek, erk)
+    mk = st.matches_key()
+    # Reassigning an attribute of a nested condition changes the key
+    mek.mods[0].position = '222'
+    mk2 = st.matches_key()
+    assert mk2 != mk
+    assert mk2 == Phosphorylation(deepcopy(mek), erk).matches_key()
+    # So do in-place changes
+    mek.mods.append(ModCondition('phosphorylation', 'S', '218'))
+    assert st.matches_key() == Phosphorylation(deepcopy(mek),
+                                               erk).matches_key()
+    ek = erk.entity_matches_key()
+    erk.db_refs['FPLX'] = 'ERK'
+    assert erk.entity_matches_key() == str(('FPLX', 'ERK'))
+    # Including those of the agents of bound conditions
+    braf = Agent('BRAF', db_refs={'TEXT': 'BRAF'})
+    ras = Agent('KRAS', bound_conditions=[BoundCondition(braf)])
+    mk = ras.matches_key()
+    braf.db_refs['HGNC'] = '1097'
+    assert ras.matches_key() != mk
+    assert ras.matches_key() == deepcopy(ras).matches_key()
+    # And of scored groundings
+    concept = Concept('food', db_refs={'UN': [('UN/food', 0.8)]})
+    assert concept.entity_matches_key() == str(('UN', 'UN/food'))
+    concept.db_refs['UN'].insert(0, ('UN/food_security', 0.9))
+    assert concept.entity_matches_key() == str(('UN', 'UN/food_security'))
+
+
+def test_get_hash_refresh():
+    agent = Agent('X', db_refs={'TEXT': 'X'})
+    st = Phosphorylation(None, agent)
+    st.get_hash(refresh=True)
+    agent.db_refs['HGNC'] = '6871'
+    assert st.get_hash(refresh=True) == -1884979285030912
+    assert get_statement_hashes([st], refresh=True) == [-1884979285030912]
+
+
+def test_compact_statements():
+    mek = Agent('MAP2K1', db_refs={'HGNC': '6840'},
+                bound_conditions=[BoundCondition(Agent('BRAF'))])
+    erk = Agent('MAPK1', mods=[ModCondition('phosphorylation', 'T', '185')],
+                db_refs={'HGNC': '6871'})
+    ev = Evidence(source_api='reach', pmid='12345', text='MEK binds ERK.')
+    st = Phosphorylation(mek, erk, 'Y', '187', evidence=[ev])
+    assert not hasattr(mek, '__dict__')
+    assert not hasattr(ev, '__dict__')
+    mk = st.matches_key()
+    erk_mk = erk.matches_key()
+    st_json = st.to_json()
+    stmts = compact_statements([st])
+    assert stmts[0] is st
+    assert st.matches_key() == mk
+    assert erk.matches_key() == erk_mk
+    assert st.to_json() == st_json
+    assert mek.mods == () and erk.mutations == ()
+    assert erk.db_refs['HGNC'] is sys.intern('6871')
+    assert mek.bound_conditions[0].agent.mods == ()
+    # Slotted Statements can be pickled and copied
+    st2 = pickle.loads(pickle.dumps(st))
+    assert st2.matches_key() == mk
+    assert st2.evidence[0].equals(ev)
+    assert deepcopy(st).matches_key() == mk
+    # Old pickled states of slotted classes can still be loaded
+    ev2 = Evidence.__new__(Evidence)
+    ev2.__setstate__({'source_api': 'reach', 'source_id': None,
+                      'pmid': None, 'text': 'ERK', 'annotations': {},
+                      'epistemics': {}})
+    assert ev2.context is None and ev2.text_refs == {}
+    agent = Agent.__new__(Agent)
+    agent.__setstate__({'name': 'MAPK1', 'db_refs': {}, 'mods': [],
+                        'mutations': [], 'bound_conditions': [],
+                        'activity': None, 'location': None, 'sbo': None})
+    assert agent.matches_key() == Agent('MAPK1').matches_key()
+
+
+def test_agent_pool():
+    stmts = [Phosphorylation(Agent('MAP2K1', db_refs={'HGNC': '6840'}),
+                             Agent('MAPK1', db_refs={'HGNC': '6871'})),
+             Activation(Agent('MAPK1', db_refs={'HGNC': '6871'},
+                              mods=[ModCondition('phosphorylation')]),
+                        Agent('ELK1', db_refs={'HGNC': '3321'})),
+             Influence(Event(Concept('rain', db_refs={'UN': [('a/b', 0.8)]})),
+                       Event(Concept('flood')))]
+    pool = AgentPool()
+    stmts = stmts_from_json(stmts_to_json(stmts), agent_pool=pool)
+    erk1, erk2 = stmts[0].sub, stmts[1].subj
+    assert erk1 is not erk2
+    assert erk1.db_refs is erk2.db_refs
+    assert erk2.mods and not erk1.mods
+    assert erk2.entity_matches_key() == erk1.entity_matches_key()
+    assert len(pool) == 5
+    # Changing the grounding of one Agent doesn't affect the other
+    erk2.db_refs = dict(erk2.db_refs, UP='P28482')
+    assert 'UP' not in erk1.db_refs
+    pool.intern_agent(erk2)
+    assert len(pool) == 6
+    # Pooled db_refs that were changed in place aren't reused
+    erk1.db_refs['FPLX'] = 'ERK'
+    erk3 = pool.intern_agent(Agent('MAPK1', db_refs={'HGNC': '6871'}))
+    assert erk3.db_refs is not erk1.db_refs
+    assert erk3.entity_matches_key() == str(('HGNC', '6871'))
+
+
+def test_get_statement_hashes():
+    ev1 = Evidence(source_api='reach', text='MEK phosphorylates ERK.')
+    ev2 = Evidence(source_api='sparser', pmid='12345')
+    stmts = [Phosphorylation(Agent('MAP2K1'), Agent('MAPK1'), evidence=[ev1]),
+             Phosphorylation(Agent('MAP2K1'), Agent('MAPK1'), evidence=[ev2]),
+             Activation(Agent('MAPK1'), Agent('ELK1'), evidence=[ev1, ev2])]
+    expected = [(st.get_hash(shallow=True), st.get_hash(shallow=False))
+                for st in stmts]
+    for st in stmts:
+        st._shallow_hash = st._full_hash = None
+    assert get_statement_hashes(stmts, poolsize=2) == \
+        [h[0] for h in expected]
+    assert stmts[2]._shallow_hash == expected[2][0]
+    assert stmts[2]._full_hash is None
+    assert get_statement_hashes(stmts, shallow=False, full=True) == \
+        [h[1] for h in expected]
+    assert get_statement_hashes(stmts, full=True, refresh=True) == expected
+    # The matches key of each Statement is only made once for both hashes
+    calls = []
+
+    def matches_key(stmt):
+        calls.append(stmt)
+        return Phosphorylation.matches_key(stmt)
+    st = Phosphorylation(Agent('MAP2K1'), Agent('MAPK1'), evidence=[ev1])
+    st.matches_key = lambda: matches_key(st)
+    assert get_statement_hashes([st], full=True) == [expected[0]]
+    assert len(calls) == 1
+    # A custom matches function is only used for the shallow hash
+    assert get_statement_hashes([st], full=True, refresh=True,
+                                matches_fun=lambda stmt: 'custom') == \
+        [(make_hash('custom', 14), expected[0][1])]
+    assert make_hash('MAP2K1', 14) == 9741303255113106
@@ -1,5 +1,6 @@
 from __future__ import absolute_import, print_function, unicode_literals
 from builtins import dict, str
+import os
 import json
 import datetime
 import jsonschema
@@ -355,3 +356,52 @@ def test_file_serialization():
     stmts_to_json_file([stmt], 'test_indra_stmts.json')
     stmts = stmts_from_json_file('test_indra_stmts.json')
     assert stmts[0].matches(stmt)
+
+
+def test_jsonl_file_serialization():
+    st1 = Phosphorylation(Agent('MAP2K1'), Agent('MAPK1'), evidence=[ev])
+    st2 = Phosphorylation(Agent('MAP2K1'), Agent('MAPK1'), 'T', '185')
+    st3 = Activation(Agent('MAPK1'), Agent('ELK1'))
+    st2.supported_by = [st1]
+    st1.supports = [st2]
+    for fname in ('test_indra_stmts.jsonl', 'test_indra_stmts.jsonl.gz'):
+        assert stmts_to_jsonl_file((st for st in [st1, st2]), fname) == 2
+        stmts_to_jsonl_file([st3], fname, append=True)
+        # Support is only resolved once the Statements are collected
+        stmts = list(iter_stmts_from_jsonl_file(fname))
+        assert [st.uuid for st in stmts] == [st1.uuid, st2.uuid, st3.uuid]
+        assert isinstance(stmts[0].supports[0], Unresolved)
+        resolve_support(stmts[1:])
+        assert isinstance(stmts[1].supported_by[0], Unresolved)
+        stmts = stmts_from_jsonl_file(fname)
+        assert stmts[0].matches(st1)
+        assert stmts[0].supports[0] is stmts[1]
+        assert stmts[1].supported_by[0] is stmts[0]
+        assert not stmts[2].supports
+        os.remove(fname)
+
+
+def test_support_resolution():
+    st1 = Activation(Agent('MAP2K1'), Agent('MAPK1'))
+    st2 = Activation(Agent('MEK'), Agent('ERK'))
+    jsons = stmts_to_json([st1, st2])
+    jsons[0]['supports'] = ['missing1', st2.uuid, 'missing2', 'missing3']
+    jsons[1]['supported_by'] = [st1.uuid, 'missing1']
+    # Consecutive unresolved uuids are all left out
+    stmts = stmts_from_json(jsons, on_missing_support='ignore')
+    assert stmts[0].supports == [stmts[1]]
+    assert stmts[1].supported_by == [stmts[0]]
+    # Unresolved Statements are shared between references to the same uuid
+    stmts = stmts_from_json(jsons)
+    assert [s.uuid for s in stmts[0].supports] == jsons[0]['supports']
+    assert stmts[0].supports[0] is stmts[1].supported_by[1]
+    # Links can be left as Unresolved handles and be resolved later
+    stmts = stmts_from_json(jsons, link_support=False)
+    assert all(isinstance(s, Unresolved) for s in stmts[1].supported_by)
+    resolve_support(stmts, on_missing_support='ignore')
+    assert stmts[1].supported_by == [stmts[0]]
+    try:
+        stmts_from_json(jsons, on_missing_support='skip')
+        assert False, 'Invalid option accepted'
+    except InputError:
+        pass
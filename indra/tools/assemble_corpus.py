@@ -41,7 +41,7 @@ def dump_statements(stmts, fname, protocol=4):
         pickle.dump(stmts, fh, protocol=protocol)
 
 
-def load_statements(fname, as_dict=False):
+def load_statements(fname, as_dict=False, agent_pool=None):
     """Load statements from a pickle file.
 
     Parameters
@@ -52,6 +52,10 @@ def load_statements(fname, as_dict=False):
         If True and the pickle file contains a dictionary of statements, it
         is returned as a dictionary. If False, the statements are always
         returned in a list. Default: False
+    agent_pool : Optional[indra.statements.AgentPool]
+        If given, the Agents of the loaded statements are interned in this
+        pool so that equal Agents share their names and groundings.
+        Default: None
 
     Returns
     -------
@@ -68,6 +72,10 @@ def load_statements(fname, as_dict=False):
         else:
             stmts = pickle.load(fh, encoding='latin1')
 
+    if agent_pool is not None:
+        st_lists = stmts.values() if isinstance(stmts, dict) else [stmts]
+        for st_list in st_lists:
+            agent_pool.intern_statements(st_list)
     if isinstance(stmts, dict):
         if as_dict:
             return stmts
@@ -355,7 +363,8 @@ def run_preassembly(stmts_in, **kwargs):
         The number of worker processes to use to parallelize the
         comparisons performed by the function. If None (default), no
         parallelization is performed. NOTE: Parallelization is only
-        available on Python 3.4 and above.
+        available on Python 3.4 and above. The worker processes are reused
+        across calls, see :py:func:`indra.preassembler.get_worker_pool`.
     size_cutoff : Optional[int]
         Groups with size_cutoff or more statements are sent to worker
         processes, while smaller groups are compared in the parent process.
@@ -372,6 +381,11 @@ def run_preassembly(stmts_in, **kwargs):
     refinement_fun : function
         A function to override the built-in refinement_of function of
         statements.
+    copy_stmts : Optional[bool]
+        If False, the input statements are not deep-copied by the
+        Preassembler; only the evidences that are annotated during
+        preassembly are copied. Use this when the input statements are not
+        used after preassembly. Default: True
     flatten_evidence : Optional[bool]
         If True, evidences are collected and flattened via supports/supported_by
         links. Default: False
@@ -397,8 +411,9 @@ def run_preassembly(stmts_in, **kwargs):
     use_hierarchies = kwargs['hierarchies'] if 'hierarchies' in kwargs else \
         hierarchies
     be = BeliefEngine(scorer=belief_scorer, matches_fun=matches_fun)
-    pa = Preassembler(hierarchies, stmts_in, matches_fun=matches_fun,
-                      refinement_fun=refinement_fun)
+    pa = Preassembler(use_hierarchies, stmts_in, matches_fun=matches_fun,
+                      refinement_fun=refinement_fun,
+                      copy_stmts=kwargs.get('copy_stmts', True))
     run_preassembly_duplicate(pa, be, save=dump_pkl_unique)
 
     dump_pkl = kwargs.get('save')
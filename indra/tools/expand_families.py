@@ -15,9 +15,14 @@ logger = logging.getLogger(__name__)
 class Expander(object):
     def __init__(self, hierarchies=None):
         if hierarchies is None:
-            self.entities = default_hierarchies['entity']
-        else:
-            self.entities = hierarchies['entity']
+            hierarchies = default_hierarchies
+        self.hierarchies = hierarchies
+
+    @property
+    def entities(self):
+        # The entity hierarchy is looked up on use so that the default
+        # hierarchies aren't loaded when an Expander is created
+        return self.hierarchies['entity']
 
     def expand_families(self, stmts):
         """Generate statements by expanding members of families and complexes.
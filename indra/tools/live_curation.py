@@ -373,7 +373,9 @@ class LiveCurator(object):
         idx = 0
         for stmt in corpus.raw_statements:
             for concept in stmt.agent_list():
-                concept.db_refs['UN'] = groundings[idx]
+                # The db_refs are copied on write since they may be shared
+                # with other Concepts
+                concept.db_refs = dict(concept.db_refs, UN=groundings[idx])
                 idx += 1
         assembled_statements = default_assembly(corpus.raw_statements)
         corpus.statements = {s.uuid: s for s in assembled_statements}
@@ -0,0 +1,312 @@
+"""A columnar on-disk store of Statements with memory-mapped random access.
+
+Pickle and JSON dumps of assembled corpora have to be loaded in full even
+when only Statements of a given type, about a few genes or above a belief
+threshold are needed. A statement store keeps the types, matches hashes
+and beliefs of Statements, as well as the groundings of their Agents, in
+columns that are memory-mapped when the store is opened, so that
+Statements can be selected by these attributes without reading or
+deserializing the rest of the store. The Statements themselves, with their
+evidence in separate blocks, are only deserialized when they are accessed.
+
+A store is a directory with the following files:
+
+- `meta.json`: the format version, the number of Statements, and the tables
+  of Statement type names and of Agent groundings referred to by the columns.
+- `type.npy`, `hash.npy`, `belief.npy`: the index of the type, the matches
+  hash and the belief of each Statement.
+- `agent_offsets.npy`, `agent_entity.npy`: the index of the grounding of
+  each Agent of each Statement, with Statement i having the Agents from
+  `agent_offsets[i]` to `agent_offsets[i+1]`, and -1 for None Agents.
+- `stmt.bin`, `stmt_offsets.npy`, `evidence.bin`, `evidence_offsets.npy`:
+  the UTF-8 encoded JSON of each Statement without its evidence, and the
+  JSON list of its evidence.
+
+Agents are indexed by the grounding returned by their `get_grounding`
+method, or by their name in the NAME namespace if they aren't grounded.
+
+Example
+-------
+>>> store = write_statement_store(stmts, 'corpus_store') # doctest: +SKIP
+>>> idx = store.select(stmt_types=[Phosphorylation],
+...                    groundings=[('HGNC', '6871')],
+...                    min_belief=0.8) # doctest: +SKIP
+>>> stmts = list(store.get_statements(idx)) # doctest: +SKIP
+"""
+from __future__ import absolute_import, print_function, unicode_literals
+from builtins import dict, str
+import os
+import json
+import logging
+import numpy
+from indra.statements import Statement, Unresolved, get_statement_by_name
+
+logger = logging.getLogger(__name__)
+
+
+format_version = 1
+
+
+def write_statement_store(stmts, path):
+    """Write Statements into a statement store.
+
+    Parameters
+    ----------
+    stmts : iterable[indra.statements.Statement]
+        The Statements to write. Since each Statement is serialized as soon
+        as it is read, this can be a generator, e.g., one returned by
+        :py:func:`indra.statements.iter_stmts_from_jsonl_file`.
+    path : str
+        The directory of the store. It is created if it doesn't exist and
+        any store in it is overwritten.
+
+    Returns
+    -------
+    StatementStore
+        The store that was written.
+    """
+    if not os.path.exists(path):
+        os.makedirs(path)
+    types = {}
+    entities = {}
+    type_col, hash_col, belief_col = [], [], []
+    agent_offsets, agent_entity = [0], []
+    stmt_offsets, ev_offsets = [0], [0]
+    with open(os.path.join(path, 'stmt.bin'), 'wb') as stmt_fh, \
+            open(os.path.join(path, 'evidence.bin'), 'wb') as ev_fh:
+        for stmt in stmts:
+            stmt_type = type(stmt).__name__
+            type_col.append(types.setdefault(stmt_type, len(types)))
+            hash_col.append(stmt.get_hash(shallow=True))
+            belief_col.append(stmt.belief)
+            for agent in stmt.agent_list():
+                if agent is None:
+                    agent_entity.append(-1)
+                    continue
+                entity = _get_entity(agent)
+                agent_entity.append(entities.setdefault(entity,
+                                                        len(entities)))
+            agent_offsets.append(len(agent_entity))
+            stmt_json = stmt.to_json()
+            ev_json = stmt_json.pop('evidence', [])
+            stmt_offsets.append(stmt_offsets[-1] +
+                                stmt_fh.write(_encode_json(stmt_json)))
+            ev_offsets.append(ev_offsets[-1] +
+                              ev_fh.write(_encode_json(ev_json)))
+    columns = {'type': (type_col, numpy.int32),
+               'hash': (hash_col, numpy.int64),
+               'belief': (belief_col, numpy.float64),
+               'agent_offsets': (agent_offsets, numpy.int64),
+               'agent_entity': (agent_entity, numpy.int32),
+               'stmt_offsets': (stmt_offsets, numpy.int64),
+               'evidence_offsets': (ev_offsets, numpy.int64)}
+    for name, (values, dtype) in columns.items():
+        numpy.save(os.path.join(path, name + '.npy'),
+                   numpy.array(values, dtype=dtype))
+    meta = {'version': format_version,
+            'num_statements': len(type_col),
+            'types': sorted(types, key=types.get),
+            'entities': [list(entity) for entity
+                         in sorted(entities, key=entities.get)]}
+    with open(os.path.join(path, 'meta.json'), 'w') as fh:
+        json.dump(meta, fh)
+    logger.info('Wrote %d statements into %s' % (len(type_col), path))
+    return StatementStore(path)
+
+
+class StatementStore(object):
+    """A statement store opened for reading.
+
+    The columns and serialized Statements of the store are memory-mapped,
+    so opening a store is fast and only the parts of it that are accessed
+    are read from disk.
+
+    Parameters
+    ----------
+    path : str
+        The directory of the store, as written by
+        :py:func:`write_statement_store`.
+
+    Attributes
+    ----------
+    types : list[str]
+        The names of the types of Statements in the store.
+    entities : list[tuple]
+        The groundings of the Agents in the store as (namespace, ID) tuples.
+    """
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, 'meta.json'), 'r') as fh:
+            meta = json.load(fh)
+        if meta['version'] != format_version:
+            raise ValueError('Unsupported statement store version %s.' %
+                             meta['version'])
+        self._num_stmts = meta['num_statements']
+        self.types = meta['types']
+        self.entities = [tuple(entity) for entity in meta['entities']]
+        self._entity_idx = {entity: idx for idx, entity
+                            in enumerate(self.entities)}
+        self._columns = {}
+
+    def __len__(self):
+        return self._num_stmts
+
+    def __getitem__(self, idx):
+        return self.get_statement(idx)
+
+    def __iter__(self):
+        return self.get_statements()
+
+    def get_column(self, name):
+        """Return a column of the store as a memory-mapped array.
+
+        Parameters
+        ----------
+        name : str
+            The name of the column: type, hash, belief, agent_offsets,
+            agent_entity, stmt_offsets or evidence_offsets. The values of the
+            type and agent_entity columns are indices into the `types` and
+            `entities` attributes.
+
+        Returns
+        -------
+        numpy.ndarray
+            The values of the column, one for each Statement except for the
+            agent_entity column, which has one for each Agent, and the offset
+            columns, which have one more.
+        """
+        column = self._columns.get(name)
+        if column is None:
+            fname = os.path.join(self.path, name + '.npy')
+            try:
+                column = numpy.load(fname, mmap_mode='r')
+            # Empty columns can't be memory-mapped
+            except ValueError:
+                column = numpy.load(fname)
+            self._columns[name] = column
+        return column
+
+    def select(self, stmt_types=None, groundings=None, min_belief=None):
+        """Return the indices of the Statements satisfying all conditions.
+
+        Only the columns needed to evaluate the conditions are read.
+
+        Parameters
+        ----------
+        stmt_types : Optional[list[type]]
+            If given, only Statements that are instances of one of these
+            Statement classes (or their subclasses) are selected.
+        groundings : Optional[list[tuple]]
+            If given, only Statements with an Agent grounded to one of these
+            (namespace, ID) tuples are selected. Ungrounded Agents can be
+            selected by name in the NAME namespace.
+        min_belief : Optional[float]
+            If given, only Statements with a belief of at least this value
+            are selected.
+
+        Returns
+        -------
+        numpy.ndarray
+            The indices of the selected Statements in increasing order.
+        """
+        mask = numpy.ones(self._num_stmts, dtype=bool)
+        if stmt_types is not None:
+            stmt_types = tuple(stmt_types)
+            type_idx = [idx for idx, name in enumerate(self.types)
+                        if issubclass(get_statement_by_name(name),
+                                      stmt_types)]
+            mask &= numpy.isin(self.get_column('type'), type_idx)
+        if min_belief is not None:
+            mask &= self.get_column('belief') >= min_belief
+        if groundings is not None:
+            entity_idx = [self._entity_idx[tuple(grounding)]
+                          for grounding in groundings
+                          if tuple(grounding) in self._entity_idx]
+            offsets = self.get_column('agent_offsets')
+            agent_mask = numpy.isin(self.get_column('agent_entity'),
+                                    entity_idx)
+            # The number of matching Agents of each Statement
+            counts = numpy.concatenate([[0], numpy.cumsum(agent_mask)])
+            mask &= counts[offsets[1:]] > counts[offsets[:-1]]
+        return numpy.nonzero(mask)[0]
+
+    def get_statement(self, idx, evidence=True):
+        """Return a Statement of the store.
+
+        Parameters
+        ----------
+        idx : int
+            The index of the Statement in the store.
+        evidence : Optional[bool]
+            If False, the evidence of the Statement isn't read and the
+            Statement is returned without evidence. Default: True
+
+        Returns
+        -------
+        indra.statements.Statement
+            The Statement. The uuids in its `supports` and `supported_by`
+            lists are represented by `Unresolved` Statements, which can be
+            linked with :py:func:`indra.statements.resolve_support`.
+        """
+        if idx < 0:
+            idx += self._num_stmts
+        if not 0 <= idx < self._num_stmts:
+            raise IndexError('Statement index out of range')
+        stmt_json = self._read_json('stmt', idx)
+        if evidence:
+            stmt_json['evidence'] = self._read_json('evidence', idx)
+        stmt = Statement._from_json(stmt_json)
+        stmt.supports = [Unresolved(uuid) for uuid in stmt.supports]
+        stmt.supported_by = [Unresolved(uuid) for uuid in stmt.supported_by]
+        return stmt
+
+    def get_statements(self, indices=None, evidence=True):
+        """Iterate over Statements of the store, deserializing them lazily.
+
+        Parameters
+        ----------
+        indices : Optional[iterable[int]]
+            The indices of the Statements, e.g., returned by `select`. If
+            not given, all Statements are returned.
+        evidence : Optional[bool]
+            If False, the evidence of the Statements isn't read.
+            Default: True
+
+        Yields
+        ------
+        indra.statements.Statement
+            The Statements with the given indices.
+        """
+        if indices is None:
+            indices = range(self._num_stmts)
+        for idx in indices:
+            yield self.get_statement(int(idx), evidence=evidence)
+
+    def _read_json(self, block, idx):
+        offsets = self.get_column(block + '_offsets')
+        data = self._get_block(block)
+        return json.loads(
+            bytes(data[offsets[idx]:offsets[idx + 1]]).decode('utf-8'))
+
+    def _get_block(self, block):
+        data = self._columns.get(block + '.bin')
+        if data is None:
+            fname = os.path.join(self.path, block + '.bin')
+            # Empty files can't be memory-mapped
+            if os.path.getsize(fname):
+                data = numpy.memmap(fname, dtype=numpy.uint8, mode='r')
+            else:
+                data = numpy.zeros(0, dtype=numpy.uint8)
+            self._columns[block + '.bin'] = data
+        return data
+
+
+def _get_entity(agent):
+    db_ns, db_id = agent.get_grounding()
+    if db_ns and db_id:
+        return db_ns, str(db_id)
+    return 'NAME', agent.name
+
+
+def _encode_json(json_obj):
+    return json.dumps(json_obj).encode('utf-8')
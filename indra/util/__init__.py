@@ -3,6 +3,7 @@ import csv
 import gzip
 import zlib
 import logging
+import multiprocessing as mp
 from io import BytesIO
 from functools import wraps
 from datetime import datetime
@@ -44,8 +45,8 @@ def unicode_strs(obj, attr_filter=None):
             has_unicode_strs = unicode_strs(item)
             if not has_unicode_strs:
                 return False
-    if hasattr(obj, '__dict__'):
-        for item_name, item in obj.__dict__.items():
+    if hasattr(obj, '__dict__') or hasattr(obj, '__slots__'):
+        for item_name, item in _get_attrs(obj).items():
             if attr_filter and item_name in attr_filter:
                 continue
             has_unicode_strs = unicode_strs(item)
@@ -60,14 +61,25 @@ def unicode_strs(obj, attr_filter=None):
     return True
 
 
+def _get_attrs(obj):
+    """Return the attributes of an object, including those in slots."""
+    attrs = {}
+    for cls in type(obj).__mro__:
+        for name in cls.__dict__.get('__slots__', ()):
+            if hasattr(obj, name) and name not in ('__dict__', '__weakref__'):
+                attrs[name] = getattr(obj, name)
+    attrs.update(getattr(obj, '__dict__', {}))
+    return attrs
+
+
 def decode_obj(obj, encoding='utf-8'):
     if isinstance(obj, non_unicode):
         return obj.decode(encoding)
     elif isinstance(obj, list) or isinstance(obj, tuple):
         return [decode_obj(item) for item in obj]
-    elif hasattr(obj, '__dict__'):
-        for k, v in obj.__dict__.items():
-            obj.__dict__[k] = decode_obj(v)
+    elif hasattr(obj, '__dict__') or hasattr(obj, '__slots__'):
+        for k, v in _get_attrs(obj).items():
+            setattr(obj, k, decode_obj(v))
         return obj
     elif isinstance(obj, dict):
         dec_obj = {}
@@ -208,6 +220,18 @@ def fast_deepcopy(obj):
     return obj_new
 
 
+def get_mp_context():
+    """Return the multiprocessing context to start worker processes with.
+
+    Forked workers share the memory of the parent process copy-on-write,
+    so that large objects don't need to be pickled to be sent to them.
+    Fork is not safe on macOS, where workers are spawned.
+    """
+    if sys.platform != 'darwin' and 'fork' in mp.get_all_start_methods():
+        return mp.get_context('fork')
+    return mp.get_context('spawn')
+
+
 def lmap(f, xs):
     """A non-lazy version of map."""
     return list(map(f, xs))